@@ -0,0 +1,244 @@
+"""
+Persistent answer cache for /query.
+
+Answers live in SQLite (data/answer_cache.sqlite), so they survive restarts
+and are shared by every uvicorn worker. Keys combine:
+  - the normalized question (case, whitespace and trailing "?" ignored)
+  - the caller's repo scope (answers never cross repo permissions)
+  - the corpus version of that scope (manifest.corpus_version), so
+    re-ingesting a repo retires every answer computed from its old content
+
+Entries expire after ANSWER_CACHE_TTL seconds and the store is trimmed to
+ANSWER_CACHE_SIZE entries, least recently used first. Hit/miss counters are
+kept in the same database (GET /cache/stats).
+
+Paraphrases ("where is auth handled?" / "which file does authentication?")
+are caught by a semantic layer: every stored answer keeps the embedding of
+its question, and an exact-key miss falls back to the nearest previously
+answered question of the same scope and corpus version, if its cosine
+similarity reaches SEMANTIC_CACHE_THRESHOLD and both questions name the same
+identifiers and paths (code_tokens) - embeddings barely separate get_user
+from get_users. The match is returned together with the original question
+so the caller can show what was matched.
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from backend.manifest import corpus_version
+
+ANSWER_CACHE_PATH = "data/answer_cache.sqlite"
+ANSWER_CACHE_SIZE = int(os.environ.get("EDITH_ANSWER_CACHE_SIZE", 5000))
+ANSWER_CACHE_TTL = int(os.environ.get("EDITH_ANSWER_CACHE_TTL", 7 * 24 * 3600))
+SEMANTIC_CACHE = os.environ.get("EDITH_SEMANTIC_CACHE", "1") != "0"
+# Minimum cosine similarity between question embeddings for a semantic hit
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("EDITH_SEMANTIC_CACHE_THRESHOLD", 0.92))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+_WORD_RE = re.compile(r"`[^`]+`|[^\s,;:!?()\[\]{}'\"]+")
+# snake_case, dotted names / file names, paths, camelCase, names with digits
+_CODE_RE = re.compile(r"_|[A-Za-z0-9]\.[A-Za-z]|[/\\]|[a-z][A-Z]|[A-Za-z]\d|\d[A-Za-z]")
+
+
+def code_tokens(question: str) -> frozenset:
+    """Identifiers and paths named in a question (backticked words, snake_case, camelCase, dotted, paths)."""
+    tokens = set()
+    for word in _WORD_RE.findall(question):
+        if word.startswith("`"):
+            tokens.add(word.strip("`").strip().lower())
+            continue
+        word = word.rstrip(".")
+        if _CODE_RE.search(word):
+            tokens.add(word.lower())
+    return frozenset(tokens)
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question.lower()).strip().rstrip("?!. ")
+
+
+def scope_key(repos: Optional[List[str]]) -> str:
+    return ",".join(sorted(repos)) if repos is not None else "*"
+
+
+@lru_cache(maxsize=256)
+def _embed_normalized(question: str) -> bytes:
+    from backend.models import get_embedding_function
+    vector = np.asarray(get_embedding_function()([question])[0], dtype=np.float32)
+    return (vector / max(float(np.linalg.norm(vector)), 1e-12)).tobytes()
+
+
+def embed_question(question: str) -> np.ndarray:
+    """Unit-length embedding of the normalized question (memoized: lookup and store embed the same text)."""
+    return np.frombuffer(_embed_normalized(normalize_question(question)), dtype=np.float32)
+
+
+class AnswerCache:
+    def __init__(self, path: str = ANSWER_CACHE_PATH, max_entries: int = ANSWER_CACHE_SIZE, ttl: int = ANSWER_CACHE_TTL):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, question TEXT, scope TEXT, corpus TEXT,
+                                                answer TEXT, created_at REAL, last_used REAL, hits INTEGER DEFAULT 0);
+            CREATE INDEX IF NOT EXISTS answers_last_used ON answers(last_used);
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER);
+        """)
+        if "embedding" not in [row[1] for row in self._db.execute("PRAGMA table_info(answers)")]:
+            self._db.execute("ALTER TABLE answers ADD COLUMN embedding BLOB")
+        self._db.commit()
+        self._lock = threading.Lock()
+        # (scope, corpus) -> (write generation, keys, questions, embedding matrix), per worker
+        self._semantic: Dict[Tuple[str, str], Tuple[int, List[str], List[str], np.ndarray]] = {}
+
+    def key(self, question: str, repos: Optional[List[str]]) -> str:
+        scope = scope_key(repos)
+        return hashlib.md5(f"{scope}|{corpus_version(repos)}|{normalize_question(question)}".encode()).hexdigest()
+
+    def _count(self, name: str, amount: int = 1):
+        self._db.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                         "ON CONFLICT(name) DO UPDATE SET value = value + ?", (name, amount, amount))
+
+    def _generation(self) -> int:
+        row = self._db.execute("SELECT value FROM counters WHERE name = 'writes'").fetchone()
+        return row[0] if row else 0
+
+    def _touch(self, key: str, now: float):
+        self._db.execute("UPDATE answers SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+
+    def lookup(self, question: str, repos: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Cached answer for the question: {"answer", "question" (the one originally
+        answered), "match": "exact" | "semantic", "similarity"}, or None.
+        """
+        key = self.key(question, repos)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT answer, created_at, question FROM answers WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl:
+                self._touch(key, now)
+                self._count("hits")
+                self._db.commit()
+                return {"answer": row[0], "question": row[2], "match": "exact", "similarity": 1.0}
+            if row:
+                self._db.execute("DELETE FROM answers WHERE key = ?", (key,))
+                self._count("expired")
+                self._count("writes")
+                self._db.commit()
+
+        hit = self._semantic_lookup(question, repos, now) if SEMANTIC_CACHE else None
+        with self._lock:
+            self._count("semantic_hits" if hit else "misses")
+            self._db.commit()
+        return hit
+
+    def _semantic_lookup(self, question: str, repos: Optional[List[str]], now: float) -> Optional[Dict[str, Any]]:
+        scope, corpus = scope_key(repos), corpus_version(repos)
+        with self._lock:
+            generation = self._generation()
+            index = self._semantic.get((scope, corpus))
+            if index is None or index[0] != generation:
+                rows = self._db.execute(
+                    "SELECT key, question, embedding FROM answers WHERE scope = ? AND corpus = ? "
+                    "AND embedding IS NOT NULL AND created_at >= ?", (scope, corpus, now - self.ttl)).fetchall()
+                matrix = (np.stack([np.frombuffer(r[2], dtype=np.float32) for r in rows])
+                          if rows else np.zeros((0, 1), dtype=np.float32))
+                index = (generation, [r[0] for r in rows], [r[1] for r in rows], matrix)
+                # Only the current corpus version of a scope is worth keeping
+                self._semantic = {k: v for k, v in self._semantic.items() if k[0] != scope}
+                self._semantic[(scope, corpus)] = index
+        _, keys, questions, matrix = index
+        if not keys:
+            return None
+
+        similarities = matrix @ embed_question(question)
+        tokens = code_tokens(question)
+        best = None
+        for i in np.argsort(-similarities):
+            if similarities[i] < SEMANTIC_CACHE_THRESHOLD:
+                return None
+            # A paraphrase must still be about the same identifiers and files
+            if code_tokens(questions[i]) == tokens:
+                best = int(i)
+                break
+        if best is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT answer FROM answers WHERE key = ?", (keys[best],)).fetchone()
+            if not row:
+                return None
+            self._touch(keys[best], now)
+            self._db.commit()
+        return {"answer": row[0], "question": questions[best], "match": "semantic",
+                "similarity": round(float(similarities[best]), 4)}
+
+    def get(self, question: str, repos: Optional[List[str]] = None) -> Optional[str]:
+        hit = self.lookup(question, repos)
+        return hit["answer"] if hit else None
+
+    def put(self, question: str, answer: str, repos: Optional[List[str]] = None):
+        now = time.time()
+        embedding = embed_question(question).tobytes() if SEMANTIC_CACHE else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers (key, question, scope, corpus, answer, created_at, last_used, embedding) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.key(question, repos), question, scope_key(repos), corpus_version(repos), answer, now, now, embedding))
+            self._count("stores")
+            self._count("writes")
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl,))
+        excess = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._db.execute("DELETE FROM answers WHERE key IN "
+                             "(SELECT key FROM answers ORDER BY last_used LIMIT ?)", (excess,))
+            self._count("evictions", excess)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM answers")
+            self._count("writes")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._db.execute("SELECT name, value FROM counters").fetchall())
+            entries = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        hits = counters.get("hits", 0) + counters.get("semantic_hits", 0)
+        lookups = hits + counters.get("misses", 0)
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl,
+            "hits": counters.get("hits", 0),
+            "semantic_hits": counters.get("semantic_hits", 0),
+            "semantic_threshold": SEMANTIC_CACHE_THRESHOLD if SEMANTIC_CACHE else None,
+            "misses": counters.get("misses", 0),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "stores": counters.get("stores", 0),
+            "expired": counters.get("expired", 0),
+            "evictions": counters.get("evictions", 0),
+        }
+
+
+def get_answer_cache() -> AnswerCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache()
+    return _cache
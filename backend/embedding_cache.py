@@ -0,0 +1,132 @@
+"""
+Persistent embedding cache keyed by (model, chunk content hash).
+
+Layout per model under data/embedding_cache/<model>/:
+  - vectors.f32   raw float32 rows, appended only (memory-mapped for reads)
+  - index.sqlite  content hash -> row number, plus the vector dimension
+
+Ingestion only runs the embedding model on cache misses, so re-ingesting
+unchanged text, rebuilding a lost Chroma directory or bootstrapping a new
+node from a copied cache costs a lookup instead of a forward pass. Appends
+are serialized through an sqlite write transaction, so several workers or
+processes can share one cache.
+"""
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Dict, Optional, Sequence, Callable, Tuple
+
+import numpy as np
+
+from backend.manifest import content_hash
+
+CACHE_DIR = "data/embedding_cache"
+
+
+class EmbeddingCache:
+    def __init__(self, model_key: str, cache_dir: str = CACHE_DIR):
+        self.model_key = model_key
+        self.path = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_key))
+        os.makedirs(self.path, exist_ok=True)
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self._db = sqlite3.connect(os.path.join(self.path, "index.sqlite"), check_same_thread=False, timeout=30)
+        self._db.execute("CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._mmap: Optional[np.memmap] = None
+        self.dim: Optional[int] = self._load_dim()
+        self.hits = 0
+        self.misses = 0
+
+    def _load_dim(self) -> Optional[int]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        return int(row[0]) if row else None
+
+    def _vectors(self, min_rows: int) -> np.memmap:
+        """Memory map of the vector file, re-opened when it has grown past our view."""
+        if self._mmap is None or self._mmap.shape[0] < min_rows:
+            rows = os.path.getsize(self.vectors_path) // (4 * self.dim)
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._mmap
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        if self.dim is None:
+            self.dim = self._load_dim()  # another process may have filled the cache
+        if not hashes or self.dim is None:
+            return {}
+        found: Dict[str, int] = {}
+        with self._lock:
+            unique = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                placeholders = ",".join("?" * len(part))
+                found.update(self._db.execute(
+                    f"SELECT hash, row FROM vectors WHERE hash IN ({placeholders})", part).fetchall())
+            if not found:
+                return {}
+            vectors = self._vectors(max(found.values()) + 1)
+            return {h: np.array(vectors[row]) for h, row in found.items()}
+
+    def put_many(self, hashes: Sequence[str], vectors: np.ndarray):
+        if not len(hashes):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock, so concurrent appenders get distinct rows
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if self.dim is None:
+                    self.dim = self._load_dim() or vectors.shape[1]
+                    self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+                placeholders = ",".join("?" * len(hashes))
+                existing = {h for (h,) in self._db.execute(
+                    f"SELECT hash FROM vectors WHERE hash IN ({placeholders})", list(hashes)).fetchall()}
+                new = [(h, v) for h, v in zip(hashes, vectors) if h not in existing]
+                new = list({h: v for h, v in new}.items())
+                if new:
+                    size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+                    first_row = size // (4 * self.dim)
+                    with open(self.vectors_path, "ab") as f:
+                        f.write(np.stack([v for _, v in new]).astype(np.float32).tobytes())
+                    self._db.executemany("INSERT INTO vectors (hash, row) VALUES (?, ?)",
+                                         [(h, first_row + i) for i, (h, _) in enumerate(new)])
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def embed(self, texts: List[str], embed_fn: Callable[[List[str]], Sequence]) -> Tuple[List[List[float]], int]:
+        """
+        Embeddings for texts, computing (and storing) only the cache misses.
+        Returns (embeddings, number of texts served from the cache).
+        """
+        hashes = [content_hash(t) for t in texts]
+        cached = self.get_many(hashes)
+        missing = [i for i, h in enumerate(hashes) if h not in cached]
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            computed = np.asarray(embed_fn([texts[i] for i in missing]), dtype=np.float32)
+            self.put_many([hashes[i] for i in missing], computed)
+            for i, vector in zip(missing, computed):
+                cached[hashes[i]] = vector
+        return [cached[h].tolist() for h in hashes], len(texts) - len(missing)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+            return {"vectors": count, "dim": self.dim or 0, "hits": self.hits, "misses": self.misses}
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_key: str) -> EmbeddingCache:
+    with _caches_lock:
+        if model_key not in _caches:
+            _caches[model_key] = EmbeddingCache(model_key)
+        return _caches[model_key]
@@ -0,0 +1,175 @@
+"""
+Single-shot RAG fast path.
+
+Most questions ("what does X do", "where is Y defined") are answered by the
+first retrieval, yet the ReAct loop spends 2-6 LLM round-trips on them. The
+fast path does one query_documents call, packs the top chunks - expanded to
+the whole symbol or file when that is small - and makes one LLM call.
+
+route() picks the mode per question:
+  - question shape: multi-hop questions (flows, callers, comparisons,
+    dependencies, "why") always go to the agent, before any retrieval
+  - retrieval confidence: the top chunk must reach FAST_MIN_SIMILARITY and
+    either be a decisive dense winner (the rerank policy skipped reranking)
+    or score FAST_MIN_RERANK_SCORE with the cross-encoder
+
+EDITH_ANSWER_MODE (or a request's `mode`) forces "fast" or "agent"; the
+default "auto" routes. A fast answer that finds the snippets insufficient
+replies NOT_ENOUGH_CONTEXT and the question falls through to the agent.
+"""
+import os
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+from backend.path_index import absolute_path
+from backend.symbols import symbol_index
+
+MODES = ("auto", "fast", "agent")
+ANSWER_MODE = os.environ.get("EDITH_ANSWER_MODE", "auto").lower()
+FAST_RESULTS = int(os.environ.get("EDITH_FAST_RESULTS", 6))
+FAST_MIN_SIMILARITY = float(os.environ.get("EDITH_FAST_MIN_SIMILARITY", 0.6))
+# Raw logit of the default ms-marco cross-encoder (> 0 = relevant)
+FAST_MIN_RERANK_SCORE = float(os.environ.get("EDITH_FAST_MIN_RERANK_SCORE", 3.0))
+FAST_CONTEXT_CHARS = int(os.environ.get("EDITH_FAST_CONTEXT_CHARS", 12000))
+# Files/symbols up to this size are sent whole. Must exceed symbols.MAX_SYMBOL_CHARS, the size above
+# which a symbol is split into parts (or a class into header + methods), for symbol expansion to apply
+FAST_EXPAND_CHARS = int(os.environ.get("EDITH_FAST_EXPAND_CHARS", FAST_CONTEXT_CHARS // 2))
+
+NOT_ENOUGH_CONTEXT = "NOT_ENOUGH_CONTEXT"
+
+# Questions that need several lookups (following calls, comparing, tracing)
+MULTI_HOP_PATTERNS = [re.compile(p) for p in (
+    r"\btrace\b", r"\bend[- ]to[- ]end\b", r"\bflows?\b", r"\bcall (chain|graph|path|stack)\b",
+    r"\bwho calls\b", r"\bcallers?\b", r"\bwhere (is|are) .+ (used|called)\b",
+    r"\b(all|every) (places?|usages?|callers?|files?|uses)\b", r"\bcompare\b", r"\bdifferences? between\b",
+    r"\bvs\.?\b", r"\bdepend(s|ency|encies|ents)?\b", r"\bimports?\b", r"\bwhy\b", r"\brefactor",
+    r"\bmigrat", r"\bacross\b", r"\binteract", r"\bwork together\b",
+)]
+# Questions one retrieval usually answers
+LOOKUP_PATTERNS = [re.compile(p) for p in (
+    r"^(what|where|which) (does|is|are|file|class|function|module)\b", r"^(explain|describe|show|summari[sz]e)\b",
+    r"\bwhat does .+ do\b", r"\bwhere is .+ defined\b", r"\bhow (do i|to) (use|call|configure)\b",
+)]
+
+FAST_PROMPT = """You are EDITH, a code analysis AI. Answer the question using ONLY the code below.
+
+RULES:
+1. NEVER guess. If the code below does not answer the question, reply with exactly: NOT_ENOUGH_CONTEXT
+2. Include file names, function names, and code snippets.
+
+CODE:
+{context}
+"""
+
+
+def resolve_mode(mode: Optional[str] = None) -> str:
+    mode = (mode or ANSWER_MODE).lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown answer mode '{mode}'. Use one of: {', '.join(MODES)}")
+    return mode
+
+
+def question_shape(question: str) -> str:
+    """"multi_hop" (needs the agent), "lookup" (one retrieval) or "unknown"."""
+    text = " ".join(question.lower().split())
+    if text.count("?") > 1 or len(text.split()) > 40:
+        return "multi_hop"
+    if any(p.search(text) for p in MULTI_HOP_PATTERNS):
+        return "multi_hop"
+    if any(p.search(text) for p in LOOKUP_PATTERNS):
+        return "lookup"
+    return "unknown"
+
+
+def route(question: str, retrieval: Optional[Dict[str, Any]] = None, mode: str = "auto") -> Optional[Dict[str, str]]:
+    """
+    {"mode": "fast" | "agent", "reason"}. `retrieval` is the query_documents
+    result for the question; without it, returns None when the decision
+    depends on retrieval confidence.
+    """
+    if mode != "auto":
+        return {"mode": mode, "reason": "forced"}
+    shape = question_shape(question)
+    if shape == "multi_hop":
+        return {"mode": "agent", "reason": "multi-hop question"}
+    if retrieval is None:
+        return None
+    if not retrieval["ids"][0]:
+        return {"mode": "agent", "reason": "no retrieval results"}
+
+    info = retrieval.get("retrieval", {})
+    similarity = info.get("top_similarity") or 0.0
+    scores = retrieval.get("scores", [[]])[0]
+    if similarity < FAST_MIN_SIMILARITY:
+        return {"mode": "agent", "reason": f"low similarity {similarity:.2f}"}
+    if info.get("action") == "skip":
+        return {"mode": "fast", "reason": f"decisive dense match ({shape})"}
+    if scores and scores[0] >= FAST_MIN_RERANK_SCORE:
+        return {"mode": "fast", "reason": f"rerank score {scores[0]:.2f} ({shape})"}
+    return {"mode": "agent", "reason": f"low rerank score {scores[0]:.2f}" if scores else "no rerank score"}
+
+
+def _symbol_span(repo: str, path: str, meta: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """Full line span of the symbol a chunk belongs to (a chunk may be one part or a class header)."""
+    name = meta.get("symbol")
+    if not name or meta.get("symbol_kind") == "module":
+        return None
+    for sym in symbol_index(repo).get(name.lower(), []):
+        if sym["path"] == path and sym["symbol"] == name and sym["start_line"] == meta.get("start_line"):
+            return sym["start_line"], sym["end_line"]
+    return None
+
+
+def expand_chunk(doc: str, meta: Dict[str, Any]) -> Tuple[str, str, Tuple]:
+    """
+    (label, text, dedup key) for a retrieved chunk: the whole file if it is
+    small, else the whole symbol if the chunk is only part of it and the
+    symbol is small, else the chunk itself.
+    """
+    repo, path = meta.get("repo"), meta.get("source")
+    label = path or "unknown"
+    if not repo or not path:
+        return label, doc, (label, doc[:80])
+    full_path = absolute_path(repo, path)
+    try:
+        if os.path.getsize(full_path) <= FAST_EXPAND_CHARS:
+            with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
+                return label, f.read(), (repo, path)
+        span = _symbol_span(repo, path, meta)
+        if span and (span != (meta.get("start_line"), meta.get("end_line")) or "part" in meta):
+            with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
+                text = "".join(f.readlines()[span[0] - 1:span[1]])
+            if len(text) <= FAST_EXPAND_CHARS:
+                label = f"{path}:{span[0]}-{span[1]}"
+                return label, text, (repo, path, label, None)
+    except OSError:
+        pass
+    if meta.get("start_line"):
+        label = f"{path}:{meta['start_line']}-{meta.get('end_line', meta['start_line'])}"
+    return label, doc, (repo, path, label, meta.get("part"))
+
+
+def pack_context(results: Dict[str, Any], budget: int = FAST_CONTEXT_CHARS) -> str:
+    """Best-first retrieved chunks, expanded and deduplicated, within `budget` characters."""
+    sections, seen, used = [], set(), 0
+    for doc, meta in zip(results["documents"][0], results["metadatas"][0]):
+        meta = meta or {}
+        label, text, key = expand_chunk(doc or "", meta)
+        # A whole file already covers every chunk of it
+        if key in seen or (meta.get("repo"), meta.get("source")) in seen:
+            continue
+        seen.add(key)
+        if used + len(text) > budget:
+            if sections:
+                continue
+            text = text[:budget]
+        sections.append(f"[{label}]\n{text.rstrip()}\n")
+        used += len(text)
+    return "\n".join(sections)
+
+
+def fast_messages(question: str, context: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": FAST_PROMPT.replace("{context}", context)},
+        {"role": "user", "content": question},
+    ]
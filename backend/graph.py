@@ -1,7 +1,50 @@
 import ast
 import os
+import threading
 import networkx as nx
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+
+# Serializes read-modify-write cycles of graph files (concurrent ingest jobs)
+_graph_file_lock = threading.Lock()
+
+def node_id(repo: str, name: str) -> str:
+    """Graph node of a file or import target: names are only unique within a repo."""
+    return f"{repo}:{name}"
+
+def split_node(node: str) -> Tuple[str, str]:
+    """(repo, name) of a node ("" repo for nodes written before graphs were namespaced)."""
+    repo, sep, name = node.partition(":")
+    return (repo, name) if sep else ("", node)
+
+def extract_imports(source: str, filename: str = "<unknown>") -> Optional[List[str]]:
+    """
+    Returns the module targets imported by a python source, or None if it
+    doesn't parse. Pure function so it can run inside ingestion pool workers.
+    """
+    try:
+        tree = ast.parse(source, filename=filename)
+    except Exception:
+        return None
+
+    targets = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            # Determine the target module
+            target = None
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    target = alias.name
+            elif isinstance(node, ast.ImportFrom):
+                if node.module:
+                    target = node.module
+                    
+            if target:
+                # Naive internal resolution: if target matches a file in repo
+                # In a real system, you'd verify the file exists on disk.
+                # For now, we assume if it starts with 'backend' or similar, it's internal.
+                # Or simpler: store the edge 'rel_path -> target'
+                targets.append(target)
+    return targets
 
 class DependencyGraph:
     def __init__(self):
@@ -13,30 +56,40 @@ class DependencyGraph:
         """
         try:
             with open(file_path, "r", encoding="utf-8") as f:
-                tree = ast.parse(f.read(), filename=file_path)
+                source = f.read()
         except Exception:
+            return # Skip if read fails
+
+        targets = extract_imports(source, file_path)
+        if targets is None:
             return # Skip if parse fails
 
+        repo = os.path.basename(os.path.normpath(repo_root))
         rel_path = os.path.relpath(file_path, repo_root).replace("\\", "/")
+        self.add_imports(node_id(repo, rel_path), [node_id(repo, t) for t in targets])
+
+    def add_imports(self, rel_path: str, targets: List[str]):
+        """Adds a file node and its import edges (as returned by extract_imports)."""
         self.graph.add_node(rel_path)
-        
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.Import, ast.ImportFrom)):
-                # Determine the target module
-                target = None
-                if isinstance(node, ast.Import):
-                    for alias in node.names:
-                        target = alias.name
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module:
-                        target = node.module
-                        
-                if target:
-                    # Naive internal resolution: if target matches a file in repo
-                    # In a real system, you'd verify the file exists on disk.
-                    # For now, we assume if it starts with 'backend' or similar, it's internal.
-                    # Or simpler: store the edge 'rel_path -> target'
-                    self.graph.add_edge(rel_path, target)
+        for target in targets:
+            self.graph.add_edge(rel_path, target)
+
+    def remove_file(self, rel_path: str):
+        """Drops the outgoing import edges of a file (before re-parsing or on deletion)."""
+        if rel_path in self.graph:
+            targets = list(self.graph.successors(rel_path))
+            self.graph.remove_edges_from(list(self.graph.out_edges(rel_path)))
+            # Import targets nothing else refers to go too
+            self.graph.remove_nodes_from([n for n in targets + [rel_path] if self.graph.degree(n) == 0])
+
+    def repos(self) -> List[str]:
+        return sorted({split_node(node)[0] for node in self.graph} - {""})
+
+    def find_nodes(self, name: str, repos: Optional[List[str]] = None) -> List[str]:
+        """Nodes for a file path or module name in each of `repos` (every repo if None)."""
+        if repos is None:
+            repos = self.repos()
+        return [node_id(repo, name) for repo in repos if node_id(repo, name) in self.graph]
 
     def get_dependencies(self, file_path: str) -> List[str]:
         """Returns list of files that this file imports."""
@@ -57,8 +110,8 @@ class DependencyGraph:
         if os.path.exists(path):
             self.graph = nx.read_gml(path)
 
-    def to_mermaid(self) -> str:
-        """Converts the graph to Mermaid.js Flowchart syntax."""
+    def to_mermaid(self, repos: Optional[List[str]] = None) -> str:
+        """Converts the graph (restricted to `repos` if given) to Mermaid.js Flowchart syntax."""
         mermaid = ["graph TD"]
         
         # Add nodes (files)
@@ -67,7 +120,8 @@ class DependencyGraph:
         
         node_map = {}
         
-        for i, node in enumerate(self.graph.nodes()):
+        nodes = [n for n in self.graph.nodes() if repos is None or split_node(n)[0] in repos]
+        for i, node in enumerate(nodes):
             safe_id = f"node{i}"
             node_map[node] = safe_id
             # Escaping label
@@ -80,3 +134,25 @@ class DependencyGraph:
                 mermaid.append(f"    {node_map[u]} --> {node_map[v]}")
                 
         return "\n".join(mermaid)
+
+def apply_graph_updates(path: str, repo: str, imports: Dict[str, Optional[List[str]]], removed: List[str]) -> DependencyGraph:
+    """
+    Applies one ingest's changes to the graph file: `imports` maps every
+    re-parsed file of `repo` to its import targets (None if it didn't parse)
+    and `removed` lists its deleted files. Nodes are namespaced by repo, and
+    the file is re-read under a lock right before saving, so concurrent
+    ingests of different repos each keep their edges instead of the last
+    writer overwriting the others.
+    """
+    with _graph_file_lock:
+        dep_graph = DependencyGraph()
+        dep_graph.load(path)
+        # Nodes from before namespacing can't be attributed to a repo; re-ingests rebuild them
+        dep_graph.graph.remove_nodes_from([node for node in list(dep_graph.graph) if not split_node(node)[0]])
+        for rel_path in list(imports) + list(removed):
+            dep_graph.remove_file(node_id(repo, rel_path))
+        for rel_path, targets in imports.items():
+            if targets is not None:
+                dep_graph.add_imports(node_id(repo, rel_path), [node_id(repo, t) for t in targets])
+        dep_graph.save(path)
+    return dep_graph
@@ -1,149 +1,476 @@
 import os
 import shutil
+import threading
 import git
-from typing import List, Dict, Any
+from collections import deque
+from typing import List, Dict, Any, Optional, Iterator, Callable, Set, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from backend.manifest import RepoManifest, blob_hash, content_chunk_id
+from backend.repo_files import enumerate_repo_files, sniff_content, SkipReport, language_for, path_metadata
 
 DATA_DIR = "data"
 REPO_DIR = "data/repos"
+TMP_DIR = "data/tmp"  # Scratch space for clones, swapped into REPO_DIR when complete
 
-def clone_repo(repo_url: str) -> str:
+# One lock per repo so concurrent ingests don't update the same checkout
+_repo_locks: Dict[str, threading.Lock] = {}
+_repo_locks_guard = threading.Lock()
+
+def repo_name_from_url(repo_url: str) -> str:
+    return repo_url.rstrip("/").split("/")[-1].replace(".git", "")
+
+def _repo_lock(repo_name: str) -> threading.Lock:
+    with _repo_locks_guard:
+        return _repo_locks.setdefault(repo_name, threading.Lock())
+
+def _default_branch(repo: git.Repo) -> str:
+    try:
+        return repo.active_branch.name
+    except TypeError:
+        # Detached HEAD (a previously pinned ref): fall back to origin's default
+        try:
+            return repo.git.symbolic_ref("refs/remotes/origin/HEAD").split("/")[-1]
+        except git.GitCommandError:
+            return "main"
+
+def _update_checkout(repo: git.Repo, ref: Optional[str] = None, depth: Optional[int] = None):
+    """
+    Fetches from origin and moves the working tree in place:
+    a pinned ref/commit is checked out detached, otherwise the default
+    branch is moved to origin's tip.
+    """
+    fetch_args = [f"--depth={depth}"] if depth else []
+    if ref:
+        repo.git.fetch("origin", ref, *fetch_args)
+        repo.git.checkout("--force", "--detach", "FETCH_HEAD")
+        return
+
+    branch = _default_branch(repo)
+    repo.git.fetch("origin", branch, *fetch_args)
+    # Moves the branch to the fetched tip: a fast-forward for normal updates,
+    # and still correct for shallow checkouts or rewritten upstream history
+    repo.git.checkout("--force", "-B", branch, "FETCH_HEAD")
+
+def clone_repo(repo_url: str, ref: Optional[str] = None, depth: Optional[int] = None,
+               blobless: bool = False, fresh: bool = False) -> str:
     """
-    Clones a GitHub repository to the local data directory.
+    Clones a GitHub repository to the local data directory, or updates the
+    existing checkout in place (fetch + fast-forward) if there is one.
+
+    ref:      branch, tag or commit to pin the checkout to (default branch if None)
+    depth:    shallow clone depth for first-time clones (updates of an
+              existing checkout keep its history as it is)
+    blobless: first-time clone with --filter=blob:none (blobs fetched on checkout)
+    fresh:    discard the existing checkout and clone again
+
+    New clones are made in TMP_DIR and renamed into place, so readers of
+    data/repos/<name> never see a half-written tree.
     Returns the path to the cloned repository.
     """
     print(f"\n{'='*60}", flush=True)
     print(f"🔄 CLONING REPOSITORY", flush=True)
-    print(f"   URL: {repo_url}", flush=True)
+    print(f"   URL: {repo_url}" + (f" @ {ref}" if ref else ""), flush=True)
     print(f"{'='*60}\n", flush=True)
     
     if not os.path.exists(REPO_DIR):
         os.makedirs(REPO_DIR)
     
-    repo_name = repo_url.rstrip("/").split("/")[-1].replace(".git", "")
+    repo_name = repo_name_from_url(repo_url)
     local_path = os.path.join(REPO_DIR, repo_name)
     
-    if os.path.exists(local_path):
-        print(f"📁 Removing existing repo at {local_path}...", flush=True)
-        try:
-            shutil.rmtree(local_path)
-        except PermissionError:
-            print(f"⚠️ Could not remove (files locked), using existing...", flush=True)
-            
-    if not os.path.exists(local_path):
+    with _repo_lock(repo_name):
+        if not fresh and os.path.exists(os.path.join(local_path, ".git")):
+            print(f"🔁 Fetching latest changes into {local_path}...", flush=True)
+            try:
+                # No depth here: fetching with --depth would turn a full checkout shallow
+                _update_checkout(git.Repo(local_path), ref=ref)
+                print(f"✅ Update complete!", flush=True)
+                return local_path
+            except git.GitCommandError as e:
+                print(f"⚠️ In-place update failed ({e}), re-cloning...", flush=True)
+
+        os.makedirs(TMP_DIR, exist_ok=True)
+        tmp_path = os.path.join(TMP_DIR, f"{repo_name}-{os.getpid()}-{threading.get_ident()}")
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        clone_options = {}
+        if depth:
+            clone_options["depth"] = depth
+        if blobless:
+            clone_options["filter"] = "blob:none"
         print(f"⬇️ Cloning from GitHub (this may take a minute)...", flush=True)
-        git.Repo.clone_from(repo_url, local_path)
+        repo = git.Repo.clone_from(repo_url, tmp_path, **clone_options)
+        if ref:
+            _update_checkout(repo, ref=ref, depth=depth)
+        repo.close()
+
+        if os.path.exists(local_path):
+            print(f"📁 Replacing existing repo at {local_path}...", flush=True)
+            old_path = tmp_path + "-old"
+            try:
+                os.rename(local_path, old_path)
+            except PermissionError:
+                print(f"⚠️ Could not replace (files locked), using existing...", flush=True)
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                return local_path
+            os.rename(tmp_path, local_path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        else:
+            os.rename(tmp_path, local_path)
         print(f"✅ Clone complete!", flush=True)
     
     return local_path
 
+def git_index_hashes(repo_path: str) -> Dict[str, str]:
+    """
+    Returns {rel_path: blob_hash} for every file tracked in the git index.
+    Lets incremental ingestion detect unchanged files without reading them.
+    """
+    try:
+        output = git.Repo(repo_path).git.ls_files("-s", "-z")
+    except Exception:
+        return {}
+    hashes = {}
+    for line in output.split("\0"):
+        # "<mode> <sha> <stage>\t<path>"
+        meta, _, path = line.partition("\t")
+        parts = meta.split()
+        if len(parts) == 3:
+            hashes[path] = parts[1]
+    return hashes
+
+def git_head_commit(repo_path: str) -> Optional[str]:
+    try:
+        return git.Repo(repo_path).head.commit.hexsha
+    except Exception:
+        return None
+
 # Avoid global imports that run on startup
 from langchain_text_splitters import PythonCodeTextSplitter, RecursiveCharacterTextSplitter
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
-def process_repo(repo_path: str) -> List[Dict[str, Any]]:
-    from backend.graph import DependencyGraph  # Local import to prevent circular issues
-    
-    # Initialize graph locally for this ingestion run
-    dep_graph = DependencyGraph()
+# Number of worker processes used for reading/splitting/import extraction.
+# 1 keeps everything in the calling process.
+INGEST_WORKERS = int(os.environ.get("EDITH_INGEST_WORKERS", os.cpu_count() or 1))
+# Below this many files the pool start-up cost outweighs the gain
+PARALLEL_MIN_FILES = 100
+
+_splitters = None
+
+def _get_splitters():
+    """Splitters are built once per process (each pool worker gets its own)."""
+    global _splitters
+    if _splitters is None:
+        # 1. Code Splitter (AST-based) for Python
+        python_splitter = PythonCodeTextSplitter(
+            chunk_size=1000, 
+            chunk_overlap=200
+        )
+        # 2. Generic Splitter for others
+        generic_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000, 
+            chunk_overlap=200
+        )
+        _splitters = (python_splitter, generic_splitter)
+    return _splitters
+
+def _process_file(task):
+    """
+    Pool worker: reads, splits and extracts imports for a single file.
+    Returns plain data only (chunk texts + metadata, symbols, import targets)
+    so results can be merged in walk order by the parent, keeping chunk ids
+    deterministic.
+    """
+    from backend.graph import extract_imports
+    from backend.symbols import chunk_python_source
+
+    file_path, rel_path, ext = task
+    result = {"rel_path": rel_path, "ext": ext, "chunks": [], "chunk_meta": [], "symbols": [],
+              "imports": None, "error": None, "skipped": None}
+    try:
+        with open(file_path, "rb") as f:
+            raw = f.read()
+
+        # 0. Drop binaries and minified bundles before doing any work on them
+        result["skipped"] = sniff_content(raw)
+        if result["skipped"]:
+            return result
+        content = raw.decode("utf-8", errors="ignore")
+
+        # 1. Graph Analysis (Python only)
+        if ext == '.py':
+            result["imports"] = extract_imports(content, file_path)
+
+        if not content.strip():
+            return result
+
+        # 2. Select Splitter
+        python_splitter, generic_splitter = _get_splitters()
+        if ext == '.py':
+            # One chunk per function/class with line ranges; text splitting if it doesn't parse
+            parsed = chunk_python_source(content, file_path, splitter=python_splitter)
+            if parsed is not None:
+                chunks, result["symbols"] = parsed
+                result["chunks"] = [text for text, _ in chunks]
+                result["chunk_meta"] = [meta for _, meta in chunks]
+            else:
+                result["chunks"] = python_splitter.split_text(content)
+        else:
+            result["chunks"] = generic_splitter.split_text(content)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def _chunk_document(repo_name: str, rel_path: str, ext: str, index: int, cid: str, chunk: str,
+                    extra_meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": cid,
+        "content": chunk,
+        "metadata": {
+            "repo": repo_name,
+            "source": rel_path,
+            "chunk_index": index,
+            "language": language_for(ext),
+            **path_metadata(rel_path),
+            **extra_meta
+        }
+    }
+
+def _repoint_chunks(repo_name: str, manifest: RepoManifest, orphaned: Dict[str, str],
+                    file_paths: Dict[str, Tuple[str, str]]) -> Iterator[Dict[str, Any]]:
+    """
+    Re-yields deduplicated chunks whose owner file no longer contains them,
+    with the metadata of their new owner (the upsert overwrites the stored copy).
+    """
+    by_owner: Dict[str, Set[str]] = {}
+    for cid, owner in orphaned.items():
+        by_owner.setdefault(owner, set()).add(cid)
+    for owner, cids in sorted(by_owner.items()):
+        if owner not in file_paths:
+            continue
+        file_path, ext = file_paths[owner]
+        result = _process_file((file_path, owner, ext))
+        if result["error"] or result["skipped"]:
+            continue
+        chunk_meta = result["chunk_meta"] or [{}] * len(result["chunks"])
+        for i, (chunk, extra_meta) in enumerate(zip(result["chunks"], chunk_meta)):
+            cid = content_chunk_id(repo_name, chunk)
+            if cid in cids:
+                cids.discard(cid)
+                manifest.owners[cid] = owner
+                yield _chunk_document(repo_name, owner, ext, i, cid, chunk, extra_meta)
+
+def _emit(on_event: Optional[Callable], kind: str, message: str, **data):
+    """Logs a progress message and forwards it as a structured event (e.g. to an ingest job)."""
+    print(message, flush=True)
+    if on_event is not None:
+        on_event(kind, message.strip(), data)
+
+def _map_files(tasks, workers: int):
+    """
+    Yields _process_file results in task order. `tasks` may be a lazy
+    iterable; at most workers * 4 files are in flight at once, so memory
+    stays bounded however large the repository is.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield _process_file(task)
+        return
+
+    print(f"⚙️ Chunking with {workers} worker processes", flush=True)
+    max_in_flight = workers * 4
+    # "spawn", not fork: the pool is started while the embed thread (torch /
+    # tokenizers thread pools) is running, and forking a multithreaded process
+    # can deadlock the children on locks held by those threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_process_file, task))
+            if len(pending) >= max_in_flight:
+                # Popping in submission order keeps the merge deterministic
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def process_repo(repo_path: str, manifest: Optional[RepoManifest] = None, incremental: bool = False,
+                 workers: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     Walks the repository, reads text files, and chunks them.
     Also builds the dependency graph.
+    Materializes iter_repo_documents(); the streaming ingest in
+    backend.pipeline consumes the generator directly instead.
+    """
+    return list(iter_repo_documents(repo_path, manifest=manifest, incremental=incremental, workers=workers))
+
+def iter_repo_documents(repo_path: str, manifest: Optional[RepoManifest] = None, incremental: bool = False,
+                        workers: Optional[int] = None, progress: Optional[Dict[str, Any]] = None,
+                        on_event: Optional[Callable] = None) -> Iterator[Dict[str, Any]]:
     """
+    Generator form of process_repo: yields chunk documents as soon as their
+    file has been split. The dependency graph (and manifest bookkeeping) is
+    finalized once the generator is exhausted.
+
+    If a manifest is given, every file's blob hash and chunk ids are recorded
+    in it. With incremental=True, files whose hash matches the manifest are
+    skipped, so only added/modified files are yielded for embedding; chunks
+    no file references any more are collected in manifest.stale_ids.
+
+    Chunk ids are content-addressed: a chunk whose text was already yielded
+    in this run (or, incrementally, is already stored) is not yielded again,
+    only referenced from the manifest. A stored duplicate whose metadata
+    pointed at a file that was deleted or no longer contains it is yielded
+    again at the end with the metadata of a file that still does.
+
+    Reading, splitting and import extraction run on a process pool of
+    `workers` processes (default INGEST_WORKERS). If a progress dict (see
+    backend.pipeline.new_progress) is given, its walk/chunk counters are
+    updated as files go through; on_event(kind, message, data) receives the
+    progress log lines as structured events.
+    """
+    from backend.graph import apply_graph_updates  # Local import to prevent circular issues
+    
+    repo_name = os.path.basename(os.path.normpath(repo_path))
+    workers = INGEST_WORKERS if workers is None else workers
+    graph_path = os.path.join(DATA_DIR, "dependency_graph.gml")
+    # Import targets of every re-parsed Python file; merged into the shared graph at the end
+    graph_imports: Dict[str, Optional[List[str]]] = {}
+    index_hashes = git_index_hashes(repo_path) if manifest is not None else {}
     print(f"\n{'='*60}", flush=True)
     print(f"📂 PROCESSING REPOSITORY: {repo_path}", flush=True)
     print(f"{'='*60}\n", flush=True)
-    
-    documents = []
-    
-    # 1. Code Splitter (AST-based) for Python
-    python_splitter = PythonCodeTextSplitter(
-        chunk_size=1000, 
-        chunk_overlap=200
-    )
-    # 2. Generic Splitter for others
-    generic_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000, 
-        chunk_overlap=200
-    )
-
-    exclude_dirs = {'.git', 'venv', '__pycache__', 'node_modules', '.idea', '.vscode', 'dist', 'build', '.tox', 'eggs', '.eggs'}
-    exclude_exts = {'.png', '.jpg', '.jpeg', '.gif', '.ico', '.pdf', '.exe', '.bin', '.pyc', '.whl', '.zip', '.tar', '.gz', '.lock'}
-
-    file_count = 0
+
     processed_file_count = 0
+    skipped_unchanged = 0
     chunk_count = 0
+    duplicate_count = 0
+    # Content ids already embedded (this run, plus the store when incremental)
+    emitted_ids = manifest.stored_ids() if (manifest is not None and incremental) else set()
+    yielded_ids: Set[str] = set()
 
-    # First pass: count files
-    total_files = 0
-    for root, dirs, files in os.walk(repo_path):
-        dirs[:] = [d for d in dirs if d not in exclude_dirs]
-        for file in files:
-            ext = os.path.splitext(file)[1].lower()
-            if ext not in exclude_exts:
-                total_files += 1
+    # Single pass over the git index (or one walk honouring .gitignore)
+    skip_report = SkipReport()
+    files = enumerate_repo_files(repo_path, skip_report)
+    total_files = len(files)
     
-    print(f"📊 Found {total_files} files to process\n", flush=True)
+    _emit(on_event, "walk.done", f"📊 Found {total_files} files to process ({skip_report.total} skipped by path/size)\n",
+          total_files=total_files, skipped=skip_report.total)
+    if progress is not None:
+        progress["walk"]["total_files"] = total_files
+        progress["walk"]["skipped"] = skip_report.to_dict()
+        progress["stage"] = "chunk"
+    if total_files < PARALLEL_MIN_FILES:
+        workers = 1
 
-    for root, dirs, files in os.walk(repo_path):
-        dirs[:] = [d for d in dirs if d not in exclude_dirs]
-        
-        for file in files:
-            file_count += 1
-            ext = os.path.splitext(file)[1].lower()
-            if ext in exclude_exts:
-                continue
-                
-            file_path = os.path.join(root, file)
-            rel_path = os.path.relpath(file_path, repo_path).replace("\\", "/")
+    digests = {}
+
+    def pending_tasks():
+        """Yields the files that need (re)processing."""
+        nonlocal skipped_unchanged
+        for file_path, rel_path, ext in files:
+            if progress is not None:
+                progress["walk"]["files"] += 1
             
-            try:
-                # 1. Graph Analysis (Python only)
-                if ext == '.py':
-                    dep_graph.parse_imports(file_path, repo_path)
-
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-                    
-                if not content.strip():
+            if manifest is not None:
+                try:
+                    digest = index_hashes.get(rel_path)
+                    if digest is None:
+                        with open(file_path, "rb") as f:
+                            digest = blob_hash(f.read())
+                except Exception as e:
+                    _emit(on_event, "file.error", f"❌ Error reading {rel_path}: {e}", path=rel_path, error=str(e))
+                    continue
+                if incremental and manifest.is_unchanged(rel_path, digest):
+                    skipped_unchanged += 1
+                    if progress is not None:
+                        progress["walk"]["unchanged"] += 1
                     continue
+                digests[rel_path] = digest
 
-                # 2. Select Splitter
-                if ext == '.py':
-                    chunks = python_splitter.split_text(content)
-                else:
-                    chunks = generic_splitter.split_text(content)
-                
-                for i, chunk in enumerate(chunks):
-                    documents.append({
-                        "id": f"{rel_path}:{i}",
-                        "content": chunk,
-                        "metadata": {
-                            "source": rel_path,
-                            "chunk_index": i,
-                            "language": "python" if ext == '.py' else "text"
-                        }
-                    })
-                processed_file_count += 1
-                chunk_count += len(chunks)
-                
-                # Progress logging every 20 files
-                if processed_file_count % 20 == 0:
-                    print(f"📄 Processed {processed_file_count}/{total_files} files ({chunk_count} chunks)...", flush=True)
-                    
-            except Exception as e:
-                print(f"❌ Error reading {rel_path}: {e}", flush=True)
-
-    # Save Graph
-    graph_path = os.path.join(DATA_DIR, "dependency_graph.gml")
-    dep_graph.save(graph_path)
-    print(f"\n📊 Dependency Graph saved ({dep_graph.graph.number_of_nodes()} nodes, {dep_graph.graph.number_of_edges()} edges)", flush=True)
+            yield (file_path, rel_path, ext)
+
+    for result in _map_files(pending_tasks(), workers):
+        rel_path = result["rel_path"]
+        ext = result["ext"]
+        if result["error"]:
+            digests.pop(rel_path, None)
+            _emit(on_event, "file.error", f"❌ Error reading {rel_path}: {result['error']}", path=rel_path, error=result["error"])
+            continue
+        if result["skipped"]:
+            skip_report.add(result["skipped"], rel_path)
+            if progress is not None:
+                progress["walk"]["skipped"] = skip_report.to_dict()
+            if manifest is not None:
+                manifest.record(rel_path, digests.pop(rel_path), [])
+            continue
+
+        if ext == '.py':
+            graph_imports[rel_path] = result["imports"]
+
+        chunks = result["chunks"]
+        ids = [content_chunk_id(repo_name, chunk) for chunk in chunks]
+        if manifest is not None:
+            manifest.record(rel_path, digests.pop(rel_path), ids, symbols=result["symbols"])
+        if progress is not None:
+            progress["chunk"]["files"] += 1
+            progress["chunk"]["chunks"] += len(chunks)
+        if not chunks:
+            continue
+        processed_file_count += 1
+        chunk_count += len(chunks)
+
+        chunk_meta = result["chunk_meta"] or [{}] * len(chunks)
+        for i, (cid, chunk, extra_meta) in enumerate(zip(ids, chunks, chunk_meta)):
+            # A stored chunk owned by this (changed) file is upserted again: its
+            # line numbers and chunk index may have moved even though its text did not
+            refresh = manifest is not None and manifest.owners.get(cid) == rel_path and cid not in yielded_ids
+            if cid in emitted_ids and not refresh:
+                duplicate_count += 1
+                if progress is not None:
+                    progress["chunk"]["duplicates"] += 1
+                continue
+            emitted_ids.add(cid)
+            yielded_ids.add(cid)
+            if manifest is not None:
+                manifest.owners[cid] = rel_path
+            yield _chunk_document(repo_name, rel_path, ext, i, cid, chunk, extra_meta)
+        
+        # Progress logging every 20 files
+        if processed_file_count % 20 == 0:
+            _emit(on_event, "chunk.progress", f"📄 Processed {processed_file_count}/{total_files} files ({chunk_count} chunks)...",
+                  files=processed_file_count, total_files=total_files, chunks=chunk_count)
+
+    removed_files = []
+    repointed_count = 0
+    if manifest is not None:
+        removed_files = manifest.finalize()
+        manifest.commit = git_head_commit(repo_path)
+        orphaned = manifest.orphaned_chunks()
+        if orphaned:
+            file_paths = {rel_path: (file_path, ext) for file_path, rel_path, ext in files}
+            for doc in _repoint_chunks(repo_name, manifest, orphaned, file_paths):
+                repointed_count += 1
+                yield doc
+            _emit(on_event, "chunk.repointed", f"🔁 Re-pointed {repointed_count} shared chunks at files that still contain them",
+                  chunks=repointed_count)
+
+    # Save Graph (merged into the current file, other repos' edges are kept)
+    dep_graph = apply_graph_updates(graph_path, repo_name, graph_imports, removed_files)
+    _emit(on_event, "graph.saved", f"\n📊 Dependency Graph saved ({dep_graph.graph.number_of_nodes()} nodes, {dep_graph.graph.number_of_edges()} edges)",
+          nodes=dep_graph.graph.number_of_nodes(), edges=dep_graph.graph.number_of_edges())
     
     print(f"\n{'='*60}", flush=True)
     print(f"✅ CHUNKING COMPLETE!", flush=True)
     print(f"   Files processed: {processed_file_count}", flush=True)
-    print(f"   Chunks generated: {chunk_count}", flush=True)
-    print(f"{'='*60}", flush=True)
-    print(f"\n⏳ Now embedding chunks (this takes time on first run)...\n", flush=True)
-    
-    return documents
-
+    print(f"   Chunks generated: {chunk_count} ({duplicate_count} duplicates not re-embedded)", flush=True)
+    print(f"   Files skipped: {skip_report.total} {skip_report.counts}", flush=True)
+    if incremental:
+        print(f"   Unchanged files skipped: {skipped_unchanged}", flush=True)
+        print(f"   Removed files: {len(removed_files)}", flush=True)
+    print(f"{'='*60}\n", flush=True)
+    if on_event is not None:
+        on_event("chunk.done", "Chunking complete", {
+            "files": processed_file_count, "chunks": chunk_count, "duplicates": duplicate_count,
+            "skipped": dict(skip_report.counts),
+            "unchanged": skipped_unchanged, "removed": len(removed_files), "repointed": repointed_count})
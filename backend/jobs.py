@@ -0,0 +1,331 @@
+"""
+Background ingestion jobs.
+
+POST /ingest enqueues an IngestJob and returns its id immediately. Jobs run
+clone → streaming pipeline on a bounded thread pool (INGEST_CONCURRENCY jobs
+at a time), keep a ring of structured progress events, report stage, percent
+done and throughput via GET /ingest/jobs/{id}, and can be cancelled.
+
+A job runs in the worker process that accepted it, but its snapshots are
+persisted to SQLite (data/ingest_jobs.sqlite) on every event and on a
+heartbeat, so any uvicorn worker can report it. Cancelling from another
+worker sets a flag the owning worker picks up at its next write. A job whose
+heartbeat stops (its process died) is reported as "lost".
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from backend.pipeline import new_progress, ingest_streaming, IngestCancelled
+
+# Max ingest jobs running at once (further jobs wait in the queue)
+INGEST_CONCURRENCY = int(os.environ.get("EDITH_INGEST_CONCURRENCY", 2))
+MAX_EVENTS = 200          # Events kept per job
+MAX_FINISHED_JOBS = 50    # Finished jobs kept for inspection
+JOBS_DB_PATH = "data/ingest_jobs.sqlite"
+PERSIST_INTERVAL = 1.0    # Min seconds between snapshot writes triggered by events
+HEARTBEAT_INTERVAL = 5.0  # Active jobs are re-persisted this often even without events
+LOST_AFTER = 60.0         # An active job not persisted for this long belongs to a dead process
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Jobs owned by this process (the ones it runs)
+_jobs: Dict[str, "IngestJob"] = {}
+_jobs_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_store: Optional["JobStore"] = None
+_store_lock = threading.Lock()
+_heartbeat: Optional[threading.Thread] = None
+
+
+class IngestJob:
+    def __init__(self, repo_url: str, repo_name: str, options: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:12]
+        self.repo_url = repo_url
+        self.repo_name = repo_name
+        self.options = options
+        self.status = "queued"
+        self.progress = new_progress()
+        self.progress["stage"] = "queued"
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.cancel_event = threading.Event()
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self._persisted_at = 0.0
+
+    def emit(self, kind: str, message: str, data: Optional[Dict[str, Any]] = None):
+        self.events.append({"ts": time.time(), "type": kind, "message": message, **(data or {})})
+        self.persist()
+
+    def persist(self, force: bool = False):
+        """Writes the snapshot to the job store (throttled unless forced) and picks up remote cancellation."""
+        now = time.time()
+        if not force and now - self._persisted_at < PERSIST_INTERVAL:
+            return
+        self._persisted_at = now
+        try:
+            if get_store().save(self) and self.status in ACTIVE_STATUSES:
+                self.cancel_event.set()
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not persist ingest job {self.id}: {e}", flush=True)
+
+    def percent(self) -> float:
+        if self.status == "succeeded":
+            return 100.0
+        walk = self.progress["walk"]
+        total = walk["total_files"]
+        if not total:
+            return 0.0
+        done_files = walk["unchanged"] + self.progress["chunk"]["files"]
+        # Duplicate chunks are never embedded, so they don't count towards the upsert target
+        chunked = self.progress["chunk"]["chunks"] - self.progress["chunk"]["duplicates"]
+        # Chunking dominates the file count; embedding/upserting lag a few batches behind it
+        upserted = self.progress["upsert"]["chunks"] / chunked if chunked else 1.0
+        return round(min(99.0, 100.0 * min(done_files / total, 1.0) * min(upserted, 1.0)), 1)
+
+    def snapshot(self, events: int = 20) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.id,
+            "repo_url": self.repo_url,
+            "repo_name": self.repo_name,
+            "status": self.status,
+            "created_at": self.created_at,
+            "stage": self.progress["stage"],
+            "percent": self.percent(),
+            "elapsed_s": round(elapsed, 1),
+            "throughput": {
+                "files_per_s": round(self.progress["chunk"]["files"] / elapsed, 2) if elapsed else 0.0,
+                "chunks_per_s": round(self.progress["upsert"]["chunks"] / elapsed, 2) if elapsed else 0.0,
+            },
+            "stages": {stage: self.progress[stage] for stage in ("walk", "chunk", "embed", "upsert")},
+            "options": self.options,
+            "error": self.error,
+            "result": self.result,
+            "events": list(self.events)[-events:] if events else [],
+        }
+
+
+class JobStore:
+    """Job snapshots shared by every worker process (one row per job)."""
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, repo_name TEXT, status TEXT, created_at REAL,
+                                             updated_at REAL, cancel_requested INTEGER DEFAULT 0, snapshot TEXT);
+            CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs(created_at);
+        """)
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def save(self, job: "IngestJob") -> bool:
+        """Stores the job's snapshot. Returns True if another worker requested cancellation."""
+        snapshot = job.snapshot(events=MAX_EVENTS)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, repo_name, status, created_at, updated_at, snapshot) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, "
+                "snapshot = excluded.snapshot",
+                (job.id, job.repo_name, job.status, job.created_at, time.time(), json.dumps(snapshot)))
+            row = self._db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job.id,)).fetchone()
+            self._db.commit()
+        return bool(row and row[0])
+
+    @staticmethod
+    def _snapshot(row, events: int) -> Dict[str, Any]:
+        snapshot = json.loads(row[0])
+        if snapshot["status"] in ACTIVE_STATUSES and time.time() - row[1] > LOST_AFTER:
+            snapshot["status"] = "lost"
+            snapshot["error"] = snapshot.get("error") or "The worker process running this job stopped"
+        snapshot["events"] = snapshot["events"][-events:] if events else []
+        return snapshot
+
+    def get(self, job_id: str, events: int = 20) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT snapshot, updated_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._snapshot(row, events) if row else None
+
+    def list(self, limit: int = MAX_FINISHED_JOBS * 2) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("SELECT snapshot, updated_at FROM jobs ORDER BY created_at DESC LIMIT ?",
+                                    (limit,)).fetchall()
+        return [self._snapshot(row, 0) for row in rows]
+
+    def active_for_repo(self, repo_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("SELECT snapshot, updated_at FROM jobs WHERE repo_name = ? AND status IN (?, ?)",
+                                    (repo_name, *ACTIVE_STATUSES)).fetchall()
+        active = [s for s in (self._snapshot(row, 0) for row in rows) if s["status"] in ACTIVE_STATUSES]
+        return active[0] if active else None
+
+    def request_cancel(self, job_id: str):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            self._db.commit()
+
+    def prune(self, keep: int = MAX_FINISHED_JOBS):
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM jobs WHERE status NOT IN (?, ?) AND id NOT IN "
+                "(SELECT id FROM jobs WHERE status NOT IN (?, ?) ORDER BY updated_at DESC LIMIT ?)",
+                (*ACTIVE_STATUSES, *ACTIVE_STATUSES, keep))
+            self._db.commit()
+
+
+def get_store() -> JobStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = JobStore()
+    return _store
+
+
+def _heartbeat_loop():
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        with _jobs_lock:
+            active = [j for j in _jobs.values() if j.status in ACTIVE_STATUSES]
+        for job in active:
+            job.persist(force=True)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _heartbeat
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=INGEST_CONCURRENCY, thread_name_prefix="ingest-job")
+        _heartbeat = threading.Thread(target=_heartbeat_loop, name="ingest-job-heartbeat", daemon=True)
+        _heartbeat.start()
+    return _executor
+
+
+def _prune_finished():
+    finished = [j for j in _jobs.values() if j.status not in ACTIVE_STATUSES]
+    finished.sort(key=lambda j: j.finished_at or 0)
+    for job in finished[:-MAX_FINISHED_JOBS]:
+        del _jobs[job.id]
+    get_store().prune()
+
+
+def _run(job: IngestJob):
+    from backend.ingestion import clone_repo
+    from backend.manifest import RepoManifest
+
+    if job.cancel_event.is_set():
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        job.persist(force=True)
+        return
+
+    job.status = "running"
+    job.started_at = time.time()
+    job.persist(force=True)
+    opts = job.options
+    try:
+        job.progress["stage"] = "clone"
+        job.emit("clone.start", f"Cloning {job.repo_url}")
+        repo_path = clone_repo(job.repo_url, ref=opts.get("ref"), depth=opts.get("depth"),
+                               blobless=opts.get("blobless", False), fresh=opts.get("fresh", False))
+        job.emit("clone.done", f"Checkout ready at {repo_path}")
+        if job.cancel_event.is_set():
+            raise IngestCancelled()
+
+        manifest = RepoManifest.load(job.repo_name)
+        progress = ingest_streaming(job.repo_name, repo_path, manifest=manifest,
+                                    incremental=opts.get("incremental", False), workers=opts.get("workers"),
+                                    progress=job.progress, cancel_event=job.cancel_event, on_event=job.emit)
+        manifest.save()
+
+        chunks_count = progress["upsert"]["chunks"]
+        job.result = {
+            "message": f"Ingested {chunks_count} chunks from {job.repo_url}",
+            "chunks_count": chunks_count,
+            "deleted_chunks": progress["upsert"]["deleted"],
+            "repo_name": job.repo_name,
+        }
+        job.status = "succeeded"
+        job.emit("job.succeeded", job.result["message"])
+    except IngestCancelled:
+        job.status = "cancelled"
+        job.emit("job.cancelled", "Ingest cancelled")
+    except Exception as e:
+        traceback.print_exc()
+        job.status = "failed"
+        job.error = str(e)
+        job.emit("job.failed", f"Ingest failed: {e}")
+    finally:
+        job.finished_at = time.time()
+        job.persist(force=True)
+        with _jobs_lock:
+            _prune_finished()
+
+
+def submit_ingest(repo_url: str, repo_name: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Queues an ingest of repo_url and returns the job snapshot. If that repo
+    already has a queued or running job (in any worker), that job is
+    returned instead of starting a second one.
+    """
+    with _jobs_lock:
+        for job in _jobs.values():
+            if job.repo_name == repo_name and job.status in ACTIVE_STATUSES:
+                return job.snapshot(events=0)
+        existing = get_store().active_for_repo(repo_name)
+        if existing is not None:
+            return existing
+        job = IngestJob(repo_url, repo_name, options)
+        _jobs[job.id] = job
+    job.emit("job.queued", f"Queued ingest of {repo_url}")
+    _get_executor().submit(_run, job)
+    return job.snapshot(events=0)
+
+
+def get_job(job_id: str, events: int = 20) -> Optional[Dict[str, Any]]:
+    """Snapshot of a job, live if this process runs it, else as last persisted by its worker."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is not None:
+        return job.snapshot(events=events)
+    return get_store().get(job_id, events=events)
+
+
+def list_jobs() -> List[Dict[str, Any]]:
+    with _jobs_lock:
+        local = {job.id: job.snapshot(events=0) for job in _jobs.values()}
+    persisted = [s for s in get_store().list() if s["job_id"] not in local]
+    return sorted(list(local.values()) + persisted, key=lambda s: s["created_at"], reverse=True)
+
+
+def cancel_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Requests cancellation; a queued job never starts, a running one stops at
+    the next batch. Jobs of other workers are flagged in the store and stop
+    once their worker next persists them.
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is not None:
+        if job.status in ACTIVE_STATUSES:
+            job.cancel_event.set()
+            job.emit("job.cancel_requested", "Cancellation requested")
+        return {"job_id": job.id, "status": job.status, "cancel_requested": job.cancel_event.is_set()}
+    snapshot = get_store().get(job_id)
+    if snapshot is None:
+        return None
+    if snapshot["status"] in ACTIVE_STATUSES:
+        get_store().request_cancel(job_id)
+    return {"job_id": job_id, "status": snapshot["status"], "cancel_requested": snapshot["status"] in ACTIVE_STATUSES}
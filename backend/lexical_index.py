@@ -0,0 +1,167 @@
+"""
+BM25 lexical index over code chunks (SQLite FTS5).
+
+Dense retrieval is weak on exact identifiers, error strings and config keys.
+This index stores every chunk's tokens, with identifiers kept whole *and*
+split on camelCase / snake_case ("getUserById" -> getuserbyid get user by id),
+so both `MAX_FILE_BYTES` and "max file bytes" find the same chunk.
+
+vector_store keeps it in sync with the Chroma collection: every upsert and
+delete goes to both, keyed by chunk id. query_documents fuses its hits with
+the dense candidates (reciprocal-rank fusion) before reranking.
+
+Rebuild from an existing collection (e.g. ingested before this index existed):
+    python -m backend.lexical_index --rebuild
+"""
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+LEXICAL_DB_PATH = "data/lexical_index.sqlite"
+MAX_QUERY_TERMS = 32
+
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def split_identifier(word: str) -> List[str]:
+    """Sub-words of an identifier: snake_case and camelCase parts, lowercased."""
+    parts = []
+    for piece in word.split("_"):
+        parts.extend(p.lower() for p in _CAMEL_RE.findall(piece))
+    return parts
+
+
+def tokenize(text: str) -> List[str]:
+    """Whole identifiers plus their parts (when they differ), lowercased."""
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        whole = word.lower().strip("_")
+        if not whole:
+            continue
+        tokens.append(whole)
+        parts = split_identifier(word)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def _rowid(chunk_id: str) -> int:
+    # Stable 60-bit rowid per chunk id, so deletes don't need a lookup table
+    return int(hashlib.sha1(chunk_id.encode()).hexdigest()[:15], 16)
+
+
+class LexicalIndex:
+    def __init__(self, path: str = LEXICAL_DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(chunks)")]
+        if columns and "source" not in columns:
+            # Created before path/language filters existed
+            print("⚠️ Lexical index layout changed - re-ingest or run `python -m backend.lexical_index --rebuild`", flush=True)
+            self._db.execute("DROP TABLE chunks")
+        # tokenchars '_' keeps snake_case identifiers whole; their parts are indexed separately
+        self._db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+            "terms, chunk_id UNINDEXED, repo UNINDEXED, source UNINDEXED, language UNINDEXED, "
+            "tokenize = \"unicode61 tokenchars '_'\")"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def upsert(self, documents: List[Dict[str, Any]]):
+        if not documents:
+            return
+        rows = [(_rowid(d["id"]), " ".join(tokenize(d["content"])), d["id"], d["metadata"].get("repo", ""),
+                 d["metadata"].get("source", ""), d["metadata"].get("language", "")) for d in documents]
+        with self._lock:
+            self._db.executemany("DELETE FROM chunks WHERE rowid = ?", [(r[0],) for r in rows])
+            self._db.executemany("INSERT INTO chunks (rowid, terms, chunk_id, repo, source, language) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def delete(self, ids: List[str]):
+        if not ids:
+            return
+        with self._lock:
+            self._db.executemany("DELETE FROM chunks WHERE rowid = ?", [(_rowid(i),) for i in ids])
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM chunks")
+            self._db.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def search(self, query: str, n_results: int = 20, repos: Optional[List[str]] = None,
+               path_prefix: Optional[str] = None, languages: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """
+        [(chunk_id, bm25 score)] best first (FTS5 scores are negative: lower is better,
+        they are returned negated so that higher is better).
+        Optionally restricted to repos, a path prefix (directory or file) and languages.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        if not terms or (repos is not None and not repos):
+            return []
+        match = " OR ".join(f'"{t}"' for t in terms)
+        sql = "SELECT chunk_id, bm25(chunks) AS score FROM chunks WHERE chunks MATCH ?"
+        params: List[Any] = [match]
+        if repos is not None:
+            sql += f" AND repo IN ({','.join('?' * len(repos))})"
+            params.extend(repos)
+        if path_prefix:
+            # Case-sensitive like the dense dir1..dirN filter (LIKE ignores ASCII case)
+            prefix = path_prefix.strip().strip("/")
+            sql += " AND (source = ? OR substr(source, 1, ?) = ?)"
+            params.extend([prefix, len(prefix) + 1, prefix + "/"])
+        if languages:
+            sql += f" AND language IN ({','.join('?' * len(languages))})"
+            params.extend(languages)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(n_results)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [(chunk_id, -score) for chunk_id, score in rows]
+
+
+def get_lexical_index() -> LexicalIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LexicalIndex()
+    return _index
+
+
+def rebuild_from_collection(batch_size: int = 1000) -> int:
+    """Re-indexes every chunk stored in the vector collection. Returns the chunk count."""
+    from backend.vector_store import get_collection
+
+    collection = get_collection()
+    index = get_lexical_index()
+    total = collection.count()
+    index.clear()
+    for offset in range(0, total, batch_size):
+        batch = collection.get(offset=offset, limit=batch_size, include=["documents", "metadatas"])
+        index.upsert([{"id": i, "content": doc or "", "metadata": meta or {}}
+                      for i, doc, meta in zip(batch["ids"], batch["documents"], batch["metadatas"])])
+        print(f"Indexed {min(offset + batch_size, total)}/{total} chunks", flush=True)
+    return total
+
+
+if __name__ == "__main__":
+    import sys
+    if "--rebuild" in sys.argv:
+        print(f"✅ Lexical index rebuilt: {rebuild_from_collection()} chunks")
+    else:
+        print(f"{get_lexical_index().count()} chunks in {LEXICAL_DB_PATH} (use --rebuild to re-index)")
@@ -2,8 +2,11 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from fastapi import FastAPI, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from backend.ingestion import clone_repo, process_repo, DATA_DIR
+from typing import Optional
+from backend.ingestion import repo_name_from_url, DATA_DIR
 from backend import hr_processing
 from backend.graph import DependencyGraph
 from backend.auth import (
@@ -12,9 +15,17 @@ from backend.auth import (
     LoginRequest, LoginResponse, load_users, save_users
 )
 import os
+import json
 
 app = FastAPI(title="EDITH Backend")
 
+@app.on_event("startup")
+def warm_models():
+    """Optionally load the embedding/reranker models before serving (EDITH_WARMUP=1)."""
+    if os.environ.get("EDITH_WARMUP", "0") == "1":
+        from backend.models import warm_up
+        warm_up()
+
 # Enable CORS for frontend
 from fastapi.middleware.cors import CORSMiddleware
 app.add_middleware(
@@ -151,41 +162,77 @@ def get_status():
     except:
         return {"ingested": False, "chunks_count": 0}
 
+@app.get("/models")
+def get_models(user: dict = Depends(require_role(Role.ADMIN))):
+    """Admin only: Models loaded in this worker, with load time and weight memory."""
+    from backend.models import model_stats, embedding_model_key
+    from backend.embedding_cache import get_embedding_cache
+    from backend.rerank_service import get_rerank_service
+    from backend.rerank_policy import decision_stats
+    from backend.reasoning import agent_stats
+    return {
+        "models": model_stats(),
+        "embedding_cache": get_embedding_cache(embedding_model_key()).stats(),
+        "reranker_batching": get_rerank_service().stats(),
+        "rerank_decisions": decision_stats(),
+        "agent": agent_stats(),
+    }
+
+@app.get("/cache/stats")
+def get_cache_stats(user: dict = Depends(require_role(Role.ADMIN))):
+    """Admin only: Answer cache size and hit/miss counters (shared by all workers), and this worker's tool-result cache."""
+    from backend.answer_cache import get_answer_cache
+    from backend.tool_cache import get_tool_cache
+    return {**get_answer_cache().stats(), "tool_results": get_tool_cache().stats()}
+
+@app.delete("/cache")
+def clear_answer_cache(user: dict = Depends(require_role(Role.ADMIN))):
+    """Admin only: Drops every cached answer (and this worker's cached tool results)."""
+    from backend.reasoning import clear_cache
+    clear_cache()
+    return {"status": "cleared"}
+
 # ==================== CODE DOMAIN (Admin + Assigned Employees) ====================
 class IngestRequest(BaseModel):
     repo_url: str
     force: bool = False
+    incremental: bool = False  # Only re-embed files changed since the last ingest
+    workers: Optional[int] = None  # Chunking processes (default: EDITH_INGEST_WORKERS)
+    ref: Optional[str] = None  # Branch, tag or commit to pin (default branch if omitted)
+    depth: Optional[int] = None  # Shallow clone depth for first-time clones
+    blobless: bool = False  # First-time clone with --filter=blob:none
+    fresh: bool = False  # Discard the existing checkout and clone again
 
 @app.post("/ingest")
 def ingest_repo(request: IngestRequest, user: dict = Depends(require_role(Role.ADMIN))):
-    """Admin only: Ingest a repository."""
+    """Admin only: Queue a repository ingest. Returns a job id immediately."""
     try:
-        from backend.vector_store import get_collection, add_documents
+        from backend.vector_store import get_collection
+        from backend.jobs import submit_ingest
+        from backend.manifest import RepoManifest
+        
+        # Extract repo name for assignment tracking
+        repo_name = repo_name_from_url(request.repo_url)
         
-        if not request.force:
+        if not request.force and not request.incremental:
             try:
+                # Only this repo counts: other repos in the collection don't make it "already ingested"
                 collection = get_collection()
-                existing_count = collection.count()
-                if existing_count > 0:
+                if collection.get(where={"repo": repo_name}, limit=1, include=["metadatas"])["ids"]:
+                    existing_count = len(RepoManifest.load(repo_name).referenced_ids())
                     return {
                         "status": "skipped",
-                        "message": f"Already ingested ({existing_count} chunks). Use force=true to re-ingest.",
+                        "message": f"{repo_name} already ingested ({existing_count} chunks). Use force=true or incremental=true to re-ingest.",
                         "chunks_count": existing_count
                     }
             except:
                 pass
         
-        repo_path = clone_repo(request.repo_url)
-        documents = process_repo(repo_path)
-        add_documents(documents)
-        
-        # Extract repo name for assignment tracking
-        repo_name = request.repo_url.rstrip("/").split("/")[-1].replace(".git", "")
-        
+        job = submit_ingest(request.repo_url, repo_name, request.model_dump(exclude={"repo_url", "force"}))
         return {
-            "status": "success",
-            "message": f"Ingested {len(documents)} chunks from {request.repo_url}",
-            "chunks_count": len(documents),
+            "status": job["status"],
+            "message": f"Ingest of {request.repo_url} queued (job {job['job_id']})",
+            "job_id": job["job_id"],
             "repo_name": repo_name
         }
     except Exception as e:
@@ -193,6 +240,30 @@ def ingest_repo(request: IngestRequest, user: dict = Depends(require_role(Role.A
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/ingest/jobs")
+def list_ingest_jobs(user: dict = Depends(require_role(Role.ADMIN))):
+    """Admin only: List queued, running and recently finished ingest jobs."""
+    from backend.jobs import list_jobs
+    return {"jobs": list_jobs()}
+
+@app.get("/ingest/jobs/{job_id}")
+def get_ingest_job(job_id: str, events: int = 20, user: dict = Depends(require_role(Role.ADMIN))):
+    """Admin only: Stage, percent done, throughput and recent events of an ingest job."""
+    from backend.jobs import get_job
+    job = get_job(job_id, events=events)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return job
+
+@app.post("/ingest/jobs/{job_id}/cancel")
+def cancel_ingest_job(job_id: str, user: dict = Depends(require_role(Role.ADMIN))):
+    """Admin only: Cancel a queued or running ingest job."""
+    from backend.jobs import cancel_job
+    job = cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return job
+
 @app.get("/graph")
 def get_graph(user: dict = Depends(get_current_user)):
     """Get dependency graph (Admin or assigned Employee)."""
@@ -200,30 +271,70 @@ def get_graph(user: dict = Depends(get_current_user)):
     dg = DependencyGraph()
     if os.path.exists(graph_path):
         dg.load(graph_path)
-        return {"mermaid": dg.to_mermaid()}
+        return {"mermaid": dg.to_mermaid(repos=query_scope(user))}
     return {"mermaid": "graph TD; A[No Graph Found]"}
 
 class QueryRequest(BaseModel):
     question: str
+    mode: Optional[str] = None  # "auto" (default), "fast" (single retrieval + one LLM call) or "agent"
+
+def query_scope(user: dict):
+    """Employees only search their assigned repos; everyone else searches all repos (None)."""
+    if user["role"] != Role.EMPLOYEE.value:
+        return None
+    repos = get_assigned_repos(user["email"])
+    if not repos:
+        raise HTTPException(status_code=403, detail="No repositories assigned to you. Contact admin.")
+    return repos
+
+def query_mode(request: QueryRequest) -> str:
+    from backend.fast_path import resolve_mode
+    try:
+        return resolve_mode(request.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/query")
-def query_repo(request: QueryRequest, user: dict = Depends(get_current_user)):
-    """Query codebase (Admin or assigned Employee)."""
-    # Check if employee has access to any repos
-    if user["role"] == Role.EMPLOYEE.value:
-        assigned = get_assigned_repos(user["email"])
-        if not assigned:
-            raise HTTPException(status_code=403, detail="No repositories assigned to you. Contact admin.")
+async def query_repo(request: QueryRequest, user: dict = Depends(get_current_user)):
+    """
+    Query codebase (Admin or assigned Employee). Async: the request waits on
+    Groq without holding a threadpool slot (limits in backend/reasoning.py).
+    """
+    repos = await run_in_threadpool(query_scope, user)
+    mode = query_mode(request)
     
     try:
-        from backend.reasoning import answer_question
-        answer = answer_question(request.question)
+        from backend.reasoning import answer_question_async
+        answer = await answer_question_async(request.question, repos=repos, mode=mode)
         return {"answer": answer}
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/query/stream")
+async def query_repo_stream(request: QueryRequest, user: dict = Depends(get_current_user)):
+    """
+    Same as /query, streamed as Server-Sent Events: the route taken (fast
+    path or agent), step and observation events while the agent works, then the answer token by token ("token"),
+    and a final "done" event with the full answer.
+    """
+    repos = await run_in_threadpool(query_scope, user)
+    mode = query_mode(request)
+    from backend.reasoning import answer_question_stream
+    
+    async def events():
+        try:
+            async for event in answer_question_stream(request.question, repos=repos, mode=mode):
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield f"event: error\ndata: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # ==================== HR DOMAIN (HR Role Only) ====================
 class HRUploadRequest(BaseModel):
     title: str
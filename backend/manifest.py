@@ -0,0 +1,223 @@
+"""
+Per-repository ingestion manifest.
+
+Records, for every ingested file, its git blob hash and the chunk ids that
+were written to the vector store. Incremental re-ingestion compares the
+working tree against the manifest so that only added or modified files are
+re-chunked and re-embedded, and chunks of removed files are deleted.
+
+Chunk ids are content-addressed (<repo>:<sha1 of text>), so identical chunks
+(vendored code, copied config, licence headers) are embedded and stored once;
+several files can reference the same id. A chunk is only deleted when no file
+references it any more, and chunk_locations() maps each id back to every
+file it appears in. The stored copy carries the metadata (source, lines) of
+one of those files, its owner; when the owner stops containing the chunk,
+the copy is re-pointed at another file that still does.
+
+Stored as JSON under data/manifests/<repo_name>.json.
+"""
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypeVar
+
+MANIFEST_DIR = "data/manifests"
+# Bumped when the chunk id / metadata layout changes; older manifests force a full re-chunk
+MANIFEST_VERSION = 6
+
+T = TypeVar("T")
+
+
+def blob_hash(content: bytes) -> str:
+    """Git-compatible blob hash (same value as `git hash-object`)."""
+    header = f"blob {len(content)}\0".encode()
+    return hashlib.sha1(header + content).hexdigest()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def content_chunk_id(repo_name: str, text: str) -> str:
+    """Chunk ids are namespaced by repo and addressed by content, so duplicates share one id."""
+    return f"{repo_name}:{content_hash(text)}"
+
+
+def manifest_path(repo_name: str) -> str:
+    return os.path.join(MANIFEST_DIR, f"{repo_name}.json")
+
+
+def corpus_version(repos: Optional[List[str]] = None) -> str:
+    """
+    Fingerprint of the ingest state of the given repos (None = every ingested
+    repo). Every ingest rewrites the repo's manifest, so this changes whenever
+    one of them is re-ingested; answer caches key on it.
+    """
+    if repos is None:
+        try:
+            repos = [f[:-len(".json")] for f in os.listdir(MANIFEST_DIR) if f.endswith(".json")]
+        except OSError:
+            repos = []
+    parts = []
+    for repo_name in sorted(repos):
+        try:
+            parts.append(f"{repo_name}@{os.stat(manifest_path(repo_name)).st_mtime_ns}")
+        except OSError:
+            parts.append(f"{repo_name}@-")
+    return hashlib.md5("|".join(parts).encode()).hexdigest()[:16]
+
+
+class RepoManifest:
+    def __init__(self, repo_name: str):
+        self.repo_name = repo_name
+        self.commit: Optional[str] = None
+        self.updated_at: Optional[str] = None
+        # {rel_path: {"hash": str, "chunks": [chunk_id, ...]}}
+        self.files: Dict[str, Dict] = {}
+        # {chunk_id: rel_path} - the file whose metadata the stored copy of a chunk carries
+        self.owners: Dict[str, str] = {}
+        # Written by an older layout: nothing can be treated as unchanged
+        self.outdated = False
+        # Chunk ids that must be removed from the vector store (set by finalize)
+        self.stale_ids: List[str] = []
+        self._seen: Set[str] = set()
+        self._initial_ids: Set[str] = set()
+        # False on the repo's first ingest (or first since upgrading from un-namespaced chunk ids)
+        self.existed = False
+
+    @classmethod
+    def load(cls, repo_name: str) -> "RepoManifest":
+        manifest = cls(repo_name)
+        path = manifest_path(repo_name)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            manifest.commit = data.get("commit")
+            manifest.updated_at = data.get("updated_at")
+            manifest.files = data.get("files", {})
+            manifest.owners = data.get("owners", {})
+            manifest.outdated = data.get("version") != MANIFEST_VERSION
+            manifest._initial_ids = manifest.referenced_ids()
+            manifest.existed = True
+        return manifest
+
+    def save(self):
+        os.makedirs(MANIFEST_DIR, exist_ok=True)
+        self.updated_at = datetime.utcnow().isoformat()
+        with open(manifest_path(self.repo_name), "w", encoding="utf-8") as f:
+            json.dump({
+                "repo": self.repo_name,
+                "version": MANIFEST_VERSION,
+                "commit": self.commit,
+                "updated_at": self.updated_at,
+                "files": self.files,
+                "owners": self.owners,
+            }, f, indent=2)
+
+    def referenced_ids(self) -> Set[str]:
+        return {cid for entry in self.files.values() for cid in entry.get("chunks", [])}
+
+    def stored_ids(self) -> Set[str]:
+        """Ids that were already in the vector store when the manifest was loaded."""
+        return set() if self.outdated else set(self._initial_ids)
+
+    def is_unchanged(self, rel_path: str, digest: str) -> bool:
+        """Marks the file as seen and reports whether its content is already ingested."""
+        self._seen.add(rel_path)
+        entry = self.files.get(rel_path)
+        return not self.outdated and entry is not None and entry.get("hash") == digest
+
+    def record(self, rel_path: str, digest: str, chunk_ids: List[str], symbols: Optional[List[Dict]] = None):
+        """Stores the chunk ids (in file order) and symbol table of an added/modified file."""
+        self._seen.add(rel_path)
+        self.files[rel_path] = {"hash": digest, "chunks": list(chunk_ids)}
+        if symbols:
+            self.files[rel_path]["symbols"] = symbols
+
+    def finalize(self) -> List[str]:
+        """
+        Drops files that were not seen in this run (deleted from the repo) and
+        collects in stale_ids every chunk no file references any more.
+        Returns the list of removed paths.
+        """
+        removed = [p for p in self.files if p not in self._seen]
+        for rel_path in removed:
+            del self.files[rel_path]
+        referenced = self.referenced_ids()
+        self.stale_ids = sorted(self._initial_ids - referenced)
+        self.owners = {cid: owner for cid, owner in self.owners.items() if cid in referenced}
+        return removed
+
+    def orphaned_chunks(self) -> Dict[str, str]:
+        """
+        {chunk_id: new owner} for referenced chunks whose owner file no longer
+        contains them (it was deleted or modified). The new owner is the first
+        file, by path, that still references the chunk. Call after finalize().
+        """
+        orphaned = {}
+        for rel_path in sorted(self.files):
+            for cid in self.files[rel_path].get("chunks", []):
+                if cid in orphaned:
+                    continue
+                owner = self.owners.get(cid)
+                if owner is None or cid not in self.files.get(owner, {}).get("chunks", []):
+                    orphaned[cid] = rel_path
+        return orphaned
+
+
+# {repo_name: (manifest mtime_ns, manifest, {index name: index built from it})}
+_manifest_cache: Dict[str, Tuple[int, RepoManifest, Dict[str, Any]]] = {}
+
+
+def _cached_manifest(repo_name: str) -> Optional[Tuple[int, RepoManifest, Dict[str, Any]]]:
+    try:
+        mtime = os.stat(manifest_path(repo_name)).st_mtime_ns
+    except OSError:
+        return None
+    cached = _manifest_cache.get(repo_name)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, RepoManifest.load(repo_name), {})
+        _manifest_cache[repo_name] = cached
+    return cached
+
+
+def load_manifest(repo_name: str) -> Optional[RepoManifest]:
+    """
+    The repo's manifest as last saved (None if it was never ingested), parsed
+    once per save and shared by every reader: don't modify it.
+    """
+    cached = _cached_manifest(repo_name)
+    return cached[1] if cached else None
+
+
+def manifest_index(repo_name: str, name: str, build: Callable[[RepoManifest], T], default: T) -> T:
+    """
+    build(manifest) for the repo's current manifest, computed once per
+    manifest save and cached under `name` (default if never ingested).
+    """
+    cached = _cached_manifest(repo_name)
+    if cached is None:
+        return default
+    indexes = cached[2]
+    if name not in indexes:
+        indexes[name] = build(cached[1])
+    return indexes[name]
+
+
+def _build_locations(manifest: RepoManifest) -> Dict[str, List[str]]:
+    locations: Dict[str, List[str]] = {}
+    for rel_path, entry in manifest.files.items():
+        for cid in entry.get("chunks", []):
+            paths = locations.setdefault(cid, [])
+            if rel_path not in paths:
+                paths.append(rel_path)
+    return locations
+
+
+def chunk_locations(repo_name: str) -> Dict[str, List[str]]:
+    """
+    {chunk_id: [rel_path, ...]} for a repo, i.e. every file a (possibly
+    deduplicated) chunk occurs in. Cached until the manifest file changes.
+    """
+    return manifest_index(repo_name, "locations", _build_locations, {})
@@ -0,0 +1,230 @@
+"""
+Process-wide model registry.
+
+The embedding model and the cross-encoder reranker are loaded once per
+process and shared by ingestion, /status and every query. Loads are
+serialized per model, timed, and their weight memory recorded so operators
+can see what a worker holds (GET /models). warm_up() loads both eagerly and
+runs one dummy inference, so the first request after a restart doesn't pay
+the load (enabled at startup with EDITH_WARMUP=1).
+
+Inference backend (CPU nodes): EDITH_INFERENCE_BACKEND selects how both
+models run, and EDITH_EMBED_BACKEND / EDITH_RERANK_BACKEND override it per
+model:
+  - "torch" (default): fp32 PyTorch
+  - "int8":  PyTorch with dynamic int8 quantization of the Linear layers
+  - "onnx":  ONNX Runtime (sentence-transformers' ONNX backend, needs optimum[onnxruntime])
+Batch sizes and the intra-op thread count are configurable as well;
+benchmark_inference.py compares the backends' throughput and retrieval quality.
+"""
+import os
+import time
+import threading
+from typing import Dict, Any, Callable, List, Sequence, Tuple
+
+from chromadb.api.types import EmbeddingFunction
+
+# Best-in-class embedding model for code
+# Options: "BAAI/bge-base-en-v1.5" (general), "thenlper/gte-base" (fast),
+#          "jinaai/jina-embeddings-v2-base-code" (code-specific)
+EMBEDDING_MODEL = "BAAI/bge-base-en-v1.5"
+
+# Cross-encoder reranker for precision
+# This model scores query-document pairs for relevance
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+BACKENDS = ("torch", "int8", "onnx")
+INFERENCE_BACKEND = os.environ.get("EDITH_INFERENCE_BACKEND", "torch").lower()
+EMBED_BACKEND = os.environ.get("EDITH_EMBED_BACKEND", INFERENCE_BACKEND).lower()
+RERANK_BACKEND = os.environ.get("EDITH_RERANK_BACKEND", INFERENCE_BACKEND).lower()
+EMBED_BATCH_SIZE = int(os.environ.get("EDITH_EMBED_BATCH_SIZE", 32))
+RERANK_BATCH_SIZE = int(os.environ.get("EDITH_RERANK_BATCH_SIZE", 32))
+# Intra-op threads for torch/ONNX Runtime (0 = library default, usually all cores)
+INFERENCE_THREADS = int(os.environ.get("EDITH_INFERENCE_THREADS", 0))
+
+_models: Dict[str, Any] = {}
+_stats: Dict[str, Dict[str, Any]] = {}
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+_embedder = None
+_threads_configured = False
+
+
+class SentenceTransformerEmbedder(EmbeddingFunction):
+    """
+    Chroma embedding function backed by the shared SentenceTransformer.
+    The model is resolved on the first call, so opening the collection
+    (e.g. for /status) never loads it.
+
+    It identifies itself to Chroma exactly like the SentenceTransformerEmbeddingFunction
+    the collection was originally created with, so existing collections open
+    without an embedding function conflict.
+    """
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return get_embedding_model().encode(list(input), batch_size=EMBED_BATCH_SIZE, convert_to_numpy=True).tolist()
+
+    @staticmethod
+    def name() -> str:
+        return "sentence_transformer"
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "SentenceTransformerEmbedder":
+        if config.get("model_name", EMBEDDING_MODEL) != EMBEDDING_MODEL:
+            raise ValueError(f"Collection was embedded with {config.get('model_name')}, but EDITH uses {EMBEDDING_MODEL}")
+        return get_embedding_function()
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"model_name": EMBEDDING_MODEL, "device": "cpu", "normalize_embeddings": False, "kwargs": {}}
+
+    @staticmethod
+    def validate_config(config: Dict[str, Any]) -> None:
+        from chromadb.utils.embedding_functions.schemas import validate_config_schema
+        validate_config_schema(config, "sentence_transformer")
+
+
+def _param_bytes(model) -> int:
+    """Bytes held by the model weights (torch modules only)."""
+    try:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+    except Exception:
+        return 0
+
+
+def _check_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    return backend
+
+
+def _configure_threads():
+    global _threads_configured
+    if _threads_configured or not INFERENCE_THREADS:
+        return
+    import torch
+    torch.set_num_threads(INFERENCE_THREADS)
+    _threads_configured = True
+
+
+def _onnx_kwargs() -> Dict[str, Any]:
+    if not INFERENCE_THREADS:
+        return {}
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = INFERENCE_THREADS
+    return {"session_options": options}
+
+
+def _quantize_int8(module):
+    """Dynamic int8 quantization of the Linear layers (weights int8, activations quantized per batch)."""
+    import torch
+    return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_embedding_model(backend: str = None):
+    """Builds (uncached) the embedding model on the given backend."""
+    backend = _check_backend(backend or EMBED_BACKEND)
+    from sentence_transformers import SentenceTransformer
+    _configure_threads()
+    if backend == "onnx":
+        return SentenceTransformer(EMBEDDING_MODEL, backend="onnx", model_kwargs=_onnx_kwargs())
+    model = SentenceTransformer(EMBEDDING_MODEL)
+    if backend == "int8":
+        model[0].auto_model = _quantize_int8(model[0].auto_model)
+    return model
+
+
+def load_reranker(backend: str = None):
+    """Builds (uncached) the cross-encoder on the given backend."""
+    backend = _check_backend(backend or RERANK_BACKEND)
+    from sentence_transformers import CrossEncoder
+    _configure_threads()
+    if backend == "onnx":
+        return CrossEncoder(RERANKER_MODEL, max_length=512, backend="onnx", model_kwargs=_onnx_kwargs())
+    model = CrossEncoder(RERANKER_MODEL, max_length=512)
+    if backend == "int8":
+        model.model = _quantize_int8(model.model)
+    return model
+
+
+def embedding_model_key() -> str:
+    """
+    Identifies the vectors the embedder produces: quantized or ONNX models
+    give slightly different vectors, so they get their own embedding cache.
+    """
+    return EMBEDDING_MODEL if EMBED_BACKEND == "torch" else f"{EMBEDDING_MODEL}@{EMBED_BACKEND}"
+
+
+def _get_or_load(key: str, loader: Callable[[], Any], model_name: str, backend: str = "torch") -> Any:
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _locks_guard:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        # Another thread may have finished loading while we waited
+        if key in _models:
+            return _models[key]
+        print(f"Loading {key} model: {model_name} ({backend})...", flush=True)
+        started = time.time()
+        model = loader()
+        elapsed = time.time() - started
+        torch_model = getattr(model, "model", model)  # CrossEncoder wraps the torch module
+        _stats[key] = {
+            "model": model_name,
+            "backend": backend,
+            "load_seconds": round(elapsed, 2),
+            "weights_mb": round(_param_bytes(torch_model) / 2**20, 1),
+            "loaded_at": time.time(),
+        }
+        print(f"✅ Loaded {model_name} in {elapsed:.1f}s", flush=True)
+        _models[key] = model
+        return model
+
+
+def get_embedding_model():
+    return _get_or_load("embedding", load_embedding_model, EMBEDDING_MODEL, EMBED_BACKEND)
+
+
+def get_embedding_function() -> SentenceTransformerEmbedder:
+    """Shared Chroma embedding function (the model is loaded on first use only)."""
+    global _embedder
+    if _embedder is None:
+        _embedder = SentenceTransformerEmbedder()
+    return _embedder
+
+
+def get_reranker():
+    """Lazy-load the reranker model (once per process)."""
+    return _get_or_load("reranker", load_reranker, RERANKER_MODEL, RERANK_BACKEND)
+
+
+def rerank_scores(pairs: Sequence[Tuple[str, str]]) -> List[float]:
+    """Cross-encoder relevance scores for (query, document) pairs."""
+    if not pairs:
+        return []
+    return [float(s) for s in get_reranker().predict(list(pairs), batch_size=RERANK_BATCH_SIZE)]
+
+
+def warm_up():
+    """Loads both models and runs one inference each so later requests hit warm weights."""
+    started = time.time()
+    get_embedding_function()(["warm up"])
+    rerank_scores([("warm up", "warm up")])
+    print(f"🔥 Models warmed up in {time.time() - started:.1f}s", flush=True)
+
+
+def model_stats() -> Dict[str, Any]:
+    return {
+        "loaded": {key: dict(stats) for key, stats in _stats.items()},
+        "config": {
+            "embed_backend": EMBED_BACKEND,
+            "rerank_backend": RERANK_BACKEND,
+            "embed_batch_size": EMBED_BATCH_SIZE,
+            "rerank_batch_size": RERANK_BATCH_SIZE,
+            "threads": INFERENCE_THREADS or None,
+        },
+    }
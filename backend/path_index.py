@@ -0,0 +1,77 @@
+"""
+Path index for the read_file tool.
+
+Built from each repo's ingest manifest (every file ingest chunked) and cached
+until the manifest changes, so resolving a path never walks the checkout:
+  - exact:    "backend/auth.py" (optionally prefixed with the repo name)
+  - suffix:   "auth/jwt.py" matches ".../auth/jwt.py" on whole path components
+  - basename: "jwt.py"
+  - partial:  substring of the path, as a last resort
+
+resolve_path() returns every match ranked best first, so callers can report
+the candidates when a name is ambiguous. Matching, including the repo
+prefix, ignores case.
+"""
+import os
+from typing import List, Dict, Tuple
+
+from backend.manifest import RepoManifest, manifest_index
+
+REPO_DIR = "data/repos"
+
+# Rank of each match kind (lower is better)
+EXACT, SUFFIX, BASENAME, PARTIAL = 0, 1, 2, 3
+
+def _normalize(path: str) -> str:
+    path = path.replace("\\", "/").strip().strip("`'\"")
+    while path.startswith("./"):
+        path = path[2:]
+    return path.strip("/")
+
+
+def _build_path_index(manifest: RepoManifest) -> Dict[str, Dict[str, List[str]]]:
+    paths = sorted(manifest.files)
+    suffix: Dict[str, List[str]] = {}
+    for rel_path in paths:
+        parts = rel_path.lower().split("/")
+        for i in range(len(parts)):
+            suffix.setdefault("/".join(parts[i:]), []).append(rel_path)
+    return {"paths": paths, "suffix": suffix}
+
+
+def path_index(repo_name: str) -> Dict[str, Dict[str, List[str]]]:
+    """{"paths": [...], "suffix": {lowercased suffix: [paths]}} for a repo, cached until the manifest changes."""
+    return manifest_index(repo_name, "paths", _build_path_index, {"paths": [], "suffix": {}})
+
+
+def resolve_path(query: str, repos: List[str], limit: int = 10) -> List[Tuple[str, str, int]]:
+    """
+    [(repo, rel_path, match kind)] for a path query, best first: exact
+    before suffix before basename before substring, then shallower paths.
+    """
+    query = _normalize(query)
+    if not query:
+        return []
+    matches = []
+    for repo_name in repos:
+        index = path_index(repo_name)
+        # "repo/path/to/file" names the repo explicitly
+        local = query[len(repo_name) + 1:] if query.lower().startswith(repo_name.lower() + "/") else query
+        lowered = local.lower()
+        found = index["suffix"].get(lowered, [])
+        for rel_path in found:
+            if rel_path.lower() == lowered:
+                kind = EXACT
+            elif "/" in lowered:
+                kind = SUFFIX
+            else:
+                kind = BASENAME
+            matches.append((repo_name, rel_path, kind))
+        if not found:
+            matches.extend((repo_name, p, PARTIAL) for p in index["paths"] if lowered in p.lower())
+    matches.sort(key=lambda m: (m[2], m[1].count("/"), len(m[1]), m[0]))
+    return matches[:limit]
+
+
+def absolute_path(repo_name: str, rel_path: str) -> str:
+    return os.path.join(REPO_DIR, repo_name, rel_path)
@@ -0,0 +1,179 @@
+"""
+Streaming ingestion pipeline.
+
+    walk → read → chunk  (ingestion.iter_repo_documents, on the process pool)
+         → embed         (embedding thread)
+         → upsert        (calling thread)
+
+Stages are connected by bounded queues of chunk batches, so embedding starts
+while the repo is still being chunked and peak memory is a few batches no
+matter how large the repository is. Per-stage counters are kept in a progress
+dict, which ingest jobs (backend.jobs) expose while the run is in flight.
+Vectors go through the persistent embedding cache (backend.embedding_cache),
+so only chunks whose text has never been embedded reach the model.
+"""
+import os
+import time
+import queue
+import threading
+from typing import Dict, Any, Optional, Callable
+
+from backend.ingestion import iter_repo_documents
+from backend.manifest import RepoManifest
+
+BATCH_SIZE = 100   # Chunks per embed/upsert batch
+QUEUE_SIZE = 4     # Batches buffered between two stages
+# Set EDITH_EMBEDDING_CACHE=0 to always recompute embeddings
+USE_EMBEDDING_CACHE = os.environ.get("EDITH_EMBEDDING_CACHE", "1") != "0"
+
+
+class IngestCancelled(Exception):
+    """Raised inside the pipeline when its cancel event is set."""
+
+
+def new_progress() -> Dict[str, Any]:
+    return {
+        "stage": "walk",
+        "started_at": time.time(),
+        "finished_at": None,
+        "walk": {"total_files": 0, "files": 0, "unchanged": 0, "skipped": {}},
+        "chunk": {"files": 0, "chunks": 0, "duplicates": 0},
+        "embed": {"chunks": 0, "batches": 0, "cached": 0},
+        "upsert": {"chunks": 0, "deleted": 0},
+    }
+
+
+def ingest_streaming(repo_name: str, repo_path: str, manifest: Optional[RepoManifest] = None,
+                     incremental: bool = False, workers: Optional[int] = None,
+                     batch_size: int = BATCH_SIZE, progress: Optional[Dict[str, Any]] = None,
+                     cancel_event: Optional[threading.Event] = None,
+                     on_event: Optional[Callable] = None) -> Dict[str, Any]:
+    """
+    Runs the full walk → upsert pipeline for a checked-out repo.
+    Stale chunks (manifest.stale_ids) are deleted once chunking has finished,
+    and on a repo's first ingest so are its chunks left over from the
+    un-namespaced id scheme.
+
+    progress is updated in place (a fresh one is created if omitted);
+    setting cancel_event aborts the run with IngestCancelled; on_event
+    receives structured (kind, message, data) events.
+    Returns the final progress dict.
+    """
+    from backend.vector_store import get_embedding_function, get_collection, upsert_embedded, delete_documents, legacy_chunk_ids
+    from backend.models import embedding_model_key
+    from backend.embedding_cache import get_embedding_cache
+
+    progress = progress if progress is not None else new_progress()
+    progress["stage"] = "walk"
+
+    def emit(kind: str, message: str, **data):
+        print(message, flush=True)
+        if on_event is not None:
+            on_event(kind, message, data)
+
+    def cancelled() -> bool:
+        return cancel_event is not None and cancel_event.is_set()
+
+    emb_fn = get_embedding_function()
+    collection = get_collection(emb_fn)
+    cache = get_embedding_cache(embedding_model_key()) if USE_EMBEDDING_CACHE else None
+
+    chunk_q: "queue.Queue" = queue.Queue(maxsize=QUEUE_SIZE)
+    embed_q: "queue.Queue" = queue.Queue(maxsize=QUEUE_SIZE)
+    errors = []
+
+    def chunk_stage():
+        try:
+            batch = []
+            for doc in iter_repo_documents(repo_path, manifest=manifest, incremental=incremental,
+                                           workers=workers, progress=progress, on_event=on_event):
+                if errors:
+                    return
+                if cancelled():
+                    raise IngestCancelled()
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    chunk_q.put(batch)
+                    batch = []
+            if batch:
+                chunk_q.put(batch)
+            progress["stage"] = "embed"
+        except Exception as e:
+            errors.append(e)
+        finally:
+            chunk_q.put(None)
+
+    def embed_stage():
+        # Keeps draining after an error so the chunk stage never blocks on put()
+        while True:
+            batch = chunk_q.get()
+            if batch is None:
+                break
+            if errors:
+                continue
+            try:
+                texts = [d["content"] for d in batch]
+                if cache is not None:
+                    embeddings, hits = cache.embed(texts, emb_fn)
+                    progress["embed"]["cached"] += hits
+                else:
+                    embeddings = emb_fn(texts)
+                progress["embed"]["chunks"] += len(batch)
+                progress["embed"]["batches"] += 1
+                embed_q.put((batch, embeddings))
+            except Exception as e:
+                errors.append(e)
+        embed_q.put(None)
+
+    threads = [
+        threading.Thread(target=chunk_stage, name=f"ingest-chunk-{repo_name}", daemon=True),
+        threading.Thread(target=embed_stage, name=f"ingest-embed-{repo_name}", daemon=True),
+    ]
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            item = embed_q.get()
+            if item is None:
+                break
+            if errors:
+                continue
+            batch, embeddings = item
+            try:
+                if cancelled():
+                    raise IngestCancelled()
+                upsert_embedded(collection, batch, embeddings)
+                progress["upsert"]["chunks"] += len(batch)
+                emit("upsert.progress",
+                     f"Upserted {progress['upsert']['chunks']} chunks "
+                     f"(chunked {progress['chunk']['chunks']}, files {progress['chunk']['files']}/{progress['walk']['total_files']})",
+                     chunks=progress["upsert"]["chunks"])
+            except Exception as e:
+                errors.append(e)
+        for t in threads:
+            t.join()
+
+        if errors:
+            raise errors[0]
+
+        if manifest is not None and manifest.stale_ids:
+            progress["stage"] = "cleanup"
+            delete_documents(manifest.stale_ids, collection=collection)
+            progress["upsert"]["deleted"] = len(manifest.stale_ids)
+            emit("cleanup.done", f"Deleted {len(manifest.stale_ids)} stale chunks", deleted=len(manifest.stale_ids))
+        if manifest is not None and not manifest.existed:
+            # First ingest since upgrading: drop the copies stored under the old per-path ids
+            legacy = legacy_chunk_ids(sorted(manifest.files), collection)
+            if legacy:
+                progress["stage"] = "cleanup"
+                delete_documents(legacy, collection=collection)
+                progress["upsert"]["deleted"] += len(legacy)
+                emit("cleanup.legacy", f"Deleted {len(legacy)} chunks stored before repo namespacing", deleted=len(legacy))
+        progress["stage"] = "optimize"
+        collection.optimize()
+        progress["stage"] = "done"
+    finally:
+        progress["finished_at"] = time.time()
+
+    return progress
@@ -1,53 +1,125 @@
 from backend.vector_store import query_documents
+from backend.manifest import chunk_locations
+from backend.symbols import find_symbols
+from backend.path_index import resolve_path, absolute_path
+from backend.answer_cache import get_answer_cache
+from backend.tool_cache import get_tool_cache, TOOL_CACHE
+from backend.fast_path import (
+    route, resolve_mode, pack_context, fast_messages, FAST_RESULTS, NOT_ENOUGH_CONTEXT
+)
 import os
 import re
-import hashlib
-from groq import Groq
+import asyncio
+import weakref
+import threading
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from groq import AsyncGroq
 
 # Lazy-loaded globals
-_groq_client = None
 _dep_graph = None
+_dep_graph_lock = threading.Lock()
+_tool_pool = None
+_tool_pool_lock = threading.Lock()
+_loop_state = weakref.WeakKeyDictionary()  # event loop -> Groq client + limits
+
+# Independent actions the agent may request in one step (run concurrently)
+MAX_PARALLEL_ACTIONS = int(os.environ.get("EDITH_MAX_PARALLEL_ACTIONS", 4))
+
+# Concurrency limits (per worker process). The agent loop is async and mostly
+# waits on Groq, so one worker holds many questions; CPU-bound retrieval
+# (embedding, reranking, file reads) runs on a bounded thread pool instead.
+MAX_CONCURRENT_QUERIES = int(os.environ.get("EDITH_MAX_CONCURRENT_QUERIES", 256))
+MAX_CONCURRENT_LLM_CALLS = int(os.environ.get("EDITH_MAX_CONCURRENT_LLM_CALLS", 64))
+RETRIEVAL_WORKERS = int(os.environ.get("EDITH_RETRIEVAL_WORKERS", 8))
+
+_agent_counts = {"in_flight": 0, "waiting": 0, "llm_in_flight": 0, "completed": 0}
 
 # ==================== OPTIMIZATION 1: Query Cache ====================
 # Caches question->answer pairs to skip LLM calls on repeated questions
 # Impact: 100% token savings on cache hits, zero quality impact
-_query_cache = {}
-CACHE_ENABLED = True
+# Stored on disk (shared by workers, LRU + TTL bounded) and keyed by repo scope
+# and corpus version, so a re-ingest retires stale answers (backend/answer_cache.py).
+# Paraphrased questions hit too, via question-embedding similarity.
+CACHE_ENABLED = os.environ.get("EDITH_ANSWER_CACHE", "1") != "0"
 
-def get_cached_answer(question: str):
-    """Check if we have a cached answer for this question."""
+def get_cached_answer(question: str, repos: Optional[List[str]] = None):
+    """Check if we have a cached answer for this (or a near-identical) question."""
     if not CACHE_ENABLED:
         return None
-    # Normalize question for better cache hits
-    key = hashlib.md5(question.lower().strip().encode()).hexdigest()
-    return _query_cache.get(key)
+    hit = get_answer_cache().lookup(question, repos)
+    if hit is None:
+        return None
+    if hit["match"] == "semantic":
+        print(f"📦 Semantic cache hit ({hit['similarity']}): \"{hit['question']}\"", flush=True)
+        return f"_Answer to a similar earlier question: \"{hit['question']}\"_\n\n{hit['answer']}"
+    return hit["answer"]
 
-def cache_answer(question: str, answer: str):
+def cache_answer(question: str, answer: str, repos: Optional[List[str]] = None):
     """Cache an answer for future use."""
     if CACHE_ENABLED:
-        key = hashlib.md5(question.lower().strip().encode()).hexdigest()
-        _query_cache[key] = answer
+        get_answer_cache().put(question, answer, repos)
 
 # ==================== END CACHE ====================
 
-def get_groq_client():
-    global _groq_client
-    if _groq_client is None:
+def get_loop_state():
+    """
+    Async Groq client and concurrency semaphores of the running event loop
+    (both are bound to the loop that first uses them).
+    """
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
         api_key = os.environ.get("GROQ_API_KEY")
         if not api_key:
             raise ValueError("GROQ_API_KEY environment variable not set. Please add it to your .env file.")
-        _groq_client = Groq(api_key=api_key)
-    return _groq_client
+        state = SimpleNamespace(client=AsyncGroq(api_key=api_key),
+                                queries=asyncio.Semaphore(MAX_CONCURRENT_QUERIES),
+                                llm_calls=asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS))
+        _loop_state[loop] = state
+    return state
+
+def get_async_groq_client() -> AsyncGroq:
+    return get_loop_state().client
 
 def get_dep_graph():
+    """Shared dependency graph, reloaded when an ingest has rewritten the graph file."""
     global _dep_graph
-    if _dep_graph is None:
-        from backend.graph import DependencyGraph
-        _dep_graph = DependencyGraph()
-        graph_path = "data/dependency_graph.gml"
-        if os.path.exists(graph_path):
-            _dep_graph.load(graph_path)
-    return _dep_graph
+    graph_path = "data/dependency_graph.gml"
+    mtime = os.path.getmtime(graph_path) if os.path.exists(graph_path) else None
+    if _dep_graph is None or _dep_graph[0] != mtime:
+        with _dep_graph_lock:
+            if _dep_graph is None or _dep_graph[0] != mtime:
+                from backend.graph import DependencyGraph
+                graph = DependencyGraph()
+                if mtime is not None:
+                    graph.load(graph_path)
+                _dep_graph = (mtime, graph)
+    return _dep_graph[1]
+
+def get_tool_pool() -> ThreadPoolExecutor:
+    global _tool_pool
+    if _tool_pool is None:
+        with _tool_pool_lock:
+            if _tool_pool is None:
+                _tool_pool = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="edith-retrieval")
+    return _tool_pool
+
+async def run_blocking(fn, *args):
+    """Runs CPU-bound or blocking work (retrieval, cache I/O) on the bounded retrieval pool."""
+    return await asyncio.get_running_loop().run_in_executor(get_tool_pool(), fn, *args)
+
+def agent_stats():
+    return {
+        **_agent_counts,
+        "limits": {
+            "max_concurrent_queries": MAX_CONCURRENT_QUERIES,
+            "max_concurrent_llm_calls": MAX_CONCURRENT_LLM_CALLS,
+            "retrieval_workers": RETRIEVAL_WORKERS,
+            "max_parallel_actions": MAX_PARALLEL_ACTIONS,
+        },
+    }
 
 # ==================== OPTIMIZATION 2: Smart Truncation ====================
 # Keeps beginning (signatures) + end (returns) instead of just cutting
@@ -66,9 +138,35 @@ def smart_truncate(text: str, max_length: int = 2500) -> str:
 # ==================== END SMART TRUNCATION ====================
 
 # --- TOOLS ---
-def search_code(query: str):
-    """Semantic search for code snippets with deduplication."""
-    results = query_documents(query, n_results=8)
+
+_FILTER_KEYS = {"path": "path", "dir": "path", "lang": "language", "language": "language", "repo": "repo"}
+
+def parse_search_filters(query: str):
+    """
+    Splits `billing retry | path=services/billing lang=python repo=api` into
+    the query text and its filters ({"path": str, "language": [..], "repo": [..]}).
+    """
+    text, _, spec = query.partition("|")
+    filters = {}
+    for key, value in re.findall(r"(\w+)\s*=\s*([^\s,]+)", spec):
+        key = _FILTER_KEYS.get(key.lower())
+        value = value.strip("`'\"")
+        if key == "path":
+            filters["path"] = value
+        elif key:
+            filters.setdefault(key, []).append(value.lower() if key == "language" else value)
+    return text.strip(), filters
+def search_code(query: str, repos: Optional[List[str]] = None):
+    """
+    Semantic search for code snippets with deduplication (restricted to `repos` if given).
+    Filters after a `|` (path=, lang=, repo=) are applied inside the index query.
+    """
+    query, filters = parse_search_filters(query)
+    if "repo" in filters:
+        # A repo filter can only narrow the caller's scope, never widen it
+        repos = [r for r in filters["repo"] if repos is None or r in repos]
+    results = query_documents(query, n_results=8, repos=repos,
+                              path_prefix=filters.get("path"), languages=filters.get("language"))
     output = []
     
     # ==================== OPTIMIZATION 3: Deduplicate Results ====================
@@ -80,50 +178,185 @@ def search_code(query: str):
         for i, doc in enumerate(results['documents'][0]):
             meta = results['metadatas'][0][i]
             source = meta.get('source', 'unknown')
+            repo = meta.get('repo', '')
+            
+            # Chunks are deduplicated by content: expand to every file the text occurs in
+            locations = [source]
+            if repo:
+                locations = chunk_locations(repo).get(results['ids'][0][i], locations)
             
-            # Skip if we already have a chunk from this file
-            if source in seen_sources:
+            # Skip if we already have a chunk from these files (same paths in other repos are different files)
+            if all((repo, loc) in seen_sources for loc in locations):
                 continue
-            seen_sources.add(source)
+            seen_sources.update((repo, loc) for loc in locations)
             
             # Smart truncate preview
             preview = smart_truncate(doc, max_length=400)
-            output.append(f"[{source}]\n{preview}\n")
+            prefix = f"{repo}/" if repo else ""
+            also = ""
+            if len(locations) > 1:
+                others = [prefix + loc for loc in locations[1:]]
+                also = f"(identical in {len(others)} more: {', '.join(others[:5])}{' ...' if len(others) > 5 else ''})\n"
+            output.append(f"[{prefix}{locations[0]}]\n{also}{preview}\n")
     
     # ==================== OPTIMIZATION 4: Pre-filter Empty Results ====================
     # If no results found, don't waste LLM tokens on follow-up
     # Impact: Positive - avoids hallucination
     if not output:
+        if filters:
+            return "No relevant code found with these filters. Try a broader path or drop the filters."
         return "No relevant code found for this query. Try different keywords or check if the repository was ingested."
     
     return "\n".join(output)
 
-def read_file(file_path: str):
-    """Reads a specific file from the repo with smart truncation."""
-    # Search for the file in data/repos
-    for root, dirs, files in os.walk("data/repos"):
-        for file in files:
-            full_path = os.path.join(root, file).replace("\\", "/")
-            if file_path in full_path:
-                try:
-                    with open(os.path.join(root, file), 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    # Use smart truncation instead of simple cut
-                    return smart_truncate(content, max_length=4000)
-                except Exception as e:
-                    return f"Error reading file: {e}"
-    return "File not found. Try using search_code to find the correct path."
-
-def get_dependencies(file_path: str):
+def _all_repos() -> List[str]:
+    return sorted(os.listdir("data/repos")) if os.path.exists("data/repos") else []
+
+def parse_line_range(arg: str) -> Tuple[str, Optional[int], Optional[int]]:
+    """Splits "path:10-40", "path#L10-L40" or "path:25" into (path, start, end)."""
+    match = re.match(r"^(.*?)(?::|#L)(\d+)(?:\s*-\s*L?(\d+))?\s*$", arg.strip())
+    if not match:
+        return arg.strip(), None, None
+    start = int(match.group(2))
+    end = int(match.group(3)) if match.group(3) else start
+    return match.group(1), min(start, end), max(start, end)
+
+def read_file(file_path: str, repos: Optional[List[str]] = None):
+    """Reads a specific file (or a line range of it) resolved through the ingest path index."""
+    path, start, end = parse_line_range(file_path)
+    # ==================== OPTIMIZATION 8: Path Index ====================
+    # Exact / suffix / basename lookups against the ingest manifest instead
+    # of walking every checkout and taking the first substring match
+    candidates = resolve_path(path, repos if repos is not None else _all_repos())
+    if not candidates:
+        return "File not found. Try using search_code to find the correct path."
+    best_kind = candidates[0][2]
+    best = [c for c in candidates if c[2] == best_kind]
+    if len(best) > 1:
+        listing = "\n".join(f"- {repo}/{rel_path}" for repo, rel_path, _ in candidates)
+        return f"'{path}' is ambiguous. Call read_file again with one of these paths:\n{listing}"
+
+    repo, rel_path, _ = best[0]
+    try:
+        with open(absolute_path(repo, rel_path), 'r', encoding='utf-8', errors='ignore') as f:
+            if start is None:
+                # Use smart truncation instead of simple cut
+                return f"[{rel_path}]\n" + smart_truncate(f.read(), max_length=4000)
+            lines = f.readlines()
+    except Exception as e:
+        return f"Error reading file: {e}"
+
+    if start > len(lines):
+        return f"{rel_path} has only {len(lines)} lines."
+    end = min(end, len(lines))
+    numbered = "".join(f"{n:>5} | {lines[n - 1]}" for n in range(start, end + 1))
+    return f"[{rel_path}:{start}-{end}]\n" + smart_truncate(numbered, max_length=4000)
+
+def find_symbol(name: str, repos: Optional[List[str]] = None):
+    """Looks up where a function/class/method is defined from the ingest symbol table (no vector search)."""
+    matches = find_symbols(name, repos if repos is not None else _all_repos())
+    if not matches:
+        return f"No symbol named '{name}' found. Try search_code instead."
+    
+    lines = [f"- {m['symbol_kind']} {m['symbol']} [{m['path']}:{m['start_line']}-{m['end_line']}]" for m in matches]
+    
+    # Include the code of the best match so no read_file step is needed
+    top = matches[0]
+    try:
+        with open(os.path.join("data/repos", top["repo"], top["path"]), 'r', encoding='utf-8', errors='ignore') as f:
+            code = "".join(f.readlines()[top["start_line"] - 1:top["end_line"]])
+    except Exception as e:
+        code = f"Error reading file: {e}"
+    return "Definitions:\n" + "\n".join(lines) + f"\n\n[{top['path']}:{top['start_line']}-{top['end_line']}]\n{smart_truncate(code, max_length=2500)}"
+
+def _graph_neighbours(file_path: str, repos: Optional[List[str]], dependents: bool) -> List[str]:
+    """Imports (or importers) of a file in each repo that has it, labelled with the repo when several do."""
+    from backend.graph import split_node
+    graph = get_dep_graph()
+    nodes = graph.find_nodes(file_path.strip(), repos)
+    found = []
+    for node in nodes:
+        for neighbour in (graph.get_dependents(node) if dependents else graph.get_dependencies(node)):
+            repo, name = split_node(neighbour)
+            found.append(name if len(nodes) == 1 else f"{name} ({repo})")
+    return found
+
+def get_dependencies(file_path: str, repos: Optional[List[str]] = None):
     """Returns files that this file imports."""
-    deps = get_dep_graph().get_dependencies(file_path)
+    deps = _graph_neighbours(file_path, repos, dependents=False)
     return ", ".join(deps) if deps else "No dependencies found."
 
-def get_dependents(file_path: str):
+def get_dependents(file_path: str, repos: Optional[List[str]] = None):
     """Returns files that import this file."""
-    deps = get_dep_graph().get_dependents(file_path)
+    deps = _graph_neighbours(file_path, repos, dependents=True)
     return ", ".join(deps) if deps else "No dependents found."
 
+# Tool name -> fn(argument, repos)
+TOOLS = {
+    "find_symbol": find_symbol,
+    "search_code": search_code,
+    "read_file": read_file,
+    "get_dependencies": get_dependencies,
+    "get_dependents": get_dependents,
+}
+
+ACTION_PATTERN = re.compile(r"Action:\s*\[?(\w+)[:]?\s*(.+?)\]?$", re.MULTILINE)
+
+def parse_actions(response_text: str) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    Every `Action: [tool: argument]` line of a step, in order, without
+    duplicates, split into (actions to run, actions beyond MAX_PARALLEL_ACTIONS).
+    """
+    actions = []
+    for match in ACTION_PATTERN.finditer(response_text):
+        action = (match.group(1).strip(), match.group(2).strip().strip(']').strip('"\''))
+        if action not in actions:
+            actions.append(action)
+    return actions[:MAX_PARALLEL_ACTIONS], actions[MAX_PARALLEL_ACTIONS:]
+
+def run_tool(tool: str, arg: str, repos: Optional[List[str]] = None) -> str:
+    fn = TOOLS.get(tool)
+    if fn is None:
+        return f"Error: Unknown tool. Available: {', '.join(TOOLS)}"
+    # ==================== OPTIMIZATION 9: Tool Result Cache ====================
+    # Identical lookups (within a run and across users) skip embedding,
+    # reranking and file reads; keyed by corpus version (backend/tool_cache.py)
+    if TOOL_CACHE:
+        cached = get_tool_cache().get(tool, arg, repos)
+        if cached is not None:
+            print(f"♻️ Tool cache hit: {tool}('{arg}')", flush=True)
+            return cached
+    try:
+        observation = fn(arg, repos)
+    except Exception as e:
+        return f"Error running {tool}: {e}"
+    # Smart truncate observation (already done in tools, but safety check)
+    observation = smart_truncate(observation, max_length=2500)
+    if TOOL_CACHE and not observation.startswith("Error"):
+        get_tool_cache().put(tool, arg, observation, repos)
+    return observation
+
+async def run_actions(actions: List[Tuple[str, str]], repos: Optional[List[str]] = None) -> List[str]:
+    """
+    Runs a step's actions and returns their observations in the same order.
+    Several actions are independent by construction (the model asked for them
+    before seeing any result), so they run concurrently in the retrieval pool.
+    """
+    return list(await asyncio.gather(*(run_blocking(run_tool, tool, arg, repos) for tool, arg in actions)))
+
+def format_observations(actions: List[Tuple[str, str]], observations: List[str],
+                        skipped: Optional[List[Tuple[str, str]]] = None) -> str:
+    if len(actions) == 1:
+        text = f"Observation: {observations[0]}"
+    else:
+        text = "\n\n".join(f"Observation {i} [{tool}: {arg}]:\n{observation}"
+                            for i, ((tool, arg), observation) in enumerate(zip(actions, observations), 1))
+    if skipped:
+        listing = "\n".join(f"Action: [{tool}: {arg}]" for tool, arg in skipped)
+        text += (f"\n\nNot run (at most {MAX_PARALLEL_ACTIONS} actions per step). "
+                 f"Reissue any you still need in your next step:\n{listing}")
+    return text
+
 # --- AGENT PROMPT (Slightly optimized - removed redundant example) ---
 SYSTEM_PROMPT = """You are EDITH, a code analysis AI. Answer questions by reading actual code.
 
@@ -133,8 +366,11 @@ RULES:
 3. Include file names, function names, and code snippets.
 
 TOOLS:
-- search_code(query): Find relevant code. USE FIRST.
+- find_symbol(name): Where a function/class/method is defined, with its code. USE FIRST when the question names one.
+- search_code(query): Find relevant code. USE FIRST otherwise.
+  Narrow it when you know where to look: [search_code: billing retry | path=services/billing lang=python repo=name]
 - read_file(path): Read file content. USE BEFORE ANSWERING.
+  Read only the lines you need with [read_file: path:120-180]
 - get_dependencies(path): What does this file import?
 - get_dependents(path): What imports this file?
 
@@ -142,19 +378,156 @@ FORMAT:
 Thought: <reasoning>
 Action: [tool_name: argument]
 
+Lookups that don't depend on each other go in the SAME step, one Action line each (max {max_actions}):
+Thought: <reasoning>
+Action: [search_code: token refresh]
+Action: [read_file: backend/auth.py]
+
 After observations:
 Final Answer: <answer WITH code evidence>
-"""
+""".replace("{max_actions}", str(MAX_PARALLEL_ACTIONS))
+
+OBSERVATION_PREVIEW = 300  # Characters of each observation sent in step events
+
+def _thought(response_text: str) -> str:
+    """The model's reasoning for a step (text before its first Action line)."""
+    text = response_text.split("Action:")[0]
+    return text.split("Thought:")[-1].strip()
+
+async def _stream_completion(state, messages, agent: bool = True):
+    """
+    Streams one LLM turn. Yields ("token", text) for everything after
+    "Final Answer:" as it arrives (for a single-shot turn, agent=False: the
+    whole reply), then ("text", full response) at the end.
+    """
+    async with state.llm_calls:
+        _agent_counts["llm_in_flight"] += 1
+        try:
+            stream = await state.client.chat.completions.create(
+                messages=messages,
+                model="llama-3.3-70b-versatile",
+                temperature=0,
+                **({"stop": ["Observation:"]} if agent else {}),
+                stream=True
+            )
+            text = ""
+            emitted = None if agent else 0  # Position in `text` up to which answer tokens were yielded
+            answer_started = False
+            # Closing the stream releases the HTTP connection when the caller fails or disconnects mid-answer
+            async with stream:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    text += chunk.choices[0].delta.content or ""
+                    if emitted is None and "Final Answer:" in text:
+                        emitted = text.index("Final Answer:") + len("Final Answer:")
+                    if emitted is not None:
+                        # Skip the whitespace right after the marker
+                        pending = text[emitted:] if answer_started else text[emitted:].lstrip()
+                        if pending:
+                            answer_started = True
+                            yield "token", pending
+                        emitted = len(text)
+        finally:
+            _agent_counts["llm_in_flight"] -= 1
+    yield "text", text.strip()
 
-def answer_question(question: str) -> str:
+async def _fast_answer(state, question: str, results, repos: Optional[List[str]], forced: bool):
+    """
+    Single-shot answer from one retrieval. Yields the same events as the
+    agent loop; ends without a "done" event when the retrieved code turns out
+    not to answer the question (the caller falls back to the agent).
+    """
+    context = await run_blocking(pack_context, results)
+    held, released, response_text = "", False, ""
+    try:
+        async for kind, text in _stream_completion(state, fast_messages(question, context), agent=False):
+            if kind == "text":
+                response_text = text
+            elif released:
+                yield {"type": "token", "text": text}
+            else:
+                # Hold the first tokens back until they can't be the NOT_ENOUGH_CONTEXT reply
+                held += text
+                if not NOT_ENOUGH_CONTEXT.startswith(held.strip()) and not held.strip().startswith(NOT_ENOUGH_CONTEXT):
+                    released = True
+                    yield {"type": "token", "text": held.lstrip()}
+    except Exception as e:
+        answer = f"LLM Error: {e}"
+        yield {"type": "error", "detail": str(e)}
+        if not released:
+            yield {"type": "token", "text": answer}
+        yield {"type": "done", "answer": answer}
+        return
+    
+    if response_text.startswith(NOT_ENOUGH_CONTEXT):
+        if forced:
+            answer = "The retrieved code does not answer this question. Ask again in agent mode to explore further."
+            yield {"type": "token", "text": answer}
+            yield {"type": "done", "answer": answer}
+        else:
+            print("⚡ Fast path lacked context, falling back to the agent", flush=True)
+            yield {"type": "route", "mode": "agent", "reason": "retrieved code was not enough"}
+        return
+    if not released:
+        yield {"type": "token", "text": response_text}
+    await run_blocking(cache_answer, question, response_text, repos)
+    yield {"type": "done", "answer": response_text}
+
+async def answer_question_stream(question: str, repos: Optional[List[str]] = None, mode: Optional[str] = None):
+    """
+    Answers a question, yielding events as they happen:
+      {"type": "cached"}                               answer comes from the cache
+      {"type": "route", "mode", "reason"}              fast path or agent loop (backend/fast_path.py)
+      {"type": "step", "step", "thought", "actions"}   the model chose tools
+      {"type": "observation", "step", "tool", "arg", "observation"} (truncated)
+      {"type": "token", "text"}                        final answer, as streamed by Groq
+      {"type": "error", "detail"}
+      {"type": "done", "answer"}                       always last
+    `repos` limits every tool to the caller's assigned repositories (None = all).
+    `mode` forces "fast" or "agent" (default: EDITH_ANSWER_MODE, "auto").
+    """
+    mode = resolve_mode(mode)
+    state = get_loop_state()
+    _agent_counts["waiting"] += 1
+    async with state.queries:
+        _agent_counts["waiting"] -= 1
+        _agent_counts["in_flight"] += 1
+        try:
+            async for event in _agent_loop(state, question, repos, mode):
+                yield event
+        finally:
+            _agent_counts["in_flight"] -= 1
+            _agent_counts["completed"] += 1
+
+async def _agent_loop(state, question: str, repos: Optional[List[str]], mode: str):
     # ==================== OPTIMIZATION 5: Check Cache First ====================
     # Returns cached answer if available (0 tokens used!)
-    cached = get_cached_answer(question)
+    cached = await run_blocking(get_cached_answer, question, repos)
     if cached:
         print("📦 Cache hit! Returning cached answer.", flush=True)
-        return cached
+        yield {"type": "cached"}
+        yield {"type": "token", "text": cached}
+        yield {"type": "done", "answer": cached}
+        return
+    
+    # ==================== OPTIMIZATION 10: Single-Shot Fast Path ====================
+    # Simple questions with a confident retrieval get one retrieval + one LLM
+    # call instead of the ReAct loop (backend/fast_path.py)
+    decision = route(question, mode=mode)
+    if decision is None or decision["mode"] == "fast":
+        results = await run_blocking(query_documents, question, FAST_RESULTS, repos)
+        decision = decision or route(question, results, mode)
+    print(f"⚡ Route: {decision['mode']} ({decision['reason']})", flush=True)
+    yield {"type": "route", **decision}
+    if decision["mode"] == "fast":
+        answered = False
+        async for event in _fast_answer(state, question, results, repos, forced=mode == "fast"):
+            answered = answered or event["type"] == "done"
+            yield event
+        if answered:
+            return
     
-    client = get_groq_client()
     messages = [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": question}
@@ -163,53 +536,53 @@ def answer_question(question: str) -> str:
     all_observations = []
     steps = 0
     max_steps = 6  # Reduced from 10 - most queries resolve in 2-4 steps
+    response_text = ""
     
     while steps < max_steps:
+        streamed = False
         try:
-            chat = client.chat.completions.create(
-                messages=messages,
-                model="llama-3.3-70b-versatile",
-                temperature=0,
-                stop=["Observation:"]
-            )
+            async for kind, text in _stream_completion(state, messages):
+                if kind == "token":
+                    streamed = True
+                    yield {"type": "token", "text": text}
+                else:
+                    response_text = text
         except Exception as e:
-            return f"LLM Error: {e}"
+            answer = f"LLM Error: {e}"
+            yield {"type": "error", "detail": str(e)}
+            if not streamed:
+                yield {"type": "token", "text": answer}
+            yield {"type": "done", "answer": answer}
+            return
             
-        response_text = chat.choices[0].message.content.strip()
         messages.append({"role": "assistant", "content": response_text})
         
         # ==================== OPTIMIZATION 6: Early Exit on Final Answer ====================
         # Stop immediately when we have an answer
         if "Final Answer:" in response_text:
-            answer = response_text.split("Final Answer:")[-1].strip()
+            answer = response_text.split("Final Answer:", 1)[-1].strip()
             # Cache this answer for future use
-            cache_answer(question, answer)
-            return answer
+            await run_blocking(cache_answer, question, answer, repos)
+            yield {"type": "done", "answer": answer}
+            return
             
-        # Parse Action - more flexible regex
-        action_match = re.search(r"Action:\s*\[?(\w+)[:]?\s*(.+?)\]?$", response_text, re.MULTILINE)
-        if action_match:
-            tool = action_match.group(1).strip()
-            arg = action_match.group(2).strip().strip(']').strip('"\'')
+        # Parse Actions - a step may request several independent lookups
+        actions, skipped = parse_actions(response_text)
+        if actions:
+            print(f"🤖 Step {steps+1}: " + ", ".join(f"{tool}('{arg}')" for tool, arg in actions)
+                  + (f" ({len(skipped)} over the limit skipped)" if skipped else ""), flush=True)
+            yield {"type": "step", "step": steps + 1, "thought": _thought(response_text),
+                   "actions": [{"tool": tool, "arg": arg} for tool, arg in actions],
+                   "skipped": [{"tool": tool, "arg": arg} for tool, arg in skipped]}
             
-            print(f"🤖 Step {steps+1}: {tool}('{arg}')", flush=True)
+            # Execute Tools (off the event loop, concurrently when there are several)
+            observations = await run_actions(actions, repos)
             
-            # Execute Tool
-            observation = "Error: Unknown tool. Available: search_code, read_file, get_dependencies, get_dependents"
-            if tool == "search_code":
-                observation = search_code(arg)
-            elif tool == "read_file":
-                observation = read_file(arg)
-            elif tool == "get_dependencies":
-                observation = get_dependencies(arg)
-            elif tool == "get_dependents":
-                observation = get_dependents(arg)
-                
-            # Smart truncate observation (already done in tools, but safety check)
-            observation = smart_truncate(observation, max_length=2500)
-                
-            all_observations.append(f"[{tool}({arg})]: {observation[:150]}...")
-            messages.append({"role": "user", "content": f"Observation: {observation}"})
+            for (tool, arg), observation in zip(actions, observations):
+                all_observations.append(f"[{tool}({arg})]: {observation[:150]}...")
+                yield {"type": "observation", "step": steps + 1, "tool": tool, "arg": arg,
+                       "observation": smart_truncate(observation, max_length=OBSERVATION_PREVIEW)}
+            messages.append({"role": "user", "content": format_observations(actions, observations, skipped)})
             
             # ==================== OPTIMIZATION 7: Trim Message History ====================
             # Keep only last 6 messages to prevent context bloat
@@ -224,12 +597,28 @@ def answer_question(question: str) -> str:
     
     # If we hit the limit, return what we have
     answer = f"Based on my exploration:\n\n{response_text}"
-    cache_answer(question, answer)
+    await run_blocking(cache_answer, question, answer, repos)
+    yield {"type": "token", "text": answer}
+    yield {"type": "done", "answer": answer}
+
+async def answer_question_async(question: str, repos: Optional[List[str]] = None, mode: Optional[str] = None) -> str:
+    """
+    Answers a question (fast path or ReAct loop). `repos` limits every tool
+    to the caller's assigned repositories (None = all repositories).
+    """
+    answer = ""
+    async for event in answer_question_stream(question, repos, mode):
+        if event["type"] == "done":
+            answer = event["answer"]
     return answer
 
+def answer_question(question: str, repos: Optional[List[str]] = None, mode: Optional[str] = None) -> str:
+    """Blocking wrapper around answer_question_async (scripts and shells; not for use inside an event loop)."""
+    return asyncio.run(answer_question_async(question, repos, mode))
+
 # Utility function to clear cache if needed
 def clear_cache():
-    """Clear the query cache."""
-    global _query_cache
-    _query_cache = {}
+    """Clear the query cache (answers and tool results)."""
+    get_answer_cache().clear()
+    get_tool_cache().clear()
     print("🗑️ Query cache cleared.", flush=True)
@@ -0,0 +1,234 @@
+"""
+Repository file enumeration for ingestion.
+
+Builds the list of files worth chunking in a single pass:
+  - from the git index (`git ls-files --cached --others --exclude-standard`),
+    which honours .gitignore, .git/info/exclude and the global excludes;
+  - or, for non-git directories, one os.walk that applies .gitignore files.
+
+Cheap filters (excluded dirs/extensions, generated-file names, size) run
+here; content filters (binary sniffing, minified bundles) run in the
+ingestion workers via sniff_content() since they already read the file.
+Everything dropped is counted in a SkipReport.
+"""
+import os
+import re
+import fnmatch
+import git
+from typing import List, Tuple, Dict, Optional
+
+EXCLUDE_DIRS = {'.git', 'venv', '__pycache__', 'node_modules', '.idea', '.vscode', 'dist', 'build', '.tox', 'eggs', '.eggs'}
+EXCLUDE_EXTS = {'.png', '.jpg', '.jpeg', '.gif', '.ico', '.pdf', '.exe', '.bin', '.pyc', '.whl', '.zip', '.tar', '.gz', '.lock',
+                '.svg', '.woff', '.woff2', '.ttf', '.eot', '.mp4', '.mp3', '.so', '.dll', '.dylib', '.jar', '.class', '.map'}
+# File names that are generated rather than written by hand
+GENERATED_PATTERNS = ['*.min.js', '*.min.css', '*-lock.json', '*.lock.json', '*_pb2.py', '*_pb2_grpc.py', '*.bundle.js', '*.chunk.js']
+
+# Files larger than this are not chunked
+MAX_FILE_BYTES = int(os.environ.get("EDITH_MAX_FILE_BYTES", 1_000_000))
+# Average characters per line above which a file is treated as minified
+MINIFIED_LINE_LENGTH = int(os.environ.get("EDITH_MINIFIED_LINE_LENGTH", 300))
+# Bytes inspected when sniffing for binary content
+SNIFF_BYTES = 8192
+
+RepoFileTask = Tuple[str, str, str]  # (file_path, rel_path, ext)
+
+# Language stored in chunk metadata (filterable in search_code with `| lang=...`)
+LANGUAGE_BY_EXT = {
+    '.py': 'python', '.js': 'javascript', '.jsx': 'javascript', '.mjs': 'javascript', '.ts': 'typescript',
+    '.tsx': 'typescript', '.java': 'java', '.kt': 'kotlin', '.scala': 'scala', '.go': 'go', '.rs': 'rust',
+    '.rb': 'ruby', '.php': 'php', '.c': 'c', '.h': 'c', '.cc': 'cpp', '.cpp': 'cpp', '.hpp': 'cpp',
+    '.cs': 'csharp', '.swift': 'swift', '.sh': 'shell', '.sql': 'sql', '.html': 'html', '.css': 'css',
+    '.md': 'markdown', '.json': 'json', '.yaml': 'yaml', '.yml': 'yaml', '.toml': 'toml',
+}
+# Leading directories stored as dir1..dirN metadata, so path-prefix filters run inside the index
+PATH_DEPTH = 6
+
+
+def language_for(ext: str) -> str:
+    return LANGUAGE_BY_EXT.get(ext.lower(), "text")
+
+
+def path_parts(path: str) -> List[str]:
+    return [p for p in path.replace("\\", "/").strip().strip("/").split("/") if p and p != "."]
+
+
+def path_metadata(rel_path: str) -> Dict[str, str]:
+    """{"dir1": "services", "dir2": "billing", ...} for the directories containing rel_path."""
+    dirs = path_parts(rel_path)[:-1][:PATH_DEPTH]
+    return {f"dir{i + 1}": d for i, d in enumerate(dirs)}
+
+
+class SkipReport:
+    """Counts skipped files per reason, keeping a few example paths."""
+    MAX_EXAMPLES = 5
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.examples: Dict[str, List[str]] = {}
+
+    def add(self, reason: str, rel_path: str):
+        self.counts[reason] = self.counts.get(reason, 0) + 1
+        examples = self.examples.setdefault(reason, [])
+        if len(examples) < self.MAX_EXAMPLES:
+            examples.append(rel_path)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def to_dict(self) -> Dict:
+        return {"total": self.total, "by_reason": dict(self.counts), "examples": {k: list(v) for k, v in self.examples.items()}}
+
+
+def sniff_content(raw: bytes) -> Optional[str]:
+    """Returns a skip reason ('binary' / 'minified') for file content, or None if it should be chunked."""
+    head = raw[:SNIFF_BYTES]
+    if b"\0" in head:
+        return "binary"
+    if len(raw) > 2000:
+        lines = raw.count(b"\n") + 1
+        if len(raw) / lines > MINIFIED_LINE_LENGTH:
+            return "minified"
+    return None
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translates a gitignore glob: '*' and '?' stay within one path segment, '**' spans segments."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += r"(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += r".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += r"[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += r"[^/]"
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    # A matched directory also ignores everything below it
+    return regex + r"(?:/.*)?\Z"
+
+
+class _GitIgnore:
+    """
+    Minimal .gitignore matcher for the os.walk fallback.
+    Supports comments, '!' negation, trailing '/' (directories only) and
+    patterns anchored with a leading or inner '/'.
+    """
+
+    def __init__(self):
+        self.rules: List[Tuple[str, str, bool, bool]] = []  # (base_dir, regex, negate, dir_only)
+
+    def add_file(self, path: str, base_dir: str):
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                lines = f.read().splitlines()
+        except Exception:
+            return
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            # Checked before dropping the leading '/': "/build/" is anchored, "build/" is not
+            anchored = "/" in line
+            line = line.lstrip("/")
+            regex = _glob_to_regex(line)
+            if not anchored:
+                regex = r"(?:.*/)?" + regex
+            self.rules.append((base_dir, regex, negate, dir_only))
+
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        result = False
+        for base_dir, regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base_dir:
+                if not rel_path.startswith(base_dir + "/"):
+                    continue
+                candidate = rel_path[len(base_dir) + 1:]
+            else:
+                candidate = rel_path
+            if re.match(regex, candidate):
+                result = not negate
+        return result
+
+
+def _git_ls_files(repo_path: str) -> Optional[List[str]]:
+    try:
+        output = git.Repo(repo_path).git.ls_files("-z", "--cached", "--others", "--exclude-standard")
+    except Exception:
+        return None
+    return sorted(set(p for p in output.split("\0") if p))
+
+
+def _walk_files(repo_path: str) -> List[str]:
+    ignore = _GitIgnore()
+    rel_paths = []
+    for root, dirs, files in os.walk(repo_path):
+        rel_root = os.path.relpath(root, repo_path).replace("\\", "/")
+        rel_root = "" if rel_root == "." else rel_root
+        if ".gitignore" in files:
+            ignore.add_file(os.path.join(root, ".gitignore"), rel_root)
+        kept = []
+        for d in sorted(dirs):
+            rel_dir = f"{rel_root}/{d}" if rel_root else d
+            if d not in EXCLUDE_DIRS and not ignore.ignored(rel_dir, True):
+                kept.append(d)
+        dirs[:] = kept
+        for file in sorted(files):
+            rel_path = f"{rel_root}/{file}" if rel_root else file
+            if not ignore.ignored(rel_path, False):
+                rel_paths.append(rel_path)
+    return rel_paths
+
+
+def enumerate_repo_files(repo_path: str, report: Optional[SkipReport] = None) -> List[RepoFileTask]:
+    """
+    Returns (file_path, rel_path, ext) for every file that should be chunked,
+    in a stable (sorted) order. Skipped files are recorded in `report`.
+    """
+    report = report if report is not None else SkipReport()
+    rel_paths = _git_ls_files(repo_path)
+    if rel_paths is None:
+        rel_paths = _walk_files(repo_path)
+
+    tasks = []
+    for rel_path in rel_paths:
+        parts = rel_path.split("/")
+        if any(part in EXCLUDE_DIRS for part in parts[:-1]):
+            report.add("excluded_dir", rel_path)
+            continue
+        name = parts[-1]
+        ext = os.path.splitext(name)[1].lower()
+        if ext in EXCLUDE_EXTS:
+            report.add("excluded_ext", rel_path)
+            continue
+        if any(fnmatch.fnmatch(name, pattern) for pattern in GENERATED_PATTERNS):
+            report.add("generated", rel_path)
+            continue
+
+        file_path = os.path.join(repo_path, *parts)
+        try:
+            if not os.path.isfile(file_path):
+                continue  # Deleted in the working tree, or a submodule
+            size = os.path.getsize(file_path)
+        except OSError:
+            continue
+        if size > MAX_FILE_BYTES:
+            report.add("too_large", rel_path)
+            continue
+
+        tasks.append((file_path, rel_path, ext))
+    return tasks
@@ -0,0 +1,100 @@
+"""
+Adaptive reranking policy.
+
+The cross-encoder is about half of retrieval latency, but most queries have
+an obvious winner already in the dense scores. query_documents retrieves a
+wide dense list once, asks plan_rerank() what to do with it, and logs every
+decision to stdout so the thresholds can be tuned (and, with
+EDITH_RERANK_LOG=<path>, to a JSONL file rotated at RERANK_LOG_MAX_BYTES):
+
+  - skip:   top-1 leads top-2 by >= RERANK_SKIP_GAP (and BM25 agrees on the
+            top hit) -> return the fused order without the cross-encoder
+  - shrink: only candidates within RERANK_SHRINK_MARGIN of the top score can
+            plausibly make the cut -> rerank just those
+  - widen:  the top candidates are within RERANK_FLAT_SPREAD of each other ->
+            dense order says little, rerank the whole wide list
+  - full:   the default over-retrieval (3x n_results, max 20)
+
+EDITH_RERANK_POLICY=always restores unconditional reranking.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+RERANK_POLICY = os.environ.get("EDITH_RERANK_POLICY", "adaptive").lower()   # adaptive or always
+RERANK_SKIP_GAP = float(os.environ.get("EDITH_RERANK_SKIP_GAP", 0.10))
+RERANK_SHRINK_MARGIN = float(os.environ.get("EDITH_RERANK_SHRINK_MARGIN", 0.08))
+RERANK_FLAT_SPREAD = float(os.environ.get("EDITH_RERANK_FLAT_SPREAD", 0.03))
+WIDE_CANDIDATES = 40    # Dense candidates fetched per query (only reranked when scores are flat)
+# Opt-in JSONL decision log, e.g. data/rerank_decisions.jsonl; rotated to <path>.1 when full
+RERANK_LOG_PATH = os.environ.get("EDITH_RERANK_LOG", "")
+RERANK_LOG_MAX_BYTES = int(os.environ.get("EDITH_RERANK_LOG_MAX_BYTES", 10_000_000))
+
+_counts: Counter = Counter()
+_log_lock = threading.Lock()
+
+
+def plan_rerank(similarities: List[float], n_results: int, n_candidates: int) -> Dict[str, Any]:
+    """
+    Decides how many of the dense candidates (best first, cosine similarity)
+    to rerank. Returns {"action", "candidates", "gap", "spread"}.
+    """
+    plan = {"action": "full", "candidates": min(n_candidates, len(similarities)), "gap": None, "spread": None}
+    if len(similarities) < 2:
+        plan["action"] = "skip"
+        return plan
+    top = similarities[0]
+    plan["gap"] = round(top - similarities[1], 4)
+    plan["spread"] = round(top - similarities[min(n_candidates, len(similarities)) - 1], 4)
+    if RERANK_POLICY != "adaptive":
+        return plan
+
+    if plan["gap"] >= RERANK_SKIP_GAP:
+        plan["action"] = "skip"
+    elif plan["spread"] < RERANK_FLAT_SPREAD:
+        plan["action"] = "widen"
+        plan["candidates"] = len(similarities)
+    else:
+        close = sum(1 for s in similarities[:n_candidates] if s >= top - RERANK_SHRINK_MARGIN)
+        if close < n_candidates:
+            plan["action"] = "shrink"
+            plan["candidates"] = max(close, min(n_results, len(similarities)))
+    return plan
+
+
+def log_decision(query: str, plan: Dict[str, Any], reranked: int, elapsed: float, note: Optional[str] = None):
+    """Records one decision (counters, stdout and the JSONL tuning log)."""
+    _counts[plan["action"]] += 1
+    record = {
+        "ts": time.time(),
+        "query": hashlib.md5(query.encode()).hexdigest()[:12],
+        "action": plan["action"],
+        "gap": plan["gap"],
+        "spread": plan["spread"],
+        "candidates": plan["candidates"],
+        "reranked": reranked,
+        "ms": round(elapsed * 1000, 1),
+    }
+    if note:
+        record["note"] = note
+    print(f"🎯 Rerank {plan['action']}: gap={plan['gap']} spread={plan['spread']} "
+          f"reranked {reranked}/{plan['candidates']}{f' ({note})' if note else ''}", flush=True)
+    if not RERANK_LOG_PATH:
+        return
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(RERANK_LOG_PATH) or ".", exist_ok=True)
+            if os.path.exists(RERANK_LOG_PATH) and os.path.getsize(RERANK_LOG_PATH) >= RERANK_LOG_MAX_BYTES:
+                os.replace(RERANK_LOG_PATH, RERANK_LOG_PATH + ".1")
+            with open(RERANK_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not write rerank log: {e}", flush=True)
+
+
+def decision_stats() -> Dict[str, int]:
+    return dict(_counts)
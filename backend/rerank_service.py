@@ -0,0 +1,139 @@
+"""
+Cross-request micro-batching for the cross-encoder reranker.
+
+Each /query reranks at most 20 (query, chunk) pairs. Under concurrent load
+that means many tiny forward passes fighting over the same cores, so instead
+requests hand their pairs to one batching thread: it takes the first waiting
+request, keeps collecting until RERANK_MAX_BATCH pairs are queued or
+RERANK_MAX_WAIT_MS has passed, scores everything in a single predict() and
+hands each caller its slice back through a future.
+
+Scores are cached per (query hash, chunk id) in an LRU. Chunk ids are content
+hashes, so a cached score stays valid until the chunk text changes.
+
+A caller waits at most RERANK_TIMEOUT_S for its batch; if the batcher is
+stuck behind a slow forward pass, the caller withdraws its request and
+scores its pairs directly instead.
+"""
+import os
+import time
+import queue
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Tuple, Optional
+
+from backend.models import rerank_scores
+
+RERANK_MAX_BATCH = int(os.environ.get("EDITH_RERANK_MAX_BATCH", 64))        # Pairs per forward pass
+RERANK_MAX_WAIT_MS = float(os.environ.get("EDITH_RERANK_MAX_WAIT_MS", 5))   # Wait for more requests
+RERANK_CACHE_SIZE = int(os.environ.get("EDITH_RERANK_CACHE_SIZE", 50000))   # Cached pair scores
+RERANK_TIMEOUT_S = float(os.environ.get("EDITH_RERANK_TIMEOUT_S", 30))      # Max wait for a batch before scoring directly
+
+_service = None
+_service_lock = threading.Lock()
+
+
+class RerankService:
+    def __init__(self, max_batch: int = RERANK_MAX_BATCH, max_wait_ms: float = RERANK_MAX_WAIT_MS,
+                 cache_size: int = RERANK_CACHE_SIZE, timeout_s: float = RERANK_TIMEOUT_S):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.cache_size = cache_size
+        self.timeout = timeout_s
+        self._queue: "queue.Queue" = queue.Queue()
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._stats = {"requests": 0, "pairs": 0, "cache_hits": 0, "batches": 0, "batched_pairs": 0, "timeouts": 0}
+        self._thread = threading.Thread(target=self._loop, name="rerank-batcher", daemon=True)
+        self._thread.start()
+
+    def score(self, query: str, ids: List[str], docs: List[str]) -> List[float]:
+        """Reranker scores for query against each (id, doc), batched with concurrent callers."""
+        qhash = hashlib.md5(query.encode()).hexdigest()
+        scores: List[Optional[float]] = [None] * len(ids)
+        with self._cache_lock:
+            for i, chunk_id in enumerate(ids):
+                cached = self._cache.get((qhash, chunk_id))
+                if cached is not None:
+                    self._cache.move_to_end((qhash, chunk_id))
+                    scores[i] = cached
+            missing = [i for i, s in enumerate(scores) if s is None]
+            self._stats["requests"] += 1
+            self._stats["pairs"] += len(ids)
+            self._stats["cache_hits"] += len(ids) - len(missing)
+
+        if missing:
+            pairs = [(query, docs[i]) for i in missing]
+            future: Future = Future()
+            self._queue.put((pairs, future))
+            try:
+                computed = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                # Withdraw the request (the batcher skips cancelled futures) and score it here
+                future.cancel()
+                with self._cache_lock:
+                    self._stats["timeouts"] += 1
+                print(f"⚠️ Rerank batch timed out after {self.timeout}s, scoring {len(pairs)} pairs directly", flush=True)
+                computed = rerank_scores(pairs)
+            with self._cache_lock:
+                for i, value in zip(missing, computed):
+                    scores[i] = value
+                    self._cache[(qhash, ids[i])] = value
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def _collect(self) -> List[Tuple[List[Tuple[str, str]], Future]]:
+        """Blocks for one request, then gathers more until the batch is full or the window closes."""
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _loop(self):
+        while True:
+            # Drops requests whose caller timed out while they were queued
+            batch = [item for item in self._collect() if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            pairs = [pair for request_pairs, _ in batch for pair in request_pairs]
+            try:
+                flat = rerank_scores(pairs)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self._stats["batches"] += 1
+            self._stats["batched_pairs"] += len(pairs)
+            offset = 0
+            for request_pairs, future in batch:
+                future.set_result(flat[offset:offset + len(request_pairs)])
+                offset += len(request_pairs)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["avg_batch_pairs"] = round(stats["batched_pairs"] / stats["batches"], 1) if stats["batches"] else 0.0
+        stats["cached_scores"] = len(self._cache)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+
+def get_rerank_service() -> RerankService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = RerankService()
+    return _service
@@ -0,0 +1,156 @@
+"""
+Symbol-level chunking and symbol lookup for Python sources.
+
+chunk_python_source() splits a file along its AST: one chunk per function
+or class (large classes become a header chunk plus one chunk per method,
+with class-level code between and after the methods in chunks of their
+own), with module-level code in between grouped into "<module>" chunks. Every
+chunk carries its qualified name, kind, parent class and line range.
+
+The symbols found per file are stored in the ingest manifest, and
+find_symbols() answers "where is X defined" from that table without any
+vector search.
+"""
+import ast
+from typing import List, Dict, Any, Optional, Tuple
+
+# Symbols longer than this are split further (methods of a class, or text splitting)
+MAX_SYMBOL_CHARS = 4000
+MODULE_SYMBOL = "<module>"
+
+def _node_start(node: ast.AST) -> int:
+    decorators = getattr(node, "decorator_list", [])
+    return min([d.lineno for d in decorators] + [node.lineno])
+
+
+def _kind(node: ast.AST, parent: str) -> str:
+    if isinstance(node, ast.ClassDef):
+        return "class"
+    return "method" if parent else "function"
+
+
+def _symbol(node: ast.AST, parent: str = "") -> Dict[str, Any]:
+    qualname = f"{parent}.{node.name}" if parent else node.name
+    return {
+        "symbol": qualname,
+        "symbol_kind": _kind(node, parent),
+        "parent": parent,
+        "start_line": _node_start(node),
+        "end_line": node.end_lineno,
+    }
+
+
+def _text(lines: List[str], start: int, end: int) -> str:
+    return "".join(lines[start - 1:end])
+
+
+def _split_oversized(text: str, meta: Dict[str, Any], splitter) -> List[Tuple[str, Dict[str, Any]]]:
+    if len(text) <= MAX_SYMBOL_CHARS or splitter is None:
+        return [(text, meta)]
+    return [(part, {**meta, "part": i}) for i, part in enumerate(splitter.split_text(text))]
+
+
+def chunk_python_source(source: str, filename: str = "<unknown>", splitter=None) -> Optional[Tuple[List[Tuple[str, Dict[str, Any]]], List[Dict[str, Any]]]]:
+    """
+    Returns (chunks, symbols) where chunks is [(text, metadata)] in file
+    order and symbols lists every function/class/method found.
+    Returns None if the source doesn't parse (caller falls back to text splitting).
+    `splitter` is used for symbols/module code larger than MAX_SYMBOL_CHARS.
+    """
+    try:
+        tree = ast.parse(source, filename=filename)
+    except (SyntaxError, ValueError):
+        return None
+
+    lines = source.splitlines(keepends=True)
+    chunks: List[Tuple[str, Dict[str, Any]]] = []
+    symbols: List[Dict[str, Any]] = []
+    defs = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+    def add_module_code(start: int, end: int):
+        text = _text(lines, start, end)
+        if text.strip():
+            meta = {"symbol": MODULE_SYMBOL, "symbol_kind": "module", "parent": "", "start_line": start, "end_line": end}
+            chunks.extend(_split_oversized(text, meta, splitter))
+
+    def add_class_code(class_meta: Dict[str, Any], start: int, end: int):
+        text = _text(lines, start, end)
+        if text.strip():
+            chunks.extend(_split_oversized(text, {**class_meta, "start_line": start, "end_line": end}, splitter))
+
+    cursor = 1
+    for node in tree.body:
+        if not isinstance(node, defs):
+            continue
+        start, end = _node_start(node), node.end_lineno
+        add_module_code(cursor, start - 1)
+        cursor = end + 1
+
+        meta = _symbol(node)
+        symbols.append(meta)
+        text = _text(lines, start, end)
+
+        methods = [n for n in node.body if isinstance(n, defs)] if isinstance(node, ast.ClassDef) else []
+        for child in methods:
+            symbols.append(_symbol(child, parent=node.name))
+
+        if len(text) <= MAX_SYMBOL_CHARS or not methods:
+            chunks.extend(_split_oversized(text, meta, splitter))
+            continue
+
+        # Large class: header (signature, docstring, attributes) + one chunk per method,
+        # plus the class-level statements between methods and after the last one
+        header_end = _node_start(methods[0]) - 1
+        chunks.extend(_split_oversized(_text(lines, start, header_end), {**meta, "end_line": header_end}, splitter))
+        class_cursor = None
+        for child in methods:
+            child_meta = _symbol(child, parent=node.name)
+            if class_cursor is not None:
+                add_class_code(meta, class_cursor, child_meta["start_line"] - 1)
+            child_text = _text(lines, child_meta["start_line"], child_meta["end_line"])
+            chunks.extend(_split_oversized(child_text, child_meta, splitter))
+            class_cursor = child_meta["end_line"] + 1
+        add_class_code(meta, class_cursor, end)
+
+    add_module_code(cursor, len(lines))
+    return chunks, symbols
+
+
+def symbol_index(repo_name: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    {lowercased name: [symbol entries]} for a repo, keyed by both the
+    qualified name ("Class.method") and the short name ("method").
+    Built from the manifest and cached until it changes.
+    """
+    from backend.manifest import manifest_index
+
+    def build(manifest) -> Dict[str, List[Dict[str, Any]]]:
+        index: Dict[str, List[Dict[str, Any]]] = {}
+        for rel_path, entry in manifest.files.items():
+            for sym in entry.get("symbols", []):
+                item = {**sym, "repo": repo_name, "path": rel_path}
+                keys = {sym["symbol"].lower(), sym["symbol"].split(".")[-1].lower()}
+                for key in keys:
+                    index.setdefault(key, []).append(item)
+        return index
+
+    return manifest_index(repo_name, "symbols", build, {})
+
+
+def find_symbols(name: str, repos: List[str], limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Looks a symbol up by qualified or short name (case-insensitive) in the
+    given repos. Exact-case qualified matches rank first, then classes and
+    functions before methods.
+    """
+    key = name.strip().strip("`'\"()").lower()
+    if not key:
+        return []
+    matches = []
+    for repo_name in repos:
+        matches.extend(symbol_index(repo_name).get(key, []))
+
+    kind_rank = {"class": 0, "function": 1, "method": 2}
+    matches.sort(key=lambda s: (s["symbol"] != name.strip(), s["symbol"].lower() != key,
+                                kind_rank.get(s["symbol_kind"], 3), s["path"]))
+    return matches[:limit]
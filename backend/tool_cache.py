@@ -0,0 +1,136 @@
+"""
+Tool-result cache for the ReAct agent.
+
+Agents keep asking for the same things - the same search_code query in
+consecutive steps, the same read_file for every question about a module -
+and each repeat re-embeds, re-reranks or re-reads. Observations are cached
+per worker, shared by every request, keyed by:
+  - the tool and its normalized argument (whitespace, quotes, case of the
+    search text - not of its path=/repo= filters - and of read_file paths)
+  - the caller's repo scope (results never cross repo permissions)
+  - the corpus version of that scope (manifest.corpus_version), so a
+    re-ingest retires every observation computed from the old content
+
+The cache is LRU-bounded (EDITH_TOOL_CACHE_SIZE entries) and each tool has
+its own TTL (EDITH_TOOL_CACHE_TTL_<TOOL>, seconds). Hit rates are tracked
+per tool (GET /cache/stats).
+"""
+import os
+import re
+import time
+import threading
+from collections import OrderedDict, Counter
+from typing import List, Dict, Any, Optional, Tuple
+
+from backend.manifest import corpus_version
+
+TOOL_CACHE = os.environ.get("EDITH_TOOL_CACHE", "1") != "0"
+TOOL_CACHE_SIZE = int(os.environ.get("EDITH_TOOL_CACHE_SIZE", 2000))
+DEFAULT_TTLS = {
+    "search_code": 900,
+    "find_symbol": 3600,
+    "read_file": 3600,
+    "get_dependencies": 3600,
+    "get_dependents": 3600,
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def tool_ttl(tool: str) -> int:
+    return int(os.environ.get(f"EDITH_TOOL_CACHE_TTL_{tool.upper()}", DEFAULT_TTLS.get(tool, 600)))
+
+
+def normalize_arg(tool: str, arg: str) -> str:
+    arg = re.sub(r"\s+", " ", arg).strip().strip("`'\"")
+    if tool == "search_code":
+        from backend.reasoning import parse_search_filters  # Local import to prevent circular issues
+        # Only the free text is case-insensitive; path and repo filters match exactly
+        text, filters = parse_search_filters(arg)
+        spec = " ".join(f"{key}={value}" for key in sorted(filters)
+                        for value in ([filters[key]] if key == "path" else sorted(filters[key])))
+        return f"{text.lower()} | {spec}" if spec else text.lower()
+    if tool == "read_file":
+        # Path lookups, including the optional repo prefix, are case-insensitive (backend/path_index.py)
+        path = arg.replace("\\", "/")
+        while path.startswith("./"):
+            path = path[2:]
+        return path.lower()
+    return arg
+
+
+class ToolCache:
+    def __init__(self, max_entries: int = TOOL_CACHE_SIZE):
+        self.max_entries = max_entries
+        # key -> (stored_at, observation)
+        self._entries: "OrderedDict[Tuple[str, str, str, str], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits: Counter = Counter()
+        self._misses: Counter = Counter()
+        self._expired: Counter = Counter()
+        self._evictions = 0
+
+    def key(self, tool: str, arg: str, repos: Optional[List[str]]) -> Tuple[str, str, str, str]:
+        scope = ",".join(sorted(repos)) if repos is not None else "*"
+        return tool, normalize_arg(tool, arg), scope, corpus_version(repos)
+
+    def get(self, tool: str, arg: str, repos: Optional[List[str]] = None) -> Optional[str]:
+        key = self.key(tool, arg, repos)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses[tool] += 1
+                return None
+            if time.time() - entry[0] > tool_ttl(tool):
+                del self._entries[key]
+                self._expired[tool] += 1
+                self._misses[tool] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits[tool] += 1
+            return entry[1]
+
+    def put(self, tool: str, arg: str, observation: str, repos: Optional[List[str]] = None):
+        key = self.key(tool, arg, repos)
+        with self._lock:
+            self._entries[key] = (time.time(), observation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = Counter(key[0] for key in self._entries)
+            tools = sorted(set(self._hits) | set(self._misses) | set(entries))
+            per_tool = {}
+            for tool in tools:
+                lookups = self._hits[tool] + self._misses[tool]
+                per_tool[tool] = {
+                    "entries": entries[tool],
+                    "hits": self._hits[tool],
+                    "misses": self._misses[tool],
+                    "hit_rate": round(self._hits[tool] / lookups, 3) if lookups else 0.0,
+                    "expired": self._expired[tool],
+                    "ttl_s": tool_ttl(tool),
+                }
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self._evictions,
+                "tools": per_tool,
+            }
+
+
+def get_tool_cache() -> ToolCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ToolCache()
+    return _cache
@@ -0,0 +1,574 @@
+"""
+Vector storage backends.
+
+VectorBackend is the subset of Chroma's collection API that EDITH uses
+(upsert / delete / get / query / count), so vector_store can run on either:
+
+  - ChromaBackend: the Chroma PersistentClient collection (default)
+  - NumpyBackend:  an in-process index in data/vector_index/<collection>/
+                   with vectors in a memory-mapped float16 or int8 matrix
+
+Selected with EDITH_VECTOR_BACKEND=chroma|numpy. Queries take embeddings
+(vector_store embeds the query text) and return cosine distances (1 - cos)
+on both backends.
+
+The NumPy backend is append-only: an upsert writes new rows and retires the
+old row of the same id; documents, metadata and the id -> row mapping live in
+SQLite. Every uvicorn worker maps the same files read-only, so the vector
+pages are shared through the OS page cache instead of loaded per process.
+Small corpora are searched exactly; once a collection passes IVF_MIN_ROWS,
+optimize() (run after each ingest) clusters it into IVF lists and queries
+only scan the IVF_NPROBE closest lists plus rows added since the last build.
+
+Compaction renumbers rows. It writes the vector files of the new layout
+under new names and switches the "layout" setting in the same transaction,
+so a reader always maps the files and row numbers of one layout, and
+re-runs a query whose row numbers were resolved against an older one.
+
+Copy an existing Chroma collection into the NumPy index:
+    python -m backend.vector_backend --migrate
+"""
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+VECTOR_INDEX_DIR = "data/vector_index"
+# Live rows before the NumPy backend switches from exact search to IVF
+IVF_MIN_ROWS = int(os.environ.get("EDITH_IVF_MIN_ROWS", 50000))
+IVF_NPROBE = int(os.environ.get("EDITH_IVF_NPROBE", 8))
+IVF_REBUILD_RATIO = 0.25    # Rebuild IVF once rows added since the build exceed this share
+COMPACT_DEAD_RATIO = 0.3    # Rewrite the vector file once this share of rows is dead
+SCAN_BLOCK_ROWS = 65536     # Rows converted to float32 at a time while scanning
+
+
+class VectorBackend:
+    """Interface shared by the vector stores (method names follow Chroma's collection API)."""
+    name = "base"
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]):
+        raise NotImplementedError
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            offset: Optional[int] = None, limit: Optional[int] = None,
+            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """{"ids", "documents", "metadatas"[, "embeddings"]} as flat lists."""
+        raise NotImplementedError
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """{"ids", "documents", "metadatas", "distances"}: one list per query embedding, nearest first."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def optimize(self):
+        """Post-ingest maintenance (index builds, compaction). No-op by default."""
+
+
+class ChromaBackend(VectorBackend):
+    name = "chroma"
+
+    def __init__(self, collection):
+        self.collection = collection
+        # Chroma's default space is squared L2; on normalized vectors that is 2 * cosine distance
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        self._distance_scale = 0.5 if space == "l2" else 1.0
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def get(self, ids=None, where=None, offset=None, limit=None, include=None):
+        return self.collection.get(ids=ids, where=where, offset=offset, limit=limit,
+                                   include=include or ["documents", "metadatas"])
+
+    def query(self, query_embeddings, n_results=10, where=None):
+        result = self.collection.query(query_embeddings=[list(map(float, q)) for q in query_embeddings],
+                                       n_results=n_results, where=where,
+                                       include=["documents", "metadatas", "distances"])
+        result["distances"] = [[d * self._distance_scale for d in row] for row in result.get("distances") or []]
+        return result
+
+    def count(self):
+        return self.collection.count()
+
+
+@contextmanager
+def _read_snapshot(conn: sqlite3.Connection):
+    """Runs the enclosed reads on one consistent snapshot of the database (WAL read transaction)."""
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+
+
+def _where_sql(where: Dict[str, Any], params: List[Any]) -> str:
+    """Translates a Chroma-style metadata filter ($and/$or/$in/$nin/$eq/$ne) to SQL over the JSON metadata."""
+    clauses = []
+    for key, cond in where.items():
+        if key in ("$and", "$or"):
+            joined = f" {key[1:].upper()} ".join(f"({_where_sql(c, params)})" for c in cond)
+            clauses.append(joined or "1")
+            continue
+        field = f"json_extract(metadata, '$.\"{key}\"')"
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, value in cond.items():
+            if op in ("$in", "$nin"):
+                placeholders = ",".join("?" * len(value)) or "NULL"
+                clauses.append(f"{field} {'IN' if op == '$in' else 'NOT IN'} ({placeholders})")
+                params.extend(value)
+            elif op in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+                sql_op = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}[op]
+                clauses.append(f"{field} {sql_op} ?")
+                params.append(value)
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+    return " AND ".join(clauses) or "1"
+
+
+class NumpyBackend(VectorBackend):
+    name = "numpy"
+
+    def __init__(self, path: str, dtype: str = "float16"):
+        if dtype not in ("float16", "int8"):
+            raise ValueError("NumPy backend dtype must be float16 or int8")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.db_path = os.path.join(path, "index.sqlite")
+        # Writes go through one connection under self._lock; readers get a connection per thread
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._local = threading.local()
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, id TEXT NOT NULL, live INTEGER NOT NULL,
+                                             document TEXT, metadata TEXT);
+            CREATE INDEX IF NOT EXISTS rows_id ON rows(id, live);
+            CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self._db.commit()
+        self.dtype = self._setting("dtype", self._db) or dtype
+        self.dim = int(self._setting("dim", self._db) or 0) or None
+        self._lock = threading.RLock()
+        self._state: Dict[str, Any] = {"version": -1}
+
+    # ---------- bookkeeping ----------
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, timeout=60)
+        return conn
+
+    def _setting(self, key: str, conn: Optional[sqlite3.Connection] = None) -> Optional[str]:
+        row = (conn or self._db).execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value):
+        self._db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _bump_version(self):
+        self._set("version", int(self._setting("version") or 0) + 1)
+
+    def _layout(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        return int(self._setting("layout", conn) or 0)
+
+    def _files(self, layout: int) -> Tuple[str, str]:
+        """(vectors, scales) paths of a row layout; every compaction starts a new one."""
+        suffix = f".{layout}" if layout else ""
+        return os.path.join(self.path, f"vectors{suffix}.bin"), os.path.join(self.path, f"scales{suffix}.f32")
+
+    def _row_bytes(self) -> int:
+        return self.dim * (1 if self.dtype == "int8" else 2)
+
+    def _n_rows(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        return (conn or self._db).execute("SELECT COALESCE(MAX(row) + 1, 0) FROM rows").fetchone()[0]
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.dtype == "float16":
+            return vectors.astype(np.float16), None
+        # Symmetric per-row int8 quantization
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _refresh(self) -> Dict[str, Any]:
+        """
+        Current read state, re-mapping the files when another writer (thread or
+        process) has changed the index. Queries run on the returned snapshot
+        without holding the lock.
+        """
+        with self._lock:
+            conn = self._reader()
+            while self._setting("version", conn) != self._state["version"]:
+                try:
+                    with _read_snapshot(conn):
+                        self._state = self._load_state(conn)
+                except FileNotFoundError:
+                    continue  # A compaction removed the files of the layout we read; read the new one
+            return self._state
+
+    def _load_state(self, conn: sqlite3.Connection) -> Dict[str, Any]:
+        self.dim = int(self._setting("dim", conn) or 0) or None
+        n_rows = self._n_rows(conn)
+        layout = self._layout(conn)
+        state: Dict[str, Any] = {"version": self._setting("version", conn), "layout": layout, "n_rows": n_rows,
+                                 "vectors": None, "scales": None, "ivf": None, "masks": {}}
+        if self.dim and n_rows:
+            np_dtype = np.int8 if self.dtype == "int8" else np.float16
+            vectors_path, scales_path = self._files(layout)
+            state["vectors"] = np.memmap(vectors_path, dtype=np_dtype, mode="r", shape=(n_rows, self.dim))
+            if self.dtype == "int8":
+                state["scales"] = np.memmap(scales_path, dtype=np.float32, mode="r", shape=(n_rows,))
+            live = np.zeros(n_rows, dtype=bool)
+            live_rows = [r for (r,) in conn.execute("SELECT row FROM rows WHERE live = 1")]
+            live[live_rows] = True
+            state["live"] = live
+            if self._setting("ivf_trained_rows", conn):
+                state["ivf"] = {
+                    "centroids": np.load(os.path.join(self.path, "ivf_centroids.npy")),
+                    "rows": np.load(os.path.join(self.path, "ivf_rows.npy"), mmap_mode="r"),
+                    "offsets": np.load(os.path.join(self.path, "ivf_offsets.npy")),
+                    "trained_rows": int(self._setting("ivf_trained_rows", conn)),
+                }
+        return state
+
+    # ---------- writes ----------
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        # Last occurrence of an id wins
+        latest = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        order = sorted(latest.values())
+        vectors = np.asarray(embeddings, dtype=np.float32)[order]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if self.dim is None:
+                    self.dim = int(self._setting("dim") or 0) or vectors.shape[1]
+                    self._set("dim", self.dim)
+                    self._set("dtype", self.dtype)
+                first_row = self._n_rows()
+                encoded, scales = self._encode(vectors)
+                vectors_path, scales_path = self._files(self._layout())
+                # Truncate first: a crashed writer may have appended rows it never committed
+                with open(vectors_path, "ab") as f:
+                    f.truncate(first_row * self._row_bytes())
+                    f.write(encoded.tobytes())
+                if scales is not None:
+                    with open(scales_path, "ab") as f:
+                        f.truncate(first_row * 4)
+                        f.write(scales.tobytes())
+                unique_ids = [ids[i] for i in order]
+                self._retire(unique_ids)
+                self._db.executemany(
+                    "INSERT INTO rows (row, id, live, document, metadata) VALUES (?, ?, 1, ?, ?)",
+                    [(first_row + n, ids[i], documents[i], json.dumps(metadatas[i] or {}))
+                     for n, i in enumerate(order)])
+                self._bump_version()
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _retire(self, ids: List[str]):
+        for i in range(0, len(ids), 500):
+            part = ids[i:i + 500]
+            self._db.execute(f"UPDATE rows SET live = 0 WHERE live = 1 AND id IN ({','.join('?' * len(part))})", part)
+
+    def delete(self, ids):
+        if not ids:
+            return
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._retire(list(ids))
+            self._bump_version()
+            self._db.execute("COMMIT")
+
+    # ---------- reads ----------
+
+    def count(self):
+        return self._reader().execute("SELECT COUNT(*) FROM rows WHERE live = 1").fetchone()[0]
+
+    def _rows_matching(self, where: Dict[str, Any]) -> np.ndarray:
+        params: List[Any] = []
+        sql = f"SELECT row FROM rows WHERE live = 1 AND ({_where_sql(where, params)})"
+        return np.fromiter((r for (r,) in self._reader().execute(sql, params)), dtype=np.int64)
+
+    def _mask(self, state: Dict[str, Any], where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Live rows passing the filter, cached per filter until the index changes."""
+        if not where:
+            return state["live"]
+        key = json.dumps(where, sort_keys=True)
+        mask = state["masks"].get(key)
+        if mask is None:
+            mask = np.zeros(state["n_rows"], dtype=bool)
+            rows = self._rows_matching(where)
+            mask[rows[rows < state["n_rows"]]] = True
+            if len(state["masks"]) > 256:
+                state["masks"].clear()
+            state["masks"][key] = mask
+        return mask
+
+    def _scores(self, state: Dict[str, Any], rows: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+        """Dot products of query with the given rows (all rows if None), scanned block by block."""
+        vectors, scales = state["vectors"], state["scales"]
+        total = state["n_rows"] if rows is None else len(rows)
+        out = np.empty(total, dtype=np.float32)
+        for start in range(0, total, SCAN_BLOCK_ROWS):
+            end = min(start + SCAN_BLOCK_ROWS, total)
+            index = slice(start, end) if rows is None else rows[start:end]
+            block = np.asarray(vectors[index], dtype=np.float32) @ query
+            if scales is not None:
+                block *= scales[index]
+            out[start:end] = block
+        return out
+
+    def _candidate_rows(self, state: Dict[str, Any], query: np.ndarray, mask: np.ndarray,
+                        n_results: int) -> Optional[np.ndarray]:
+        """Rows in the nprobe closest IVF lists plus rows added since the build; None = scan everything."""
+        ivf = state["ivf"]
+        if ivf is None:
+            return None
+        nprobe = min(IVF_NPROBE, len(ivf["centroids"]))
+        lists = np.argpartition(-(ivf["centroids"] @ query), nprobe - 1)[:nprobe]
+        parts = [np.asarray(ivf["rows"][ivf["offsets"][l]:ivf["offsets"][l + 1]]) for l in lists]
+        parts.append(np.arange(ivf["trained_rows"], state["n_rows"]))
+        rows = np.concatenate(parts)
+        rows = rows[mask[rows]]
+        # A selective filter can leave the probed lists nearly empty; fall back to an exact scan
+        return rows if len(rows) >= n_results else None
+
+    def query(self, query_embeddings, n_results=10, where=None):
+        result: Dict[str, List[Any]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        while True:
+            state = self._refresh()
+            if state["vectors"] is None:
+                hits = [[] for _ in query_embeddings]
+                break
+            hits = self._search(state, query_embeddings, n_results, where)
+            records = self._records([r for row_hits in hits for r, _ in row_hits], state["layout"])
+            if records is not None:
+                break
+            # Compacted since our snapshot: its row numbers mean other chunks now, search again
+
+        for row_hits in hits:
+            result["ids"].append([records[r][0] for r, _ in row_hits])
+            result["documents"].append([records[r][1] for r, _ in row_hits])
+            result["metadatas"].append([records[r][2] for r, _ in row_hits])
+            result["distances"].append([1.0 - s for _, s in row_hits])
+        return result
+
+    def _search(self, state: Dict[str, Any], query_embeddings, n_results: int,
+                where: Optional[Dict[str, Any]]) -> List[List[Tuple[int, float]]]:
+        """[(row, score)] best first for each query, on the rows of the given snapshot."""
+        mask = self._mask(state, where)
+        hits = []
+        for q in query_embeddings:
+            query = np.asarray(q, dtype=np.float32)
+            rows = self._candidate_rows(state, query, mask, n_results)
+            if rows is None:
+                scores = self._scores(state, None, query)
+                scores[~mask] = -np.inf
+                rows = np.arange(len(scores))
+            else:
+                scores = self._scores(state, rows, query)
+            k = min(n_results, int(np.isfinite(scores).sum()))
+            top = np.argpartition(-scores, k - 1)[:k] if k else np.array([], dtype=np.int64)
+            top = top[np.argsort(-scores[top])]
+            hits.append([(int(rows[i]), float(scores[i])) for i in top])
+        return hits
+
+    def _records(self, rows: List[int], layout: int) -> Optional[Dict[int, Tuple[str, str, Dict[str, Any]]]]:
+        """
+        (id, document, metadata) per row, or None if the index was compacted
+        since `layout` (row numbers now point at other chunks).
+        """
+        records = {}
+        conn = self._reader()
+        with _read_snapshot(conn):
+            if self._layout(conn) != layout:
+                return None
+            for i in range(0, len(rows), 500):
+                part = rows[i:i + 500]
+                for row, chunk_id, document, metadata in conn.execute(
+                        f"SELECT row, id, document, metadata FROM rows WHERE row IN ({','.join('?' * len(part))})", part):
+                    records[row] = (chunk_id, document, json.loads(metadata or "{}"))
+        return records
+
+    def get(self, ids=None, where=None, offset=None, limit=None, include=None):
+        include = include or ["documents", "metadatas"]
+        params: List[Any] = []
+        sql = "SELECT row, id, document, metadata FROM rows WHERE live = 1"
+        if ids is not None:
+            if not ids:
+                return {"ids": [], "documents": [], "metadatas": []}
+            sql += f" AND id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+        if where:
+            sql += f" AND ({_where_sql(where, params)})"
+        sql += " ORDER BY row"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit if limit is not None else -1, offset or 0])
+        while True:
+            conn = self._reader()
+            with _read_snapshot(conn):
+                fetched = conn.execute(sql, params).fetchall()
+                layout = self._layout(conn)
+            # Row numbers only index the vector files of the layout they were read in
+            state = self._refresh() if "embeddings" in include else None
+            if state is None or state["layout"] == layout:
+                break
+        result: Dict[str, Any] = {"ids": [r[1] for r in fetched]}
+        if "documents" in include:
+            result["documents"] = [r[2] for r in fetched]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(r[3] or "{}") for r in fetched]
+        if state is not None:
+            rows = np.array([r[0] for r in fetched], dtype=np.int64)
+            vectors = self._dequantize(state, rows) if len(rows) else np.zeros((0, self.dim or 0), dtype=np.float32)
+            result["embeddings"] = vectors.tolist()
+        return result
+
+    # ---------- maintenance ----------
+
+    def optimize(self):
+        with self._lock:
+            n_rows = self._refresh()["n_rows"]
+            live = self.count()
+            if n_rows and (n_rows - live) / n_rows > COMPACT_DEAD_RATIO:
+                self.compact()
+                n_rows = self._refresh()["n_rows"]
+            trained = int(self._setting("ivf_trained_rows") or 0)
+            if live < IVF_MIN_ROWS:
+                if trained:
+                    self._db.execute("DELETE FROM settings WHERE key = 'ivf_trained_rows'")
+                    self._bump_version()
+                    self._db.commit()
+            elif not trained or (n_rows - trained) / max(trained, 1) > IVF_REBUILD_RATIO:
+                self.build_ivf()
+
+    def compact(self):
+        """Rewrites the vector file with live rows only and renumbers them."""
+        with self._lock:
+            state = self._refresh()
+            if state["vectors"] is None:
+                return
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = np.array([r for (r,) in self._db.execute("SELECT row FROM rows WHERE live = 1 ORDER BY row")],
+                                dtype=np.int64)
+                old_layout = self._layout()
+                new_files = self._files(old_layout + 1)
+                with open(new_files[0], "wb") as f:
+                    for start in range(0, len(rows), SCAN_BLOCK_ROWS):
+                        f.write(np.asarray(state["vectors"][rows[start:start + SCAN_BLOCK_ROWS]]).tobytes())
+                if state["scales"] is not None:
+                    with open(new_files[1], "wb") as f:
+                        f.write(np.asarray(state["scales"][rows]).tobytes())
+                # Live rows keep their order and are renumbered 0..n-1 (one pass, no per-row lookups)
+                self._db.execute("DROP TABLE IF EXISTS rows_compacted")
+                self._db.execute("CREATE TABLE rows_compacted (row INTEGER PRIMARY KEY, id TEXT NOT NULL, "
+                                 "live INTEGER NOT NULL, document TEXT, metadata TEXT)")
+                self._db.execute("INSERT INTO rows_compacted (row, id, live, document, metadata) "
+                                 "SELECT ROW_NUMBER() OVER (ORDER BY row) - 1, id, live, document, metadata "
+                                 "FROM rows WHERE live = 1")
+                self._db.execute("DROP TABLE rows")
+                self._db.execute("ALTER TABLE rows_compacted RENAME TO rows")
+                self._db.execute("CREATE INDEX rows_id ON rows(id, live)")
+                self._db.execute("DELETE FROM settings WHERE key = 'ivf_trained_rows'")
+                self._set("layout", old_layout + 1)
+                self._bump_version()
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                for path in self._files(self._layout() + 1):
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+            # Readers still on the old layout keep their mappings; new ones open the new files
+            for path in self._files(old_layout):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # Still mapped by a reader on Windows
+            print(f"Compacted vector index to {len(rows)} rows", flush=True)
+
+    def build_ivf(self, n_lists: Optional[int] = None, iterations: int = 10, seed: int = 0):
+        """Spherical k-means over the live rows; each row is filed under its closest centroid."""
+        with self._lock:
+            state = self._refresh()
+            if state["vectors"] is None:
+                return
+            live_rows = np.flatnonzero(state["live"])
+            if not len(live_rows):
+                return
+            n_lists = n_lists or max(1, min(int(4 * np.sqrt(len(live_rows))), 4096))
+            rng = np.random.default_rng(seed)
+            sample = np.sort(rng.choice(live_rows, size=min(len(live_rows), n_lists * 64), replace=False))
+            data = self._dequantize(state, sample)
+            centroids = data[rng.choice(len(data), size=min(n_lists, len(data)), replace=False)]
+            for _ in range(iterations):
+                assign = np.argmax(data @ centroids.T, axis=1)
+                for c in range(len(centroids)):
+                    members = data[assign == c]
+                    if len(members):
+                        centroid = members.sum(axis=0)
+                        centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-12)
+
+            assign = np.empty(len(live_rows), dtype=np.int64)
+            for start in range(0, len(live_rows), SCAN_BLOCK_ROWS):
+                block = self._dequantize(state, live_rows[start:start + SCAN_BLOCK_ROWS])
+                assign[start:start + SCAN_BLOCK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum(np.bincount(assign, minlength=len(centroids)))
+
+            for name, array in (("ivf_centroids", centroids.astype(np.float32)),
+                                ("ivf_rows", live_rows[order]), ("ivf_offsets", offsets)):
+                np.save(os.path.join(self.path, f"{name}.tmp.npy"), array)
+                os.replace(os.path.join(self.path, f"{name}.tmp.npy"), os.path.join(self.path, f"{name}.npy"))
+            self._set("ivf_trained_rows", state["n_rows"])
+            self._bump_version()
+            self._db.commit()
+            print(f"Built IVF index: {len(live_rows)} rows in {len(centroids)} lists", flush=True)
+
+    def _dequantize(self, state: Dict[str, Any], rows: np.ndarray) -> np.ndarray:
+        data = np.asarray(state["vectors"][rows], dtype=np.float32)
+        if state["scales"] is not None:
+            data *= np.asarray(state["scales"][rows])[:, None]
+        return data
+
+
+def copy_backend(source: VectorBackend, target: VectorBackend, batch_size: int = 1000) -> int:
+    """Copies every chunk (with its embedding) from one backend to another. Returns the count."""
+    total = source.count()
+    for offset in range(0, total, batch_size):
+        batch = source.get(offset=offset, limit=batch_size, include=["documents", "metadatas", "embeddings"])
+        target.upsert(batch["ids"], batch["embeddings"], batch["documents"], batch["metadatas"])
+        print(f"Copied {min(offset + batch_size, total)}/{total} chunks", flush=True)
+    target.optimize()
+    return total
+
+
+if __name__ == "__main__":
+    import sys
+    from backend.vector_store import get_chroma_backend, get_numpy_backend
+
+    if "--migrate" in sys.argv:
+        # Copies the Chroma collection into the NumPy index (then set EDITH_VECTOR_BACKEND=numpy)
+        print(f"✅ Copied {copy_backend(get_chroma_backend(), get_numpy_backend())} chunks to the NumPy index")
+    else:
+        print("Usage: python -m backend.vector_backend --migrate")
@@ -1,52 +1,69 @@
 import os
+import time
+import threading
 import chromadb
-from chromadb.utils import embedding_functions
-from typing import List, Dict, Any
-from sentence_transformers import CrossEncoder
+from typing import List, Dict, Any, Optional
+
+# Models are loaded once per process by the shared registry
+from backend.models import get_embedding_function
+from backend.rerank_service import get_rerank_service
+from backend.lexical_index import get_lexical_index
+from backend.vector_backend import VectorBackend, ChromaBackend, NumpyBackend, VECTOR_INDEX_DIR
+from backend.repo_files import PATH_DEPTH, path_parts
+from backend.rerank_policy import RERANK_POLICY, WIDE_CANDIDATES, plan_rerank, log_decision
 
 # Use persistent client
 CHROMA_DATA_PATH = "data/chroma_db"
+COLLECTION_NAME = "edith_premium_v2"  # New collection for better embeddings
 
-# Best-in-class embedding model for code
-# Options: "BAAI/bge-base-en-v1.5" (general), "thenlper/gte-base" (fast), 
-#          "jinaai/jina-embeddings-v2-base-code" (code-specific)
-EMBEDDING_MODEL = "BAAI/bge-base-en-v1.5"
-
-# Cross-encoder reranker for precision
-# This model scores query-document pairs for relevance
-RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+# Vector store: "chroma" (default) or "numpy" (memory-mapped local index, see backend/vector_backend.py)
+VECTOR_BACKEND = os.environ.get("EDITH_VECTOR_BACKEND", "chroma").lower()
+NUMPY_DTYPE = os.environ.get("EDITH_NUMPY_DTYPE", "float16")  # float16 or int8
 
-_reranker = None
+# Hybrid retrieval: BM25 hits are fused with dense hits (reciprocal-rank fusion) before reranking
+HYBRID_SEARCH = os.environ.get("EDITH_HYBRID_SEARCH", "1") != "0"
+RRF_K = 60
 
-def get_reranker():
-    """Lazy-load the reranker model."""
-    global _reranker
-    if _reranker is None:
-        print("Loading reranker model...", flush=True)
-        _reranker = CrossEncoder(RERANKER_MODEL, max_length=512)
-    return _reranker
+_client = None
+_collection = None
+_collection_lock = threading.Lock()
 
 def get_db_client():
-    return chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+    global _client
+    if _client is None:
+        _client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+    return _client
 
-def get_collection():
-    client = get_db_client()
-    
-    # Use premium embedding model
-    print(f"Loading embedding model: {EMBEDDING_MODEL}...", flush=True)
-    emb_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name=EMBEDDING_MODEL
-    )
-        
-    return client.get_or_create_collection(
-        name="edith_premium_v2",  # New collection for better embeddings
-        embedding_function=emb_fn
-    )
+def get_chroma_backend(emb_fn=None) -> ChromaBackend:
+    return ChromaBackend(get_db_client().get_or_create_collection(
+        name=COLLECTION_NAME,
+        embedding_function=emb_fn or get_embedding_function()
+    ))
+
+def get_numpy_backend() -> NumpyBackend:
+    return NumpyBackend(os.path.join(VECTOR_INDEX_DIR, COLLECTION_NAME), dtype=NUMPY_DTYPE)
+
+def get_collection(emb_fn=None) -> VectorBackend:
+    """Shared vector backend handle (EDITH_VECTOR_BACKEND), with Chroma bound to the registry's embedding function."""
+    global _collection
+    if _collection is None:
+        with _collection_lock:
+            if _collection is None:
+                if VECTOR_BACKEND == "numpy":
+                    _collection = get_numpy_backend()
+                elif VECTOR_BACKEND == "chroma":
+                    _collection = get_chroma_backend(emb_fn)
+                else:
+                    raise ValueError(f"Unknown vector backend '{VECTOR_BACKEND}' (expected chroma or numpy)")
+    return _collection
 
 def add_documents(documents: List[Dict[str, Any]]):
     """
-    Adds a list of document chunks to the ChromaDB collection.
+    Adds a list of document chunks to the vector store (embedding them through the embedding cache).
     """
+    from backend.models import embedding_model_key
+    from backend.embedding_cache import get_embedding_cache
+
     if not documents:
         return
         
@@ -62,58 +79,211 @@ def add_documents(documents: List[Dict[str, Any]]):
     
     for i in range(0, len(ids), batch_size):
         end_idx = min(i + batch_size, len(ids))
+        embeddings, _ = get_embedding_cache(embedding_model_key()).embed(documents_content[i:end_idx], get_embedding_function())
         collection.upsert(
             ids=ids[i:end_idx],
+            embeddings=embeddings,
             documents=documents_content[i:end_idx],
             metadatas=metadatas[i:end_idx]
         )
+        get_lexical_index().upsert(documents[i:end_idx])
         total_added += (end_idx - i)
         print(f"Embedded batch {i//batch_size + 1}: {total_added}/{len(ids)} chunks", flush=True)
 
-def query_documents(query_text: str, n_results: int = 5) -> Dict[str, Any]:
+def upsert_embedded(collection, documents: List[Dict[str, Any]], embeddings):
+    """
+    Upserts a batch of chunks whose embeddings were computed up front
+    (used by the streaming pipeline, which embeds on its own thread).
     """
-    Queries the collection with semantic search + reranking.
+    collection.upsert(
+        ids=[d["id"] for d in documents],
+        embeddings=[list(map(float, e)) for e in embeddings],
+        documents=[d["content"] for d in documents],
+        metadatas=[d["metadata"] for d in documents]
+    )
+    get_lexical_index().upsert(documents)
+
+def delete_documents(ids: List[str], collection=None):
+    """
+    Removes chunks by id (used by incremental ingestion for modified/deleted files).
+    """
+    if not ids:
+        return
+        
+    if collection is None:
+        collection = get_collection()
     
-    1. Retrieve more candidates (3x requested)
-    2. Rerank with cross-encoder
-    3. Return top n_results
+    batch_size = 500
+    for i in range(0, len(ids), batch_size):
+        collection.delete(ids=ids[i:i + batch_size])
+    get_lexical_index().delete(ids)
+    print(f"Deleted {len(ids)} stale chunks", flush=True)
+
+def legacy_chunk_ids(sources: List[str], collection=None) -> List[str]:
+    """
+    Ids of chunks stored for the given paths before chunks were namespaced
+    per repo (ids "<path>:<i>", no "repo" metadata). They are unscoped
+    duplicates of the repo's current chunks.
     """
+    if collection is None:
+        collection = get_collection()
+
+    legacy = []
+    batch_size = 500
+    for i in range(0, len(sources), batch_size):
+        batch = sources[i:i + batch_size]
+        found = collection.get(where={"source": {"$in": batch}}, include=["metadatas"])
+        legacy.extend(cid for cid, meta in zip(found["ids"], found["metadatas"]) if not (meta or {}).get("repo"))
+    return legacy
+
+def repo_filter(repos: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    """Chroma `where` clause restricting a query to the given repos (None = all repos)."""
+    if repos is None:
+        return None
+    if len(repos) == 1:
+        return {"repo": repos[0]}
+    return {"repo": {"$in": list(repos)}}
+
+def build_filter(repos: Optional[List[str]] = None, path_prefix: Optional[str] = None,
+                 languages: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    `where` clause for repo scope, path prefix and languages. A path prefix is
+    matched on the dir1..dirN metadata; its last component may also be a file
+    name. Prefixes deeper than PATH_DEPTH are narrowed further by in_path_prefix().
+    """
+    clauses = []
+    if repos is not None:
+        clauses.append(repo_filter(repos))
+    if languages:
+        clauses.append({"language": languages[0]} if len(languages) == 1 else {"language": {"$in": list(languages)}})
+    parts = path_parts(path_prefix or "")
+    if parts:
+        *dirs, last = parts[:PATH_DEPTH + 1]
+        clauses.extend({f"dir{i + 1}": d} for i, d in enumerate(dirs))
+        if len(parts) <= PATH_DEPTH:
+            clauses.append({"$or": [{f"dir{len(parts)}": last}, {"source": "/".join(parts)}]})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def in_path_prefix(meta: Dict[str, Any], path_prefix: Optional[str]) -> bool:
+    prefix = "/".join(path_parts(path_prefix or ""))
+    source = meta.get("source", "")
+    return not prefix or source == prefix or source.startswith(prefix + "/")
+
+def fuse_rankings(rankings: List[List[str]], k: int = RRF_K) -> List[str]:
+    """Reciprocal-rank fusion: ids ordered by sum(1 / (k + rank)) over the rankings they appear in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda i: scores[i], reverse=True)
+
+def query_documents(query_text: str, n_results: int = 5, repos: Optional[List[str]] = None,
+                    path_prefix: Optional[str] = None, languages: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Queries the collection with hybrid (dense + BM25) search + reranking.
+    If repos, path_prefix or languages are given, only matching chunks are
+    searched (filtered inside both indexes, not after ranking).
+    
+    1. Retrieve a wide dense candidate list
+    2. Decide from the dense scores how many candidates to rerank (backend.rerank_policy)
+    3. Fuse them with lexical (BM25) hits (RRF) into one candidate list
+    4. Rerank with cross-encoder (unless the policy skips it)
+    5. Return top n_results
+    
+    Besides documents/metadatas/ids, the result carries the reranker scores
+    of the returned chunks ('scores', empty if reranking was skipped) and
+    'retrieval' = {"action", "top_similarity", "gap"} so callers can judge
+    how confident retrieval was.
+    """
+    if repos is not None and not repos:
+        return {'documents': [[]], 'metadatas': [[]], 'ids': [[]]}
+    
     collection = get_collection()
+    scoped = bool(path_prefix or languages)
+    # Get 3x candidates, max 20; a path/language scope is already narrow, so 2x is enough to rerank
+    n_candidates = min(n_results * (2 if scoped else 3), 20)
+    # The adaptive policy may widen to WIDE_CANDIDATES; fetching them is cheap, reranking them is not
+    n_dense = max(n_candidates, WIDE_CANDIDATES) if RERANK_POLICY == "adaptive" else n_candidates
+    started = time.time()
     
     # Step 1: Over-retrieve candidates
+    query_embedding = get_embedding_function()([query_text])[0]
+    where = build_filter(repos, path_prefix, languages)
     candidates = collection.query(
-        query_texts=[query_text],
-        n_results=min(n_results * 3, 20)  # Get 3x candidates, max 20
+        query_embeddings=[query_embedding],
+        n_results=n_dense,
+        where=where
     )
+    docs = candidates['documents'][0] if candidates['documents'] else []
+    metas = candidates['metadatas'][0] if candidates['metadatas'] else []
+    ids = candidates['ids'][0] if candidates['ids'] else []
+    similarities = [1.0 - d for d in candidates['distances'][0]] if candidates.get('distances') else []
     
-    if not candidates['documents'] or not candidates['documents'][0]:
-        return {'documents': [[]], 'metadatas': [[]], 'ids': [[]]}
+    # Step 2: Skip, shrink or widen reranking depending on how decisive the dense scores are
+    plan = plan_rerank(similarities, n_results, n_candidates)
+    note = None
+    n_candidates = plan["candidates"]
+    ids, docs, metas = ids[:n_candidates], docs[:n_candidates], metas[:n_candidates]
     
-    docs = candidates['documents'][0]
-    metas = candidates['metadatas'][0]
-    ids = candidates['ids'][0]
+    # Step 3: Fuse with exact-token (BM25) hits; identifiers and error strings often only match lexically
+    if HYBRID_SEARCH:
+        dense_count = len(ids)
+        lexical_ids = [chunk_id for chunk_id, _ in get_lexical_index().search(query_text, n_candidates, repos,
+                                                                              path_prefix, languages)]
+        fused = fuse_rankings([ids, lexical_ids])[:n_candidates]
+        if plan["action"] == "skip" and lexical_ids and ids and lexical_ids[0] != ids[0]:
+            # A decisive dense winner that BM25 disagrees with is not decisive
+            plan["action"], note = "full", "lexical top hit differs"
+        known = {chunk_id: (doc, meta) for chunk_id, doc, meta in zip(ids, docs, metas)}
+        missing = [chunk_id for chunk_id in fused if chunk_id not in known]
+        if missing:
+            # The same scope as the dense query, so a lexical hit can never widen it
+            extra = collection.get(ids=missing, where=where, include=["documents", "metadatas"])
+            known.update({chunk_id: (doc, meta) for chunk_id, doc, meta in zip(extra['ids'], extra['documents'], extra['metadatas'])})
+        ids = [chunk_id for chunk_id in fused if chunk_id in known]
+        docs = [known[chunk_id][0] for chunk_id in ids]
+        metas = [known[chunk_id][1] for chunk_id in ids]
+        print(f"Hybrid retrieval: {dense_count} dense + {len(lexical_ids)} lexical → {len(ids)} fused candidates", flush=True)
     
-    # Step 2: Rerank with cross-encoder
-    reranker = get_reranker()
+    if len(path_parts(path_prefix or "")) > PATH_DEPTH:
+        keep = [i for i, meta in enumerate(metas) if in_path_prefix(meta, path_prefix)]
+        ids, docs, metas = [ids[i] for i in keep], [docs[i] for i in keep], [metas[i] for i in keep]
     
-    # Create query-document pairs for scoring
-    pairs = [(query_text, doc) for doc in docs]
-    scores = reranker.predict(pairs)
+    if not docs:
+        return {'documents': [[]], 'metadatas': [[]], 'ids': [[]]}
     
-    # Step 3: Sort by reranker score using indices (avoids comparing dicts)
-    indexed_scores = list(enumerate(scores))
-    indexed_scores.sort(key=lambda x: x[1], reverse=True)
-    top_indices = [idx for idx, _ in indexed_scores[:n_results]]
+    if plan["action"] == "skip":
+        top_indices = list(range(min(n_results, len(ids))))
+        top_scores = []
+        reranked = 0
+    else:
+        # Step 4: Rerank with cross-encoder
+        # Pairs are batched with concurrent queries and scores cached per (query, chunk id)
+        scores = get_rerank_service().score(query_text, ids, docs)
+        reranked = len(ids)
+        
+        # Step 5: Sort by reranker score using indices (avoids comparing dicts)
+        indexed_scores = list(enumerate(scores))
+        indexed_scores.sort(key=lambda x: x[1], reverse=True)
+        top_indices = [idx for idx, _ in indexed_scores[:n_results]]
+        top_scores = [score for _, score in indexed_scores[:n_results]]
+    log_decision(query_text, plan, reranked, time.time() - started, note)
     
     # Unpack results using sorted indices
     reranked_docs = [docs[i] for i in top_indices]
     reranked_metas = [metas[i] for i in top_indices]
     reranked_ids = [ids[i] for i in top_indices]
     
-    print(f"Reranked {len(docs)} candidates → top {len(reranked_docs)}", flush=True)
-    
     return {
         'documents': [reranked_docs],
         'metadatas': [reranked_metas],
-        'ids': [reranked_ids]
+        'ids': [reranked_ids],
+        'scores': [top_scores],
+        'retrieval': {
+            'action': plan["action"],
+            'top_similarity': round(similarities[0], 4) if similarities else None,
+            'gap': plan["gap"],
+        }
     }
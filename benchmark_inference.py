@@ -0,0 +1,134 @@
+"""
+Compares the embedding/reranker inference backends (torch, int8, onnx) on
+chunks already ingested into the vector store.
+
+For each backend it reports:
+  - embedding throughput (chunks/s) and reranking throughput (pairs/s)
+  - embedding agreement with fp32 torch: mean cosine of the same chunk's
+    vectors, and recall@10 of the torch top-10 neighbours per query
+  - reranking agreement with fp32 torch: top-5 overlap and rank correlation
+
+Queries are the first words of sampled chunks, so each has a known answer
+(self-hit@10 is reported as well).
+
+Usage:
+    python benchmark_inference.py --samples 500 --queries 50 --backends torch,int8,onnx
+"""
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+
+from backend.models import load_embedding_model, load_reranker, EMBED_BATCH_SIZE, RERANK_BATCH_SIZE
+from backend.vector_store import get_collection, repo_filter
+
+CANDIDATES = 20
+
+
+def sample_corpus(samples: int, repo: str = None, seed: int = 0):
+    collection = get_collection()
+    result = collection.get(where=repo_filter([repo]) if repo else None, include=["documents"])
+    docs = [d for d in result["documents"] if d and len(d.split()) >= 8]
+    if not docs:
+        print("❌ No ingested chunks found - ingest a repo first")
+        sys.exit(1)
+    random.Random(seed).shuffle(docs)
+    return docs[:samples]
+
+
+def make_queries(docs, count: int, seed: int = 0):
+    indices = random.Random(seed + 1).sample(range(len(docs)), min(count, len(docs)))
+    return [(" ".join(docs[i].split()[:12]), i) for i in indices]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def rank_correlation(a, b) -> float:
+    ra = np.argsort(np.argsort(a))
+    rb = np.argsort(np.argsort(b))
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def run_backend(backend: str, docs, queries):
+    started = time.time()
+    embedder = load_embedding_model(backend)
+    reranker = load_reranker(backend)
+    load_s = time.time() - started
+
+    embedder.encode(docs[:4], batch_size=EMBED_BATCH_SIZE)  # warm-up
+    started = time.time()
+    doc_vecs = normalize(np.asarray(embedder.encode(docs, batch_size=EMBED_BATCH_SIZE, convert_to_numpy=True)))
+    embed_s = time.time() - started
+    query_vecs = normalize(np.asarray(embedder.encode([q for q, _ in queries], batch_size=EMBED_BATCH_SIZE, convert_to_numpy=True)))
+
+    return {
+        "backend": backend,
+        "reranker": reranker,
+        "load_s": load_s,
+        "embed_per_s": len(docs) / embed_s,
+        "doc_vecs": doc_vecs,
+        "top": np.argsort(-(query_vecs @ doc_vecs.T), axis=1)[:, :CANDIDATES],
+    }
+
+
+def score_candidates(run, queries, docs, candidates):
+    """Reranker scores for the same candidate lists (the torch dense top-20) on every backend."""
+    pairs = [(q, docs[j]) for (q, _), row in zip(queries, candidates) for j in row]
+    run["reranker"].predict(pairs[:4], batch_size=RERANK_BATCH_SIZE)  # warm-up
+    started = time.time()
+    scores = np.asarray(run["reranker"].predict(pairs, batch_size=RERANK_BATCH_SIZE))
+    run["rerank_per_s"] = len(pairs) / (time.time() - started)
+    return scores.reshape(len(queries), -1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding/reranker inference backends")
+    parser.add_argument("--samples", type=int, default=500, help="Chunks to embed")
+    parser.add_argument("--queries", type=int, default=50, help="Queries to run")
+    parser.add_argument("--repo", help="Only sample chunks of this repo")
+    parser.add_argument("--backends", default="torch,int8,onnx", help="Comma-separated backends")
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if "torch" not in backends:
+        backends.insert(0, "torch")  # the fp32 reference
+
+    docs = sample_corpus(args.samples, args.repo)
+    queries = make_queries(docs, args.queries)
+    print(f"📊 {len(docs)} chunks, {len(queries)} queries, backends: {', '.join(backends)}\n")
+
+    runs = {}
+    for backend in backends:
+        try:
+            runs[backend] = run_backend(backend, docs, queries)
+        except Exception as e:
+            print(f"⚠️ Skipping {backend}: {e}")
+    if "torch" not in runs:
+        print("❌ The torch reference backend failed to load")
+        sys.exit(1)
+
+    reference = runs["torch"]
+    candidates = reference["top"]
+    for run in runs.values():
+        run["scores"] = score_candidates(run, queries, docs, candidates)
+
+    header = f"{'backend':<8} {'load s':>7} {'embed/s':>9} {'pairs/s':>9} {'cosine':>7} {'R@10':>6} {'self@10':>8} {'rr top5':>8} {'rr rho':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, run in runs.items():
+        cosine = float(np.mean(np.sum(run["doc_vecs"] * reference["doc_vecs"], axis=1)))
+        recall = np.mean([len(set(a[:10]) & set(b[:10])) / 10 for a, b in zip(run["top"], reference["top"])])
+        self_hit = np.mean([i in row[:10] for (_, i), row in zip(queries, run["top"])])
+        top5 = np.mean([len(set(np.argsort(-a)[:5]) & set(np.argsort(-b)[:5])) / 5
+                        for a, b in zip(run["scores"], reference["scores"])])
+        rho = np.mean([rank_correlation(a, b) for a, b in zip(run["scores"], reference["scores"])])
+        print(f"{name:<8} {run['load_s']:>7.1f} {run['embed_per_s']:>9.1f} {run['rerank_per_s']:>9.1f} "
+              f"{cosine:>7.4f} {recall:>6.3f} {self_hit:>8.3f} {top5:>8.3f} {rho:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
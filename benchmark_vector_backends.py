@@ -0,0 +1,151 @@
+"""
+Compares vector backends on the ingested corpus: Chroma (HNSW) against the
+NumPy memory-mapped index (float16 / int8, exact and IVF).
+
+The parent process exports every stored embedding, embeds --queries query
+strings (the first words of sampled chunks) and computes exact float32
+ground truth. Each backend is then measured in its own subprocess so that
+resident memory (RSS) is not polluted by the others:
+  - recall@k against the exact ground truth
+  - queries per second (single query at a time, after one warm-up pass)
+  - RSS after loading the index and running the queries
+
+Usage:
+    python benchmark_vector_backends.py --queries 200 --k 10
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+CONFIGS = ["chroma", "numpy-float16", "numpy-int8", "numpy-float16-ivf", "numpy-int8-ivf"]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def open_backend(config: str, workdir: str):
+    from backend.vector_backend import NumpyBackend
+    if config == "chroma":
+        from backend.vector_store import get_chroma_backend
+        return get_chroma_backend()
+    return NumpyBackend(os.path.join(workdir, config))
+
+
+def run_child(config: str, workdir: str, k: int):
+    baseline = rss_mb()
+    queries = np.load(os.path.join(workdir, "queries.npy"))
+    with open(os.path.join(workdir, "truth.json")) as f:
+        truth = json.load(f)
+
+    backend = open_backend(config, workdir)
+    backend.query(queries[:1], n_results=k)  # opens/maps the index
+    for q in queries:  # warm-up pass
+        backend.query([q], n_results=k)
+    started = time.time()
+    results = [backend.query([q], n_results=k)["ids"][0] for q in queries]
+    elapsed = time.time() - started
+
+    recall = float(np.mean([len(set(r) & set(t)) / max(len(t), 1) for r, t in zip(results, truth)]))
+    print(json.dumps({"config": config, "recall": recall, "qps": len(queries) / elapsed,
+                      "rss_mb": rss_mb(), "rss_delta_mb": rss_mb() - baseline}))
+
+
+def prepare(workdir: str, n_queries: int, k: int, configs):
+    from backend.models import get_embedding_function
+    from backend.vector_store import get_chroma_backend
+    from backend.vector_backend import NumpyBackend
+
+    source = get_chroma_backend()
+    total = source.count()
+    if not total:
+        print("❌ The Chroma collection is empty - ingest a repo first")
+        sys.exit(1)
+
+    ids, docs, metas, vectors = [], [], [], []
+    for offset in range(0, total, 1000):
+        batch = source.get(offset=offset, limit=1000, include=["documents", "metadatas", "embeddings"])
+        ids += batch["ids"]
+        docs += batch["documents"]
+        metas += batch["metadatas"]
+        vectors.append(np.asarray(batch["embeddings"], dtype=np.float32))
+    vectors = np.concatenate(vectors)
+    print(f"📦 Exported {len(ids)} vectors (dim {vectors.shape[1]})")
+
+    sampled = random.Random(0).sample(range(len(docs)), min(n_queries, len(docs)))
+    texts = [" ".join((docs[i] or "").split()[:12]) or "code" for i in sampled]
+    queries = np.asarray(get_embedding_function()(texts), dtype=np.float32)
+    np.save(os.path.join(workdir, "queries.npy"), queries)
+
+    norms = np.maximum(np.linalg.norm(vectors, axis=1), 1e-12)
+    truth = []
+    for q in queries:
+        scores = (vectors @ q) / norms
+        truth.append([ids[i] for i in np.argsort(-scores)[:k]])
+    with open(os.path.join(workdir, "truth.json"), "w") as f:
+        json.dump(truth, f)
+
+    for config in configs:
+        if config == "chroma":
+            continue
+        dtype = "int8" if "int8" in config else "float16"
+        target = NumpyBackend(os.path.join(workdir, config), dtype=dtype)
+        for start in range(0, len(ids), 5000):
+            end = start + 5000
+            target.upsert(ids[start:end], vectors[start:end], docs[start:end], metas[start:end])
+        if config.endswith("-ivf"):
+            target.build_ivf()
+        size = sum(os.path.getsize(os.path.join(target.path, f)) for f in os.listdir(target.path))
+        print(f"🔨 Built {config} ({size / 2**20:.1f} MB on disk)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector backends (recall@k, QPS, RSS)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.workdir, args.k)
+        return
+
+    configs = [c.strip() for c in args.configs.split(",") if c.strip()]
+    workdir = tempfile.mkdtemp(prefix="edith-vector-bench-")
+    try:
+        prepare(workdir, args.queries, args.k, configs)
+        print(f"\n{'backend':<20} {'recall@' + str(args.k):>10} {'QPS':>9} {'RSS MB':>8} {'ΔRSS MB':>8}")
+        print("-" * 59)
+        for config in configs:
+            proc = subprocess.run([sys.executable, __file__, "--child", config, "--workdir", workdir, "--k", str(args.k)],
+                                  capture_output=True, text=True)
+            lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+            if proc.returncode != 0 or not lines:
+                print(f"{config:<20} failed: {(proc.stderr or proc.stdout).strip().splitlines()[-1:]}")
+                continue
+            r = json.loads(lines[-1])
+            print(f"{config:<20} {r['recall']:>10.3f} {r['qps']:>9.1f} {r['rss_mb']:>8.1f} {r['rss_delta_mb']:>8.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Message } from '../types';
-import { askEdith, checkStatus } from '../services/edith';
+import { askEdithStream, checkStatus, QueryStreamEvent } from '../services/edith';
 
 const AskEdithView: React.FC = () => {
   const [messages, setMessages] = useState<Message[]>([
@@ -13,6 +13,7 @@ const AskEdithView: React.FC = () => {
   ]);
   const [input, setInput] = useState('');
   const [isTyping, setIsTyping] = useState(false);
+  const [streamingId, setStreamingId] = useState<string | null>(null);
   const [isConnected, setIsConnected] = useState<boolean | null>(null);
   const scrollRef = useRef<HTMLDivElement>(null);
 
@@ -61,24 +62,33 @@ const AskEdithView: React.FC = () => {
     setInput('');
     setIsTyping(true);
 
+    // One assistant message, updated in place: agent steps until the answer starts, then the answer tokens
+    const replyId = (Date.now()+1).toString();
+    let steps = '';
+    let answer = '';
+    const showReply = (content: string) => {
+      setStreamingId(replyId);
+      setMessages(prev => prev.some(m => m.id === replyId)
+        ? prev.map(m => m.id === replyId ? { ...m, content } : m)
+        : [...prev, { id: replyId, role: 'assistant', content, timestamp: new Date() }]);
+    };
+
     try {
-      const result = await askEdith(input);
-      setMessages(prev => [...prev, { 
-        id: (Date.now()+1).toString(), 
-        role: 'assistant', 
-        content: result || "I couldn't find relevant information in the codebase.", 
-        timestamp: new Date() 
-      }]);
+      const result = await askEdithStream(input, (event: QueryStreamEvent) => {
+        if (event.type === 'step' && !answer) {
+          steps += (event.actions || []).map(a => `🔍 ${a.tool}('${a.arg}')`).join('\n') + '\n';
+          showReply(steps);
+        } else if (event.type === 'token') {
+          answer += event.text || '';
+          showReply(answer);
+        }
+      });
+      showReply(result || answer || "I couldn't find relevant information in the codebase.");
     } catch (e: any) { 
       console.error(e); 
-      setMessages(prev => [...prev, { 
-        id: (Date.now()+1).toString(), 
-        role: 'assistant', 
-        content: `Error: ${e.message || "Failed to get response from EDITH backend."}`, 
-        timestamp: new Date() 
-      }]);
+      showReply(`Error: ${e.message || "Failed to get response from EDITH backend."}`);
     }
-    finally { setIsTyping(false); }
+    finally { setIsTyping(false); setStreamingId(null); }
   };
 
   return (
@@ -120,7 +130,7 @@ const AskEdithView: React.FC = () => {
           </div>
         ))}
 
-        {isTyping && (
+        {isTyping && !streamingId && (
           <div className="flex justify-start items-end gap-3">
             <div className="w-8 h-8 rounded-full bg-primary flex items-center justify-center shrink-0">
                <span className="material-symbols-outlined text-white text-xs animate-spin">sync</span>
@@ -95,7 +95,9 @@ const CodeDomainView: React.FC = () => {
     setIsIngesting(true);
     setMessage('Cloning & analyzing repository...');
     try {
-      const result = await ingestRepository(repoUrl, true);
+      const result = await ingestRepository(repoUrl, true, (job) =>
+        setMessage(`Ingesting (${job.stage}, ${job.percent}%)...`)
+      );
       setMessage(`✅ ${result.message}`);
       const newStatus = await checkStatus();
       setStatus(newStatus);
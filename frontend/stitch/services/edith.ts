@@ -100,11 +100,33 @@ export interface IngestResponse {
   message: string;
   chunks_count: number;
   repo_name?: string;
+  job_id?: string;
 }
 
+export interface IngestJob {
+  job_id: string;
+  status: "queued" | "running" | "succeeded" | "failed" | "cancelled";
+  stage: string;
+  percent: number;
+  error: string | null;
+  result: IngestResponse | null;
+}
+
+export const getIngestJob = async (jobId: string): Promise<IngestJob> => {
+  const response = await fetch(`${API_BASE}/ingest/jobs/${jobId}`, {
+    headers: authHeaders(),
+  });
+  if (!response.ok) throw new Error("Failed to load ingest job");
+  return response.json();
+};
+
+/**
+ * Queue an ingest and wait for the background job to finish.
+ */
 export const ingestRepository = async (
   repoUrl: string,
   force: boolean = false,
+  onProgress?: (job: IngestJob) => void,
 ): Promise<IngestResponse> => {
   const response = await fetch(`${API_BASE}/ingest`, {
     method: "POST",
@@ -115,7 +137,20 @@ export const ingestRepository = async (
     const error = await response.json();
     throw new Error(error.detail || "Ingestion failed");
   }
-  return response.json();
+  const queued: IngestResponse = await response.json();
+  if (!queued.job_id) return queued;
+
+  while (true) {
+    await new Promise((resolve) => setTimeout(resolve, 2000));
+    const job = await getIngestJob(queued.job_id);
+    onProgress?.(job);
+    if (job.status === "succeeded" && job.result) {
+      return { ...job.result, status: "success", job_id: job.job_id };
+    }
+    if (job.status === "failed" || job.status === "cancelled") {
+      throw new Error(job.error || `Ingestion ${job.status}`);
+    }
+  }
 };
 
 export const askEdith = async (question: string): Promise<string> => {
@@ -132,6 +167,58 @@ export const askEdith = async (question: string): Promise<string> => {
   return data.answer;
 };
 
+export interface QueryStreamEvent {
+  type: "cached" | "route" | "step" | "observation" | "token" | "error" | "done";
+  mode?: "fast" | "agent";
+  reason?: string;
+  step?: number;
+  thought?: string;
+  actions?: { tool: string; arg: string }[];
+  tool?: string;
+  arg?: string;
+  observation?: string;
+  text?: string;
+  detail?: string;
+  answer?: string;
+}
+
+// Streams /query/stream (Server-Sent Events) and resolves with the final answer
+export const askEdithStream = async (
+  question: string,
+  onEvent: (event: QueryStreamEvent) => void,
+  mode?: "auto" | "fast" | "agent"
+): Promise<string> => {
+  const response = await fetch(`${API_BASE}/query/stream`, {
+    method: "POST",
+    headers: authHeaders(),
+    body: JSON.stringify({ question, mode }),
+  });
+  if (!response.ok || !response.body) {
+    const error = await response.json().catch(() => ({}));
+    throw new Error(error.detail || "Query failed");
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let answer = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const frames = buffer.split("\n\n");
+    buffer = frames.pop() || "";
+    for (const frame of frames) {
+      const data = frame.split("\n").find((line) => line.startsWith("data: "));
+      if (!data) continue;
+      const event: QueryStreamEvent = JSON.parse(data.slice(6));
+      if (event.type === "done") answer = event.answer || "";
+      onEvent(event);
+    }
+  }
+  return answer;
+};
+
 export const getGraph = async (): Promise<string> => {
   const response = await fetch(`${API_BASE}/graph`, {
     headers: authHeaders(),
@@ -0,0 +1,286 @@
+import os
+import sys
+import json
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend import reasoning
+
+
+class FakeStream:
+    """Stands in for groq's AsyncStream: yields delta chunks, optionally failing after them."""
+
+    def __init__(self, pieces, error=None):
+        self.pieces = pieces
+        self.error = error
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.closed = True
+
+    async def __aiter__(self):
+        for piece in self.pieces:
+            await asyncio.sleep(0)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+        if self.error is not None:
+            raise self.error
+
+
+class FakeGroq:
+    """AsyncGroq stub answering each chat.completions.create call with the next scripted turn."""
+
+    def __init__(self, turns):
+        self.turns = list(turns)
+        self.calls = []
+        self.streams = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, **kwargs):
+        self.calls.append([dict(m) for m in messages])
+        turn = self.turns.pop(0) if self.turns else ["Thought: still looking\nAction: [search_code: more]"]
+        stream = turn if isinstance(turn, FakeStream) else FakeStream(turn)
+        self.streams.append(stream)
+        return stream
+
+
+@pytest.fixture
+def groq(monkeypatch):
+    """Installs a scripted Groq client; assign .turns before asking a question."""
+    client = FakeGroq([])
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setattr(reasoning, "AsyncGroq", lambda api_key: client)
+    monkeypatch.setattr(reasoning, "CACHE_ENABLED", False)
+    monkeypatch.setattr(reasoning, "TOOL_CACHE", False)
+    monkeypatch.setitem(reasoning.TOOLS, "read_file", lambda arg, repos: f"contents of {arg}")
+    monkeypatch.setitem(reasoning.TOOLS, "search_code", lambda arg, repos: f"hits for {arg}")
+    return client
+
+
+def collect(question, mode="agent", repos=None):
+    async def run():
+        return [event async for event in reasoning.answer_question_stream(question, repos=repos, mode=mode)]
+    return asyncio.run(run())
+
+
+def test_stream_emits_steps_then_answer_tokens(groq):
+    groq.turns = [
+        ["Thought: read it\n", "Action: [read_file: app.py]"],
+        ["Thought: got it\nFinal", " Answer:", " It ", "works."],
+    ]
+
+    events = collect("what does app.py do?")
+
+    assert [e["type"] for e in events] == ["route", "step", "observation", "token", "token", "done"]
+    assert events[1]["actions"] == [{"tool": "read_file", "arg": "app.py"}]
+    assert events[2]["observation"] == "contents of app.py"
+    assert "".join(e["text"] for e in events if e["type"] == "token") == "It works."
+    assert events[-1]["answer"] == "It works."
+    assert "Observation: contents of app.py" in groq.calls[1][-1]["content"]
+    assert all(stream.closed for stream in groq.streams)
+
+
+def test_failure_mid_stream_reports_error_then_done(groq):
+    groq.turns = [FakeStream(["Thought: hmm\nFinal Answer: It"], error=RuntimeError("connection reset"))]
+
+    events = collect("what does app.py do?")
+
+    assert [e["type"] for e in events] == ["route", "token", "error", "done"]
+    assert events[1]["text"] == "It"
+    assert events[2]["detail"] == "connection reset"
+    assert events[-1]["answer"] == "LLM Error: connection reset"
+    assert groq.streams[0].closed
+
+
+def test_failure_before_any_token_still_sends_the_error_text(groq):
+    groq.turns = [FakeStream([], error=RuntimeError("rate limited"))]
+
+    events = collect("what does app.py do?")
+
+    assert [e["type"] for e in events] == ["route", "error", "token", "done"]
+    assert events[2]["text"] == "LLM Error: rate limited"
+
+
+def test_disconnect_mid_answer_releases_the_stream_and_slots(groq):
+    groq.turns = [["Final Answer: one", " two", " three"]]
+
+    async def run():
+        events = reasoning.answer_question_stream("what does app.py do?", mode="agent")
+        async for event in events:
+            if event["type"] == "token":
+                break
+        await events.aclose()
+
+    asyncio.run(run())
+
+    assert groq.streams[0].closed
+    assert reasoning._agent_counts["in_flight"] == 0
+    assert reasoning._agent_counts["llm_in_flight"] == 0
+
+
+@pytest.fixture
+def client(groq, tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.chdir(tmp_path)  # main writes data/users.json on import
+    from backend import main
+    from backend.auth import get_current_user
+
+    main.app.dependency_overrides[get_current_user] = lambda: {"email": "admin@example.com", "role": "admin"}
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+def sse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        kind, data = block.split("\n")
+        assert data.startswith("data: ")
+        events.append((kind[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_query_stream_endpoint_sends_server_sent_events(groq, client):
+    groq.turns = [["Thought: read\nAction: [read_file: app.py]"], ["Final Answer: Done."]]
+
+    response = client.post("/query/stream", json={"question": "what does app.py do?", "mode": "agent"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = sse_events(response.text)
+    assert [kind for kind, _ in events] == ["route", "step", "observation", "token", "done"]
+    assert all(kind == data["type"] for kind, data in events)
+    assert events[-1][1]["answer"] == "Done."
+
+
+def test_query_stream_endpoint_turns_exceptions_into_an_error_event(groq, client, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("index unavailable")
+    monkeypatch.setattr(reasoning, "run_tool", broken)
+    groq.turns = [["Thought: read\nAction: [read_file: app.py]"]]
+
+    response = client.post("/query/stream", json={"question": "what does app.py do?", "mode": "agent"})
+
+    events = sse_events(response.text)
+    assert [kind for kind, _ in events] == ["route", "step", "error"]
+    assert events[-1][1]["detail"] == "index unavailable"
+
+
+def test_query_stream_rejects_unknown_modes(client):
+    response = client.post("/query/stream", json={"question": "hi", "mode": "turbo"})
+    assert response.status_code == 400
+
+
+def test_actions_of_one_step_run_concurrently_and_keep_their_order(groq, monkeypatch):
+    import threading
+    import time
+
+    # Both tools must be running at once to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def slow_read(arg, repos):
+        barrier.wait()
+        time.sleep(0.05)
+        return f"contents of {arg}"
+
+    def fast_search(arg, repos):
+        barrier.wait()
+        return f"hits for {arg}"
+
+    monkeypatch.setitem(reasoning.TOOLS, "read_file", slow_read)
+    monkeypatch.setitem(reasoning.TOOLS, "search_code", fast_search)
+    groq.turns = [["Thought: two lookups\nAction: [read_file: app.py]\nAction: [search_code: login]"],
+                  ["Final Answer: Both."]]
+
+    events = collect("how does login work?")
+
+    observations = [e for e in events if e["type"] == "observation"]
+    assert [(o["tool"], o["observation"]) for o in observations] == [
+        ("read_file", "contents of app.py"), ("search_code", "hits for login")]
+    assert events[-1]["answer"] == "Both."
+
+
+def test_step_limit_ends_with_what_was_found(groq):
+    groq.turns = []  # Every turn asks for another lookup
+
+    events = collect("trace the whole request flow")
+
+    assert len(groq.calls) == 6
+    assert [e["step"] for e in events if e["type"] == "step"] == [1, 2, 3, 4, 5, 6]
+    assert events[-1]["type"] == "done"
+    assert events[-1]["answer"].startswith("Based on my exploration:")
+
+
+def test_a_failing_tool_becomes_an_observation(groq, monkeypatch):
+    def broken(arg, repos):
+        raise OSError("disk gone")
+    monkeypatch.setitem(reasoning.TOOLS, "read_file", broken)
+    groq.turns = [["Action: [read_file: app.py]\nAction: [search_code: login]"], ["Final Answer: Partial."]]
+
+    events = collect("how does login work?")
+
+    observations = [e["observation"] for e in events if e["type"] == "observation"]
+    assert observations == ["Error running read_file: disk gone", "hits for login"]
+    assert events[-1]["answer"] == "Partial."
+
+
+def test_errors_outside_the_tools_propagate_through_gather(groq, monkeypatch):
+    def run_tool(tool, arg, repos=None):
+        if tool == "read_file":
+            raise RuntimeError("retrieval pool down")
+        return "ok"
+    monkeypatch.setattr(reasoning, "run_tool", run_tool)
+
+    with pytest.raises(RuntimeError, match="retrieval pool down"):
+        asyncio.run(reasoning.run_actions([("search_code", "a"), ("read_file", "b")]))
+
+    groq.turns = [["Action: [read_file: app.py]\nAction: [search_code: login]"]]
+    with pytest.raises(RuntimeError, match="retrieval pool down"):
+        collect("how does login work?")
+    assert reasoning._agent_counts["in_flight"] == 0
+
+
+def test_llm_calls_are_bounded_across_concurrent_questions(groq, monkeypatch):
+    monkeypatch.setattr(reasoning, "MAX_CONCURRENT_LLM_CALLS", 2)
+    active = {"now": 0, "peak": 0}
+
+    class CountingStream(FakeStream):
+        async def __aiter__(self):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            try:
+                async for chunk in super().__aiter__():
+                    yield chunk
+            finally:
+                active["now"] -= 1
+
+    groq.turns = [CountingStream(["Final Answer:", f" answer {i}"]) for i in range(6)]
+
+    async def run():
+        return await asyncio.gather(*(reasoning.answer_question_async(f"question {i}", mode="agent") for i in range(6)))
+
+    answers = asyncio.run(run())
+
+    assert sorted(answers) == [f"answer {i}" for i in range(6)]
+    assert active["peak"] == 2
+
+
+def test_query_endpoint_returns_the_answer_and_500_on_errors(groq, client, monkeypatch):
+    groq.turns = [["Final Answer: Fine."]]
+    response = client.post("/query", json={"question": "is it fine?", "mode": "agent"})
+    assert response.status_code == 200
+    assert response.json() == {"answer": "Fine."}
+
+    def broken(*args):
+        raise RuntimeError("index unavailable")
+    monkeypatch.setattr(reasoning, "run_tool", broken)
+    groq.turns = [["Action: [read_file: app.py]"]]
+    response = client.post("/query", json={"question": "is it fine?", "mode": "agent"})
+    assert response.status_code == 500
+    assert response.json()["detail"] == "index unavailable"
@@ -0,0 +1,103 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend import answer_cache
+from backend.answer_cache import AnswerCache, code_tokens
+
+
+def fake_embeddings(monkeypatch, vectors):
+    """Questions embed to the given vectors; anything else is orthogonal to all of them."""
+    def embed(question):
+        vector = np.asarray(vectors.get(question, [0.0, 0.0, 0.0, 1.0]), dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+    monkeypatch.setattr(answer_cache, "embed_question", embed)
+
+
+def make_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(answer_cache, "SEMANTIC_CACHE", True)
+    return AnswerCache(str(tmp_path / "answers.sqlite"))
+
+
+def test_code_tokens():
+    assert code_tokens("What does get_user do?") == {"get_user"}
+    assert code_tokens("explain getUsers in auth/service.py.") == {"getusers", "auth/service.py"}
+    assert code_tokens("How does `login` work?") == {"login"}
+    assert code_tokens("where is auth handled?") == frozenset()
+
+
+def test_exact_hit_ignores_case_and_punctuation(tmp_path, monkeypatch):
+    fake_embeddings(monkeypatch, {})
+    cache = make_cache(tmp_path, monkeypatch)
+    cache.put("Where is auth handled?", "backend/auth.py", repos=["demo"])
+
+    assert cache.lookup("where is  AUTH handled", repos=["demo"])["match"] == "exact"
+    assert cache.lookup("where is auth handled", repos=["other"]) is None
+
+
+def test_semantic_hit_for_paraphrase(tmp_path, monkeypatch):
+    fake_embeddings(monkeypatch, {
+        "where is auth handled?": [1.0, 0.0, 0.0, 0.0],
+        "which file does authentication?": [0.97, 0.2, 0.0, 0.0],
+    })
+    cache = make_cache(tmp_path, monkeypatch)
+    cache.put("where is auth handled?", "backend/auth.py")
+
+    hit = cache.lookup("which file does authentication?")
+    assert hit["match"] == "semantic" and hit["question"] == "where is auth handled?"
+
+
+def test_semantic_hit_requires_same_identifiers(tmp_path, monkeypatch):
+    # Near-identical embeddings, different function names
+    fake_embeddings(monkeypatch, {
+        "what does get_user do?": [1.0, 0.0, 0.0, 0.0],
+        "what does get_users do?": [0.99, 0.05, 0.0, 0.0],
+        "explain what get_user does": [0.98, 0.1, 0.0, 0.0],
+    })
+    cache = make_cache(tmp_path, monkeypatch)
+    cache.put("what does get_user do?", "Returns one user")
+
+    assert cache.lookup("what does get_users do?") is None
+    assert cache.lookup("explain what get_user does")["answer"] == "Returns one user"
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_answers_persist_and_expire(tmp_path, monkeypatch):
+    fake_embeddings(monkeypatch, {})
+    cache = make_cache(tmp_path, monkeypatch)
+    cache.put("what is edith", "A code assistant")
+
+    # Another worker opening the same database sees the answer
+    assert AnswerCache(str(tmp_path / "answers.sqlite")).get("What is EDITH?") == "A code assistant"
+    expired = AnswerCache(str(tmp_path / "answers.sqlite"), ttl=-1)
+    assert expired.get("what is edith") is None
+    assert expired.stats()["expired"] == 1
+
+
+def test_least_recently_used_answers_are_evicted(tmp_path, monkeypatch):
+    fake_embeddings(monkeypatch, {})
+    cache = make_cache(tmp_path, monkeypatch)
+    cache.max_entries = 2
+    cache.put("q1", "a1")
+    cache.put("q2", "a2")
+    cache.get("q1")
+    cache.put("q3", "a3")
+
+    assert cache.get("q2") is None
+    assert cache.get("q1") == "a1" and cache.get("q3") == "a3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_reingest_retires_answers(tmp_path, monkeypatch):
+    fake_embeddings(monkeypatch, {})
+    versions = {"demo": "1"}
+    monkeypatch.setattr(answer_cache, "corpus_version", lambda repos: versions["demo"])
+    cache = make_cache(tmp_path, monkeypatch)
+    cache.put("where is auth", "auth.py", repos=["demo"])
+
+    versions["demo"] = "2"
+    assert cache.get("where is auth", repos=["demo"]) is None
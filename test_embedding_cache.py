@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.embedding_cache import EmbeddingCache
+
+
+def fake_embed(calls):
+    def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(t)), 1.0, 0.0] for t in texts]
+    return embed
+
+
+def test_only_misses_are_embedded(tmp_path):
+    cache = EmbeddingCache("test-model", cache_dir=str(tmp_path))
+    calls = []
+
+    first, hits = cache.embed(["a", "bb"], fake_embed(calls))
+    second, hits_again = cache.embed(["bb", "ccc", "a"], fake_embed(calls))
+
+    assert hits == 0 and hits_again == 2
+    assert calls == [["a", "bb"], ["ccc"]]
+    assert second == [first[1], [3.0, 1.0, 0.0], first[0]]
+    assert cache.stats() == {"vectors": 3, "dim": 3, "hits": 2, "misses": 3}
+
+
+def test_vectors_survive_reopening(tmp_path):
+    EmbeddingCache("test-model", cache_dir=str(tmp_path)).embed(["hello"], fake_embed([]))
+
+    reopened = EmbeddingCache("test-model", cache_dir=str(tmp_path))
+    found = reopened.get_many(["unknown", *reopened._db.execute("SELECT hash FROM vectors").fetchone()])
+    assert [v.tolist() for v in found.values()] == [[5.0, 1.0, 0.0]]
+    assert np.asarray(list(found.values())[0]).dtype == np.float32
@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.fast_path import route, question_shape, expand_chunk, pack_context, FAST_EXPAND_CHARS
+from backend.manifest import RepoManifest
+from backend.symbols import chunk_python_source, MAX_SYMBOL_CHARS
+
+
+def retrieval(similarity, action="full", scores=(5.0,)):
+    return {"ids": [["demo:1"]], "scores": [list(scores)],
+            "retrieval": {"top_similarity": similarity, "action": action}}
+
+
+def test_question_shape():
+    assert question_shape("What does get_user do?") == "lookup"
+    assert question_shape("Where is the token refresh defined?") == "lookup"
+    assert question_shape("Trace the request flow from login to the database") == "multi_hop"
+    assert question_shape("Who calls get_user?") == "multi_hop"
+    assert question_shape("auth tokens") == "unknown"
+
+
+def test_route():
+    assert route("Who calls get_user?") == {"mode": "agent", "reason": "multi-hop question"}
+    assert route("What does get_user do?") is None
+    assert route("Who calls get_user?", mode="fast")["mode"] == "fast"
+    assert route("What does get_user do?", retrieval(0.9, action="skip"))["mode"] == "fast"
+    assert route("What does get_user do?", retrieval(0.9, scores=(4.0,)))["mode"] == "fast"
+    assert route("What does get_user do?", retrieval(0.9, scores=(0.5,)))["mode"] == "agent"
+    assert route("What does get_user do?", retrieval(0.3, action="skip"))["mode"] == "agent"
+
+
+def test_part_of_a_split_symbol_expands_to_the_whole_symbol(tmp_path, monkeypatch):
+    assert FAST_EXPAND_CHARS > MAX_SYMBOL_CHARS
+    monkeypatch.chdir(tmp_path)
+    body = "".join(f"    total += compute({i})  # step {i}\n" for i in range(140))
+    big = f"def big(values):\n    total = 0\n{body}    return total\n"
+    source = "import os\n\n\n" + big + "\n\n" + "".join(f"def helper_{i}():\n    return {i} * 'padding'\n\n\n" for i in range(80))
+    assert MAX_SYMBOL_CHARS < len(big) <= FAST_EXPAND_CHARS < len(source)
+
+    os.makedirs("data/repos/demo")
+    with open("data/repos/demo/big.py", "w", encoding="utf-8") as f:
+        f.write(source)
+    _, symbols = chunk_python_source(source)
+    manifest = RepoManifest("demo")
+    manifest.record("big.py", "hash", [], symbols=symbols)
+    manifest.save()
+
+    span = next(s for s in symbols if s["symbol"] == "big")
+    meta = {"repo": "demo", "source": "big.py", "symbol": "big", "symbol_kind": "function",
+            "start_line": span["start_line"], "end_line": span["end_line"], "part": 1}
+    label, text, _ = expand_chunk("    total += compute(70)  # step 70\n", meta)
+
+    assert label == f"big.py:{span['start_line']}-{span['end_line']}"
+    assert text == big
+
+    # Two parts of the same symbol are packed once
+    results = {"documents": [["part one", "part two"]], "metadatas": [[meta, {**meta, "part": 2}]]}
+    assert pack_context(results).count("def big(values)") == 1
+
+
+def test_small_file_is_sent_whole(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data/repos/demo")
+    with open("data/repos/demo/small.py", "w", encoding="utf-8") as f:
+        f.write("A = 1\nB = 2\n")
+    label, text, key = expand_chunk("B = 2\n", {"repo": "demo", "source": "small.py", "start_line": 2})
+    assert (label, text, key) == ("small.py", "A = 1\nB = 2\n", ("demo", "small.py"))
@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.graph import DependencyGraph, apply_graph_updates, node_id
+
+
+def test_concurrent_updates_keep_every_repos_edges(tmp_path):
+    path = str(tmp_path / "dependency_graph.gml")
+    threads = [
+        threading.Thread(target=apply_graph_updates, args=(path, f"repo{i}", {"main.py": [f"lib{i}"]}, []))
+        for i in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    graph = DependencyGraph()
+    graph.load(path)
+    for i in range(8):
+        assert graph.get_dependencies(node_id(f"repo{i}", "main.py")) == [node_id(f"repo{i}", f"lib{i}")]
+
+
+def test_updates_replace_reparsed_and_drop_removed_files(tmp_path):
+    path = str(tmp_path / "dependency_graph.gml")
+    apply_graph_updates(path, "demo", {"a.py": ["os", "json"], "b.py": ["a"], "c.py": ["a"]}, [])
+
+    graph = apply_graph_updates(path, "demo", {"a.py": ["re"], "d.py": None}, ["c.py"])
+
+    assert graph.get_dependencies("demo:a.py") == ["demo:re"]
+    assert graph.get_dependencies("demo:b.py") == ["demo:a"]
+    assert graph.get_dependents("demo:a") == ["demo:b.py"]
+    assert "demo:c.py" not in graph.graph
+    assert "demo:d.py" not in graph.graph
+
+
+def test_repos_with_the_same_paths_keep_separate_edges(tmp_path):
+    path = str(tmp_path / "dependency_graph.gml")
+    apply_graph_updates(path, "alpha", {"app/main.py": ["app.db"]}, [])
+    apply_graph_updates(path, "beta", {"app/main.py": ["app.cache"]}, [])
+
+    graph = apply_graph_updates(path, "beta", {}, ["app/main.py"])
+
+    assert graph.get_dependencies("alpha:app/main.py") == ["alpha:app.db"]
+    assert graph.find_nodes("app/main.py") == ["alpha:app/main.py"]
+    assert graph.find_nodes("app.db", ["beta"]) == []
+    assert graph.repos() == ["alpha"]
+
+
+def test_nodes_from_before_namespacing_are_dropped(tmp_path):
+    path = str(tmp_path / "dependency_graph.gml")
+    legacy = DependencyGraph()
+    legacy.add_imports("main.py", ["os"])
+    legacy.save(path)
+
+    graph = apply_graph_updates(path, "demo", {"main.py": ["json"]}, [])
+
+    assert sorted(graph.graph.nodes()) == ["demo:json", "demo:main.py"]
+
+
+def test_mermaid_only_shows_the_given_repos(tmp_path):
+    path = str(tmp_path / "dependency_graph.gml")
+    apply_graph_updates(path, "alpha", {"main.py": ["db"]}, [])
+    graph = apply_graph_updates(path, "beta", {"main.py": ["secrets"]}, [])
+
+    mermaid = graph.to_mermaid(repos=["alpha"])
+
+    assert "alpha:main.py" in mermaid and "alpha:db" in mermaid and " --> " in mermaid
+    assert "beta" not in mermaid
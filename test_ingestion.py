@@ -0,0 +1,151 @@
+import os
+import sys
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.ingestion import _map_files, iter_repo_documents, clone_repo
+from backend.manifest import RepoManifest
+
+
+def write(root, rel_path, text):
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def test_process_pool_keeps_task_order(tmp_path):
+    tasks = []
+    for i in range(12):
+        rel_path = f"pkg/mod{i}.py"
+        tasks.append((write(tmp_path, rel_path, f"def f{i}():\n    return {i}\n"), rel_path, ".py"))
+
+    results = list(_map_files(tasks, workers=2))
+
+    assert [r["rel_path"] for r in results] == [t[1] for t in tasks]
+    assert all(r["error"] is None for r in results)
+    assert results[3]["chunks"] == ["def f3():\n    return 3\n"]
+
+
+def ingest(repo_path, incremental):
+    manifest = RepoManifest.load("demo") if incremental else RepoManifest("demo")
+    docs = list(iter_repo_documents(repo_path, manifest=manifest, incremental=incremental, workers=1))
+    manifest.save()
+    return docs, manifest
+
+
+def test_shared_chunk_is_repointed_when_its_owner_goes_away(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    repo = str(tmp_path / "demo")
+    shared = "# Licence\n\nShared text that appears in several files.\n"
+    for name in ("a.md", "b.md", "c.md"):
+        write(repo, name, shared)
+
+    docs, _ = ingest(repo, incremental=False)
+    assert [d["metadata"]["source"] for d in docs] == ["a.md"]
+    shared_id = docs[0]["id"]
+
+    # The owner is deleted: the stored copy must now point at a file that still has it
+    os.remove(os.path.join(repo, "a.md"))
+    docs, manifest = ingest(repo, incremental=True)
+    assert [(d["id"], d["metadata"]["source"]) for d in docs] == [(shared_id, "b.md")]
+    assert manifest.stale_ids == []
+    assert manifest.owners == {shared_id: "b.md"}
+
+    # The new owner changes, the last copy (c.md) keeps the chunk alive
+    write(repo, "b.md", "# Notes\n\nSomething else entirely.\n")
+    docs, manifest = ingest(repo, incremental=True)
+    assert [d["metadata"]["source"] for d in docs] == ["b.md", "c.md"]
+    assert docs[1]["id"] == shared_id
+    assert manifest.owners[shared_id] == "c.md"
+    assert manifest.stale_ids == []
+
+    # Unchanged owners are left alone
+    docs, _ = ingest(repo, incremental=True)
+    assert docs == []
+
+    # Last file containing it goes away: only now is the chunk deleted
+    os.remove(os.path.join(repo, "c.md"))
+    docs, manifest = ingest(repo, incremental=True)
+    assert docs == []
+    assert manifest.stale_ids == [shared_id]
+    assert shared_id not in manifest.owners
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd,
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+
+def test_existing_checkout_is_updated_in_place(tmp_path, monkeypatch):
+    upstream = str(tmp_path / "upstream" / "demo")
+    write(upstream, "app.py", "VERSION = 1\n")
+    git(upstream, "init", "-q", "-b", "main")
+    git(upstream, "add", "-A")
+    git(upstream, "commit", "-q", "-m", "one")
+    first = git(upstream, "rev-parse", "HEAD")
+    monkeypatch.chdir(tmp_path)
+
+    checkout = clone_repo(upstream)
+    # Anything that is not tracked survives an update, so the tree was not re-cloned
+    write(checkout, "marker.txt", "kept")
+    write(upstream, "app.py", "VERSION = 2\n")
+    git(upstream, "commit", "-q", "-am", "two")
+
+    assert clone_repo(upstream) == checkout
+    with open(os.path.join(checkout, "app.py"), encoding="utf-8") as f:
+        assert f.read() == "VERSION = 2\n"
+    assert os.path.exists(os.path.join(checkout, "marker.txt"))
+
+    # A pinned ref checks out that commit; the next unpinned update returns to the branch tip
+    clone_repo(upstream, ref=first)
+    assert git(checkout, "rev-parse", "HEAD") == first
+    clone_repo(upstream)
+    assert git(checkout, "rev-parse", "HEAD") == git(upstream, "rev-parse", "HEAD")
+
+
+def test_moved_chunk_gets_its_new_line_numbers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    repo = str(tmp_path / "demo")
+    b = "def b():\n    return 2\n"
+    write(repo, "mod.py", "def a():\n    return 1\n\n\n" + b)
+    docs, _ = ingest(repo, incremental=False)
+    b_id, b_meta = next((d["id"], d["metadata"]) for d in docs if d["metadata"]["symbol"] == "b")
+    assert (b_meta["start_line"], b_meta["end_line"]) == (5, 6)
+
+    # a grows by two lines, b's text (and id) stays the same but it moves down
+    write(repo, "mod.py", "def a():\n    x = 1\n    y = 2\n    return x + y\n\n\n" + b)
+    docs, manifest = ingest(repo, incremental=True)
+    moved = [d["metadata"] for d in docs if d["id"] == b_id]
+    assert [(m["start_line"], m["end_line"]) for m in moved] == [(7, 8)]
+    assert b_id not in manifest.stale_ids
+
+    # Another file with the same text does not take the chunk over
+    write(repo, "copy.py", b)
+    docs, manifest = ingest(repo, incremental=True)
+    assert b_id not in [d["id"] for d in docs]
+    assert manifest.owners[b_id] == "mod.py"
+
+
+def test_depth_does_not_make_an_existing_checkout_shallow(tmp_path, monkeypatch):
+    upstream = str(tmp_path / "upstream" / "demo")
+    write(upstream, "app.py", "VERSION = 1\n")
+    git(upstream, "init", "-q", "-b", "main")
+    git(upstream, "add", "-A")
+    git(upstream, "commit", "-q", "-m", "one")
+    monkeypatch.chdir(tmp_path)
+
+    checkout = clone_repo(upstream)
+    write(upstream, "app.py", "VERSION = 2\n")
+    git(upstream, "commit", "-q", "-am", "two")
+    write(upstream, "app.py", "VERSION = 3\n")
+    git(upstream, "commit", "-q", "-am", "three")
+
+    clone_repo(upstream, depth=1)
+
+    assert git(checkout, "rev-parse", "--is-shallow-repository") == "false"
+    assert git(checkout, "rev-list", "--count", "HEAD") == "3"
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend import jobs
+from backend.jobs import IngestJob, JobStore
+
+
+def make_job(store, monkeypatch, repo_name="demo"):
+    monkeypatch.setattr(jobs, "_store", store)
+    job = IngestJob(f"https://github.com/acme/{repo_name}", repo_name, {})
+    job.emit("job.queued", "Queued")
+    return job
+
+
+def test_other_worker_sees_persisted_job(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.sqlite")
+    job = make_job(JobStore(path), monkeypatch)
+    job.status = "running"
+    job.persist(force=True)
+
+    # A second worker: same database, none of this process's in-memory jobs
+    other = JobStore(path)
+    snapshot = other.get(job.id, events=5)
+    assert snapshot["status"] == "running"
+    assert snapshot["repo_name"] == "demo"
+    assert snapshot["events"][0]["type"] == "job.queued"
+    assert other.active_for_repo("demo")["job_id"] == job.id
+    assert [s["job_id"] for s in other.list()] == [job.id]
+
+
+def test_cancel_from_other_worker_reaches_owner(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.sqlite")
+    job = make_job(JobStore(path), monkeypatch)
+
+    JobStore(path).request_cancel(job.id)
+    job.persist(force=True)
+
+    assert job.cancel_event.is_set()
+
+
+def test_job_without_heartbeat_is_lost(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.sqlite")
+    job = make_job(JobStore(path), monkeypatch)
+    monkeypatch.setattr(time, "time", lambda: job.created_at + jobs.LOST_AFTER + 10)
+
+    other = JobStore(path)
+    assert other.get(job.id)["status"] == "lost"
+    assert other.active_for_repo("demo") is None
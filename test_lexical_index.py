@@ -0,0 +1,101 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.lexical_index import LexicalIndex, tokenize, split_identifier
+from backend.vector_store import fuse_rankings, build_filter, in_path_prefix
+
+
+def doc(chunk_id, content, repo="demo", source="src/app.py", language="python"):
+    return {"id": chunk_id, "content": content, "metadata": {"repo": repo, "source": source, "language": language}}
+
+
+def test_identifiers_are_indexed_whole_and_split():
+    assert split_identifier("getUserById") == ["get", "user", "by", "id"]
+    assert split_identifier("MAX_FILE_BYTES") == ["max", "file", "bytes"]
+    assert tokenize("parseHTTPResponse(x)") == ["parsehttpresponse", "parse", "http", "response", "x"]
+
+
+def test_search_finds_exact_identifiers_and_filters(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite"))
+    index.upsert([
+        doc("demo:1", "MAX_FILE_BYTES = 1_000_000", source="backend/repo_files.py"),
+        doc("demo:2", "def get_user(user_id): return db.users[user_id]", source="backend/auth.py"),
+        doc("other:1", "MAX_FILE_BYTES = 5", repo="other", source="backend/repo_files.py"),
+        doc("demo:3", "max file bytes are configured in the env", source="docs/config.md", language="markdown"),
+    ])
+
+    assert [cid for cid, _ in index.search("MAX_FILE_BYTES", repos=["demo"])][0] == "demo:1"
+    assert {cid for cid, _ in index.search("max file bytes", repos=["demo"])} == {"demo:1", "demo:3"}
+    assert [cid for cid, _ in index.search("max file bytes", repos=["demo"], languages=["markdown"])] == ["demo:3"]
+    assert [cid for cid, _ in index.search("user", path_prefix="backend/auth.py")] == ["demo:2"]
+    assert index.search("user", repos=[]) == []
+
+    index.delete(["demo:2"])
+    assert index.search("get_user") == []
+    assert index.count() == 3
+
+
+def test_path_prefix_is_case_sensitive(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite"))
+    index.upsert([
+        doc("demo:1", "charge the invoice", source="services/billing/x.py"),
+        doc("demo:2", "charge the invoice again", source="Services/Billing/y.py"),
+        doc("demo:3", "charge a_b invoice", source="services/billing_old/z.py"),
+        doc("demo:4", "charge percent invoice", source="services/billing%/w.py"),
+    ])
+
+    assert [cid for cid, _ in index.search("invoice", path_prefix="services/billing")] == ["demo:1"]
+    assert [cid for cid, _ in index.search("invoice", path_prefix="Services/Billing/")] == ["demo:2"]
+    assert [cid for cid, _ in index.search("invoice", path_prefix="services/billing%")] == ["demo:4"]
+    assert index.search("invoice", path_prefix="services/bill") == []
+
+
+def test_fuse_rankings_rewards_agreement():
+    dense = ["a", "b", "c"]
+    lexical = ["c", "d"]
+    assert fuse_rankings([dense, lexical]) == ["c", "a", "b", "d"]
+    assert fuse_rankings([dense]) == dense
+
+
+def test_build_filter_combines_scope_path_and_language():
+    assert build_filter() is None
+    assert build_filter(repos=["demo"]) == {"repo": "demo"}
+    assert build_filter(repos=["a", "b"], path_prefix="backend/", languages=["python"]) == {"$and": [
+        {"repo": {"$in": ["a", "b"]}},
+        {"language": "python"},
+        {"$or": [{"dir1": "backend"}, {"source": "backend"}]},
+    ]}
+    assert in_path_prefix({"source": "backend/auth.py"}, "backend")
+    assert not in_path_prefix({"source": "backend_old/auth.py"}, "backend")
+
+
+def test_lexical_only_hits_are_fetched_inside_the_query_scope(tmp_path, monkeypatch):
+    from backend import vector_store
+    from backend.vector_backend import NumpyBackend
+    from backend.repo_files import path_metadata
+
+    backend = NumpyBackend(str(tmp_path / "index"))
+    metas = [{"repo": "demo", "source": p, **path_metadata(p)} for p in ("services/billing/x.py", "Services/Billing/y.py")]
+    backend.upsert(["demo:x", "demo:y"], [[1.0, 0.0], [0.0, 1.0]], ["charge()", "charge_again()"], metas)
+
+    class LeakyLexicalIndex:
+        def search(self, *args, **kwargs):
+            return [("demo:y", 2.0), ("demo:x", 1.0)]
+
+    class FirstWins:
+        def score(self, query, ids, docs):
+            return [float(-i) for i in range(len(ids))]
+
+    monkeypatch.setattr(vector_store, "get_collection", lambda: backend)
+    monkeypatch.setattr(vector_store, "get_embedding_function", lambda: lambda texts: [[1.0, 0.0] for _ in texts])
+    monkeypatch.setattr(vector_store, "get_lexical_index", lambda: LeakyLexicalIndex())
+    monkeypatch.setattr(vector_store, "get_rerank_service", lambda: FirstWins())
+    monkeypatch.setattr(vector_store, "plan_rerank",
+                        lambda sims, n, candidates: {"action": "full", "candidates": candidates, "gap": None, "spread": None})
+    monkeypatch.setattr(vector_store, "log_decision", lambda *args: None)
+
+    results = vector_store.query_documents("charge", n_results=5, path_prefix="services/billing")
+
+    assert results["ids"] == [["demo:x"]]
@@ -0,0 +1,91 @@
+import os
+import sys
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend import manifest as manifest_module
+from backend.manifest import RepoManifest, blob_hash, content_chunk_id, corpus_version, chunk_locations, load_manifest, manifest_index
+
+
+def test_blob_hash_matches_git(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_bytes(b"hello\r\nworld\n")
+    expected = subprocess.run(["git", "hash-object", str(path)], capture_output=True, text=True, check=True).stdout.strip()
+    assert blob_hash(path.read_bytes()) == expected
+
+
+def test_incremental_run_keeps_shared_and_drops_stale_chunks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = RepoManifest("demo")
+    first.record("a.py", "h1", ["demo:1", "demo:shared"])
+    first.record("b.py", "h2", ["demo:2", "demo:shared"])
+    first.record("c.py", "h3", ["demo:3"])
+    first.finalize()
+    first.save()
+
+    manifest = RepoManifest.load("demo")
+    assert manifest.stored_ids() == {"demo:1", "demo:2", "demo:3", "demo:shared"}
+    assert manifest.is_unchanged("b.py", "h2")
+    assert not manifest.is_unchanged("c.py", "changed")
+    manifest.record("c.py", "changed", ["demo:4"])
+    # a.py was deleted: not seen in this run
+
+    assert manifest.finalize() == ["a.py"]
+    assert manifest.stale_ids == ["demo:1", "demo:3"]
+    manifest.save()
+    assert chunk_locations("demo")["demo:shared"] == ["b.py"]
+
+
+def test_outdated_manifest_forces_full_rechunk(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manifest = RepoManifest("demo")
+    manifest.record("a.py", "h1", ["demo:1"])
+    manifest.save()
+    monkeypatch.setattr(manifest_module, "MANIFEST_VERSION", manifest_module.MANIFEST_VERSION + 1)
+
+    reloaded = RepoManifest.load("demo")
+    assert not reloaded.is_unchanged("a.py", "h1")
+    assert reloaded.stored_ids() == set()
+
+
+def test_chunk_ids_and_corpus_version(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert content_chunk_id("demo", "x = 1") == content_chunk_id("demo", "x = 1") != content_chunk_id("other", "x = 1")
+
+    before = corpus_version(["demo"])
+    manifest = RepoManifest("demo")
+    manifest.save()
+    after = corpus_version(["demo"])
+    assert before != after
+    assert corpus_version(["other"]) != after
+
+
+def test_manifest_is_parsed_once_per_save(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert load_manifest("demo") is None
+    assert manifest_index("demo", "paths", lambda m: sorted(m.files), []) == []
+
+    manifest = RepoManifest("demo")
+    manifest.record("a.py", "h1", ["demo:1"])
+    manifest.save()
+    loads = []
+    original = RepoManifest.load.__func__
+    monkeypatch.setattr(RepoManifest, "load", classmethod(lambda cls, name: loads.append(name) or original(cls, name)))
+    builds = []
+
+    first = load_manifest("demo")
+    assert load_manifest("demo") is first
+    assert manifest_index("demo", "paths", lambda m: builds.append(1) or sorted(m.files), []) == ["a.py"]
+    assert manifest_index("demo", "paths", lambda m: builds.append(1) or sorted(m.files), []) == ["a.py"]
+    assert chunk_locations("demo") == {"demo:1": ["a.py"]}
+    assert (len(loads), len(builds)) == (1, 1)
+
+    # A new save is picked up, and the indexes are rebuilt from it
+    manifest.record("b.py", "h2", ["demo:1"])
+    manifest.save()
+    st = os.stat(manifest_module.manifest_path("demo"))
+    os.utime(manifest_module.manifest_path("demo"), ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert chunk_locations("demo") == {"demo:1": ["a.py", "b.py"]}
+    assert manifest_index("demo", "paths", lambda m: sorted(m.files), []) == ["a.py", "b.py"]
+    assert len(loads) == 2
@@ -0,0 +1,142 @@
+import os
+import sys
+import types
+import threading
+import subprocess
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend import models
+
+
+class TinyEmbedder:
+    def __init__(self, name, backend="torch", model_kwargs=None):
+        self.name, self.backend = name, backend
+        self.calls = []
+        self._auto_model = types.SimpleNamespace(parameters=lambda: [])
+        self.modules = [types.SimpleNamespace(auto_model=self._auto_model)]
+
+    def __getitem__(self, i):
+        return self.modules[i]
+
+    def encode(self, texts, batch_size, convert_to_numpy):
+        self.calls.append((list(texts), batch_size))
+        return np.array([[float(len(t)), 1.0] for t in texts])
+
+
+class TinyCrossEncoder:
+    def __init__(self, name, max_length, backend="torch", model_kwargs=None):
+        self.name, self.backend = name, backend
+        self.model = types.SimpleNamespace(parameters=lambda: [np.zeros(1)])
+        self.calls = []
+
+    def predict(self, pairs, batch_size):
+        self.calls.append((pairs, batch_size))
+        return np.array([len(q) - len(d) for q, d in pairs], dtype=np.float32)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Empty model registry with sentence-transformers replaced by tiny stand-ins."""
+    monkeypatch.setitem(sys.modules, "sentence_transformers",
+                        types.SimpleNamespace(SentenceTransformer=TinyEmbedder, CrossEncoder=TinyCrossEncoder))
+    monkeypatch.setattr(models, "_models", {})
+    monkeypatch.setattr(models, "_stats", {})
+    monkeypatch.setattr(models, "_locks", {})
+    monkeypatch.setattr(models, "_embedder", None)
+    return models
+
+
+def test_models_load_once_per_process(registry):
+    loads = []
+
+    def loader():
+        loads.append(threading.current_thread().name)
+        return TinyEmbedder("m")
+
+    threads = [threading.Thread(target=registry._get_or_load, args=("embedding", loader, "m")) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(loads) == 1
+    assert registry._get_or_load("embedding", loader, "m") is registry._models["embedding"]
+    stats = registry.model_stats()["loaded"]["embedding"]
+    assert (stats["model"], stats["backend"]) == ("m", "torch")
+
+
+def test_failed_load_is_not_cached(registry):
+    attempts = []
+
+    def loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("model 'no-such/model' not found")
+        return TinyEmbedder("m")
+
+    with pytest.raises(OSError, match="not found"):
+        registry._get_or_load("embedding", loader, "no-such/model")
+    assert "embedding" not in registry._models and "embedding" not in registry._stats
+
+    assert isinstance(registry._get_or_load("embedding", loader, "m"), TinyEmbedder)
+    assert len(attempts) == 2
+
+
+def test_embedding_function_and_rerank_scores_use_the_shared_models(registry):
+    vectors = registry.get_embedding_function()(["ab", "abcd"])
+    assert [list(map(float, v)) for v in vectors] == [[2.0, 1.0], [4.0, 1.0]]
+    assert registry.get_embedding_model().calls == [(["ab", "abcd"], registry.EMBED_BATCH_SIZE)]
+
+    assert registry.rerank_scores([]) == []
+    scores = registry.rerank_scores([("query", "doc"), ("q", "document")])
+    assert scores == [2.0, -7.0] and all(type(s) is float for s in scores)
+    assert registry.get_reranker().calls[0][1] == registry.RERANK_BATCH_SIZE
+    assert registry.get_embedding_function() is registry.get_embedding_function()
+
+
+def test_warm_up_loads_both_models(registry):
+    registry.warm_up()
+    assert set(registry.model_stats()["loaded"]) == {"embedding", "reranker"}
+    assert registry.get_embedding_model().calls == [(["warm up"], registry.EMBED_BATCH_SIZE)]
+
+
+def test_inference_backends(registry, monkeypatch):
+    quantized = []
+    monkeypatch.setattr(registry, "_quantize_int8", lambda module: quantized.append(module) or "int8-module")
+
+    assert registry.load_embedding_model("onnx").backend == "onnx"
+    assert registry.load_reranker("onnx").backend == "onnx"
+    assert registry.load_embedding_model("int8")[0].auto_model == "int8-module"
+    assert registry.load_reranker("int8").model == "int8-module"
+    assert len(quantized) == 2
+    assert registry.load_embedding_model("torch")[0].auto_model != "int8-module"
+
+    with pytest.raises(ValueError, match="Unknown inference backend 'fp8'"):
+        registry.load_embedding_model("fp8")
+    with pytest.raises(ValueError, match="Unknown inference backend"):
+        registry.load_reranker("gpu")
+
+
+def test_embedding_model_key_separates_backends(registry, monkeypatch):
+    monkeypatch.setattr(registry, "EMBED_BACKEND", "torch")
+    assert registry.embedding_model_key() == registry.EMBEDDING_MODEL
+    monkeypatch.setattr(registry, "EMBED_BACKEND", "int8")
+    assert registry.embedding_model_key() == f"{registry.EMBEDDING_MODEL}@int8"
+
+
+def backends_from_env(**env):
+    code = "from backend import models; print(models.EMBED_BACKEND, models.RERANK_BACKEND)"
+    environ = {k: v for k, v in os.environ.items() if not k.startswith("EDITH_")}
+    output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env={**environ, **env}, capture_output=True, text=True, check=True).stdout
+    return tuple(output.split())
+
+
+def test_per_model_backends_fall_back_to_the_global_setting():
+    assert backends_from_env() == ("torch", "torch")
+    assert backends_from_env(EDITH_INFERENCE_BACKEND="ONNX") == ("onnx", "onnx")
+    assert backends_from_env(EDITH_INFERENCE_BACKEND="int8", EDITH_RERANK_BACKEND="torch") == ("int8", "torch")
@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.manifest import RepoManifest
+from backend.path_index import resolve_path, EXACT, SUFFIX, BASENAME, PARTIAL
+
+
+def make_repo(name, paths):
+    manifest = RepoManifest(name)
+    for rel_path in paths:
+        manifest.record(rel_path, "hash", [])
+    manifest.save()
+
+
+def test_match_kinds_rank_best_first(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_repo("EDITH", ["backend/auth.py", "backend/auth/jwt.py", "tests/backend/auth.py", "README.md"])
+
+    assert resolve_path("backend/auth.py", ["EDITH"])[0] == ("EDITH", "backend/auth.py", EXACT)
+    assert resolve_path("auth/jwt.py", ["EDITH"]) == [("EDITH", "backend/auth/jwt.py", SUFFIX)]
+    assert [m[2] for m in resolve_path("auth.py", ["EDITH"])] == [BASENAME, BASENAME]
+    assert resolve_path("readme", ["EDITH"]) == [("EDITH", "README.md", PARTIAL)]
+
+
+def test_repo_prefix_and_path_ignore_case(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_repo("EDITH", ["backend/Auth.py"])
+    make_repo("other", ["backend/Auth.py"])
+
+    assert resolve_path("edith/backend/auth.py", ["EDITH", "other"]) == [("EDITH", "backend/Auth.py", EXACT)]
+    assert len(resolve_path("./BACKEND/auth.py", ["EDITH", "other"])) == 2
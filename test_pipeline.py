@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend import pipeline, vector_store, lexical_index
+from backend.manifest import RepoManifest
+from backend.pipeline import ingest_streaming, IngestCancelled
+from backend.vector_backend import NumpyBackend
+
+
+def fake_embed(texts):
+    return [[float(len(t) % 7) + 1.0, float(sum(map(ord, t)) % 11) + 1.0, 1.0] for t in texts]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    collection = NumpyBackend(str(tmp_path / "index"))
+    monkeypatch.setattr(pipeline, "USE_EMBEDDING_CACHE", False)
+    monkeypatch.setattr(vector_store, "get_embedding_function", lambda: fake_embed)
+    monkeypatch.setattr(vector_store, "get_collection", lambda emb_fn=None: collection)
+    monkeypatch.setattr(lexical_index, "_index", lexical_index.LexicalIndex(str(tmp_path / "lexical.sqlite")))
+    return collection
+
+
+def make_repo(root, n_files):
+    for i in range(n_files):
+        path = os.path.join(root, "docs", f"page{i}.md")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# Page {i}\n\nContent of page number {i}.\n")
+
+
+def test_streams_every_chunk_in_small_batches(tmp_path, store):
+    repo = str(tmp_path / "demo")
+    make_repo(repo, 7)
+    events = []
+
+    progress = ingest_streaming("demo", repo, manifest=RepoManifest("demo"), workers=1, batch_size=2,
+                                on_event=lambda kind, message, data: events.append(kind))
+
+    assert store.count() == 7
+    assert progress["upsert"]["chunks"] == 7 and progress["embed"]["batches"] == 4
+    assert progress["stage"] == "done"
+    assert events.count("upsert.progress") == 4
+
+
+def test_incremental_run_deletes_chunks_of_removed_files(tmp_path, store):
+    repo = str(tmp_path / "demo")
+    make_repo(repo, 3)
+    manifest = RepoManifest("demo")
+    ingest_streaming("demo", repo, manifest=manifest, workers=1)
+    manifest.save()
+
+    os.remove(os.path.join(repo, "docs", "page1.md"))
+    progress = ingest_streaming("demo", repo, manifest=RepoManifest.load("demo"), incremental=True, workers=1)
+
+    assert progress["walk"]["unchanged"] == 2
+    assert progress["upsert"]["deleted"] == 1
+    assert sorted(m["source"] for m in store.get()["metadatas"]) == ["docs/page0.md", "docs/page2.md"]
+
+
+def test_first_ingest_purges_chunks_from_before_repo_namespacing(tmp_path, store):
+    repo = str(tmp_path / "demo")
+    make_repo(repo, 2)
+    # Written by the old ingest: "<path>:<i>" ids without repo metadata, for this repo and another one
+    store.upsert(["docs/page0.md:0", "docs/page1.md:0", "other/file.md:0"], fake_embed(["a", "b", "c"]), ["a", "b", "c"],
+                 [{"source": "docs/page0.md"}, {"source": "docs/page1.md"}, {"source": "other/file.md"}])
+
+    manifest = RepoManifest.load("demo")
+    progress = ingest_streaming("demo", repo, manifest=manifest, workers=1)
+    manifest.save()
+
+    assert progress["upsert"]["deleted"] == 2
+    assert all(m.get("repo") == "demo" for m in store.get(where={"source": {"$ne": "other/file.md"}})["metadatas"])
+    assert store.get(ids=["other/file.md:0"])["ids"] == ["other/file.md:0"]
+
+    # Later ingests don't look for them again
+    store.upsert(["docs/page0.md:0"], fake_embed(["a"]), ["a"], [{"source": "docs/page0.md"}])
+    progress = ingest_streaming("demo", repo, manifest=RepoManifest.load("demo"), incremental=True, workers=1)
+    assert progress["upsert"]["deleted"] == 0
+
+
+def test_cancel_stops_the_run(tmp_path, store):
+    repo = str(tmp_path / "demo")
+    make_repo(repo, 3)
+    cancel = threading.Event()
+    cancel.set()
+
+    with pytest.raises(IngestCancelled):
+        ingest_streaming("demo", repo, workers=1, cancel_event=cancel)
+    assert store.count() == 0
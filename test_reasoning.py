@@ -0,0 +1,93 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend import reasoning
+from backend.manifest import RepoManifest
+from backend.reasoning import parse_actions, format_observations, parse_search_filters, parse_line_range, read_file
+
+
+def test_parse_actions_dedupes_and_reports_skipped(monkeypatch):
+    monkeypatch.setattr(reasoning, "MAX_PARALLEL_ACTIONS", 2)
+    text = ("Thought: several lookups\n"
+            "Action: [find_symbol: get_user]\n"
+            "Action: [read_file: backend/auth.py]\n"
+            "Action: [find_symbol: get_user]\n"
+            "Action: [search_code: token refresh]\n")
+
+    actions, skipped = parse_actions(text)
+
+    assert actions == [("find_symbol", "get_user"), ("read_file", "backend/auth.py")]
+    assert skipped == [("search_code", "token refresh")]
+
+
+def test_skipped_actions_are_reported_to_the_agent(monkeypatch):
+    monkeypatch.setattr(reasoning, "MAX_PARALLEL_ACTIONS", 1)
+    text = format_observations([("read_file", "a.py")], ["contents"], [("read_file", "b.py")])
+
+    assert text.startswith("Observation: contents")
+    assert "Action: [read_file: b.py]" in text
+    assert format_observations([("read_file", "a.py")], ["contents"]) == "Observation: contents"
+
+
+def test_parse_search_filters():
+    assert parse_search_filters("billing retry") == ("billing retry", {})
+    assert parse_search_filters("billing retry | path=services/billing lang=Python repo=api repo=web") == (
+        "billing retry", {"path": "services/billing", "language": ["python"], "repo": ["api", "web"]})
+    assert parse_search_filters("x | dir=`src/` unknown=1")[1] == {"path": "src/"}
+
+
+def test_parse_line_range():
+    assert parse_line_range("backend/auth.py") == ("backend/auth.py", None, None)
+    assert parse_line_range("backend/auth.py:10-40") == ("backend/auth.py", 10, 40)
+    assert parse_line_range("backend/auth.py#L40-L10") == ("backend/auth.py", 10, 40)
+    assert parse_line_range("backend/auth.py:25") == ("backend/auth.py", 25, 25)
+
+
+def test_read_file_resolves_paths_and_line_ranges(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for repo in ("api", "web"):
+        os.makedirs(f"data/repos/{repo}/src")
+        with open(f"data/repos/{repo}/src/app.py", "w", encoding="utf-8") as f:
+            f.write("".join(f"line {n}\n" for n in range(1, 11)))
+        manifest = RepoManifest(repo)
+        manifest.record("src/app.py", "hash", [])
+        manifest.save()
+
+    assert read_file("app.py:3-4", repos=["api"]) == "[src/app.py:3-4]\n    3 | line 3\n    4 | line 4\n"
+    assert "ambiguous" in read_file("src/app.py", repos=["api", "web"])
+    assert read_file("web/src/app.py:99", repos=["api", "web"]) == "src/app.py has only 10 lines."
+    assert read_file("missing.py", repos=["api"]).startswith("File not found")
+
+
+def test_dependency_tools_stay_inside_the_callers_repos(tmp_path, monkeypatch):
+    from backend.graph import apply_graph_updates
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    apply_graph_updates("data/dependency_graph.gml", "alpha", {"app/main.py": ["app.db"], "app/api.py": ["app.db"]}, [])
+    apply_graph_updates("data/dependency_graph.gml", "beta", {"app/main.py": ["app.secrets"], "jobs/run.py": ["app.secrets"]}, [])
+
+    assert reasoning.TOOLS["get_dependencies"]("app/main.py", ["alpha"]) == "app.db"
+    assert reasoning.TOOLS["get_dependents"]("app.db", ["alpha"]) == "app/main.py, app/api.py"
+    assert reasoning.TOOLS["get_dependents"]("app.secrets", ["alpha"]) == "No dependents found."
+    # Unscoped (admin) lookups label each hit with its repo when several repos have the file
+    assert reasoning.TOOLS["get_dependencies"]("app/main.py", None) == "app.db (alpha), app.secrets (beta)"
+
+
+def test_search_code_keeps_same_path_hits_from_different_repos(monkeypatch):
+    results = {
+        "ids": [["a1", "b1", "a2"]],
+        "documents": [["def run(): pass", "def run(): return 1", "def run(): return 2"]],
+        "metadatas": [[{"repo": "alpha", "source": "src/app.py"}, {"repo": "beta", "source": "src/app.py"},
+                       {"repo": "alpha", "source": "src/app.py"}]],
+    }
+    monkeypatch.setattr(reasoning, "query_documents", lambda *args, **kwargs: results)
+    monkeypatch.setattr(reasoning, "chunk_locations", lambda repo: {})
+
+    output = reasoning.search_code("run", repos=None)
+
+    assert output.count("[alpha/src/app.py]") == 1
+    assert output.count("[beta/src/app.py]") == 1
+    assert "return 2" not in output
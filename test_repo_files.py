@@ -0,0 +1,66 @@
+import os
+import sys
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend import repo_files
+from backend.repo_files import enumerate_repo_files, sniff_content, SkipReport
+
+
+def write(root, rel_path, content="x = 1\n"):
+    path = os.path.join(root, *rel_path.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content.encode() if isinstance(content, str) else content)
+
+
+def make_tree(root):
+    write(root, ".gitignore", "*.log\n/secrets/\nbuild_output/\n!keep.log\n")
+    write(root, "app/main.py")
+    write(root, "app/debug.log")
+    write(root, "app/keep.log")
+    write(root, "secrets/key.py")
+    write(root, "lib/secrets/ok.py")
+    write(root, "build_output/gen.py")
+    write(root, "node_modules/pkg/index.js")
+    write(root, "static/logo.png", b"\x89PNG")
+    write(root, "static/app.min.js", "var a=1;")
+
+
+def test_walk_honours_gitignore_and_excludes(tmp_path):
+    root = str(tmp_path)
+    make_tree(root)
+    report = SkipReport()
+
+    rel_paths = [rel for _, rel, _ in enumerate_repo_files(root, report)]
+
+    assert rel_paths == [".gitignore", "app/keep.log", "app/main.py", "lib/secrets/ok.py"]
+    assert report.counts == {"excluded_ext": 1, "generated": 1}
+
+
+def test_git_index_listing_matches_walk(tmp_path):
+    root = str(tmp_path)
+    make_tree(root)
+    subprocess.run(["git", "init", "-q", root], check=True)
+
+    # node_modules is not ignored by .gitignore here, so git lists it and the dir filter drops it
+    report = SkipReport()
+    rel_paths = [rel for _, rel, _ in enumerate_repo_files(root, report)]
+    assert rel_paths == [".gitignore", "app/keep.log", "app/main.py", "lib/secrets/ok.py"]
+    assert report.counts["excluded_dir"] == 1
+
+
+def test_size_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(repo_files, "MAX_FILE_BYTES", 10)
+    write(str(tmp_path), "big.py", "x = 1\n" * 10)
+    report = SkipReport()
+    assert enumerate_repo_files(str(tmp_path), report) == []
+    assert report.counts == {"too_large": 1}
+
+
+def test_sniff_content():
+    assert sniff_content(b"def f():\n    return 1\n") is None
+    assert sniff_content(b"\x00\x01binary") == "binary"
+    assert sniff_content(b"var a=1;" * 500) == "minified"
+    assert sniff_content(b"short line\n" * 500) is None
@@ -0,0 +1,44 @@
+import os
+import sys
+import json
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend import rerank_policy
+from backend.rerank_policy import plan_rerank, log_decision
+
+
+def test_plan_actions():
+    assert plan_rerank([0.9], 5, 15)["action"] == "skip"
+    assert plan_rerank([0.90, 0.70, 0.65, 0.60], 2, 3)["action"] == "skip"
+    flat = plan_rerank([0.80] + [0.79] * 30, 5, 15)
+    assert flat["action"] == "widen" and flat["candidates"] == 31
+    shrink = plan_rerank([0.80, 0.78, 0.76, 0.60, 0.55, 0.50, 0.45], 2, 6)
+    assert shrink["action"] == "shrink" and shrink["candidates"] == 3
+    assert plan_rerank([0.80, 0.79, 0.77, 0.76, 0.75, 0.74, 0.73, 0.72], 2, 6)["action"] == "full"
+
+
+def test_policy_always_never_skips(monkeypatch):
+    monkeypatch.setattr(rerank_policy, "RERANK_POLICY", "always")
+    assert plan_rerank([0.90, 0.50], 5, 15)["action"] == "full"
+
+
+def test_log_is_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(rerank_policy, "RERANK_LOG_PATH", "")
+    log_decision("q", plan_rerank([0.9, 0.5], 5, 15), 0, 0.001)
+    assert os.listdir(tmp_path) == []
+
+
+def test_log_rotates_at_size_cap(tmp_path, monkeypatch):
+    path = str(tmp_path / "decisions.jsonl")
+    monkeypatch.setattr(rerank_policy, "RERANK_LOG_PATH", path)
+    monkeypatch.setattr(rerank_policy, "RERANK_LOG_MAX_BYTES", 1000)
+    plan = plan_rerank([0.9, 0.5], 5, 15)
+    for i in range(30):
+        log_decision(f"question {i}", plan, 0, 0.001)
+
+    assert os.path.getsize(path) < 1000 + 300
+    assert os.path.getsize(path + ".1") < 1000 + 300
+    with open(path, encoding="utf-8") as f:
+        assert all(json.loads(line)["action"] == "skip" for line in f)
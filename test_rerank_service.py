@@ -0,0 +1,49 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend import rerank_service
+from backend.rerank_service import RerankService
+
+
+def test_concurrent_requests_share_a_batch_and_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(rerank_service, "rerank_scores", lambda pairs: calls.append(len(pairs)) or [float(len(d)) for _, d in pairs])
+    service = RerankService(max_batch=64, max_wait_ms=200)
+    results = {}
+
+    def query(n):
+        results[n] = service.score(f"q{n}", [f"id{i}" for i in range(n)], ["x" * i for i in range(n)])
+
+    threads = [threading.Thread(target=query, args=(n,)) for n in (2, 3, 4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results[4] == [0.0, 1.0, 2.0, 3.0]
+    assert sum(calls) == 9 and len(calls) < 3
+    assert service.score("q2", ["id0", "id1"], ["", "x"]) == [0.0, 1.0]
+    assert service.stats()["cache_hits"] == 2
+
+
+def test_stuck_batch_falls_back_to_direct_scoring(monkeypatch):
+    release = threading.Event()
+
+    def scores(pairs):
+        if threading.current_thread().name == "rerank-batcher":
+            release.wait(5)
+        return [1.0] * len(pairs)
+
+    monkeypatch.setattr(rerank_service, "rerank_scores", scores)
+    service = RerankService(max_wait_ms=0, timeout_s=0.1)
+    stuck = threading.Thread(target=service.score, args=("first", ["a"], ["doc"]))
+    stuck.start()
+
+    # Queued behind the stuck forward pass: times out, withdraws and scores directly
+    assert service.score("second", ["b"], ["doc"]) == [1.0]
+    assert service.stats()["timeouts"] >= 1
+    release.set()
+    stuck.join()
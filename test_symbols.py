@@ -0,0 +1,62 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.symbols import chunk_python_source, find_symbols, MAX_SYMBOL_CHARS
+from backend.manifest import RepoManifest
+
+
+def method(name):
+    body = "".join(f"        value_{i} = self.compute({i}) + {i}\n" for i in range(60))
+    return f"    def {name}(self):\n{body}        return value_0\n\n"
+
+
+def test_small_symbols_get_one_chunk_each():
+    source = "import os\n\n\ndef load(path):\n    return open(path).read()\n\n\nclass Store:\n    def get(self):\n        return 1\n"
+    chunks, symbols = chunk_python_source(source)
+
+    assert [(m["symbol"], m["symbol_kind"], m["start_line"], m["end_line"]) for _, m in chunks] == [
+        ("<module>", "module", 1, 3), ("load", "function", 4, 5), ("Store", "class", 8, 10)]
+    assert [s["symbol"] for s in symbols] == ["load", "Store", "Store.get"]
+
+
+def test_large_class_keeps_class_level_code_between_and_after_methods():
+    source = (
+        "class Big:\n"
+        "    \"\"\"A large class.\"\"\"\n"
+        "    LIMIT = 10\n\n"
+        + method("first")
+        + "    between = property(lambda self: self.LIMIT)\n\n"
+        + method("second")
+        + "    tail_alias = second\n"
+        "    registry = {'first': first}\n"
+    )
+    assert len(source) > MAX_SYMBOL_CHARS
+    chunks, _ = chunk_python_source(source)
+
+    texts = [text for text, _ in chunks]
+    assert [m["symbol"] for _, m in chunks] == ["Big", "Big.first", "Big", "Big.second", "Big"]
+    assert "LIMIT = 10" in texts[0]
+    assert texts[2].strip() == "between = property(lambda self: self.LIMIT)"
+    assert "tail_alias = second" in texts[4] and "registry" in texts[4]
+    # Every line of the class ends up in exactly one chunk
+    assert "".join(texts).split() == source.split()
+    assert chunks[4][1]["end_line"] == len(source.splitlines())
+
+
+def test_find_symbols_matches_qualified_and_short_names(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = "def get(key):\n    return key\n\n\nclass Store:\n    def get(self):\n        return 1\n"
+    _, symbols = chunk_python_source(source)
+    manifest = RepoManifest("demo")
+    manifest.record("store.py", "digest", [], symbols)
+    manifest.save()
+
+    assert [s["symbol"] for s in find_symbols("Store.get", ["demo"])] == ["Store.get"]
+    # Short name: functions rank ahead of methods, lookups ignore case and call syntax
+    assert [s["symbol"] for s in find_symbols("GET()", ["demo"])] == ["get", "Store.get"]
+    hit = find_symbols("store", ["demo"])[0]
+    assert (hit["repo"], hit["path"], hit["symbol_kind"], hit["start_line"]) == ("demo", "store.py", "class", 5)
+    assert find_symbols("missing", ["demo"]) == []
+    assert find_symbols("get", ["other"]) == []
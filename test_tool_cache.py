@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend import tool_cache
+from backend.tool_cache import ToolCache, normalize_arg
+
+
+def test_search_text_ignores_case_but_filters_do_not():
+    assert normalize_arg("search_code", "  Billing   Retry ") == "billing retry"
+    assert (normalize_arg("search_code", "Retry | path=Services/Billing repo=API lang=Python")
+            == normalize_arg("search_code", "retry |  lang=python repo=API path=Services/Billing"))
+    assert (normalize_arg("search_code", "retry | path=Services/Billing")
+            != normalize_arg("search_code", "retry | path=services/billing"))
+    assert (normalize_arg("search_code", "retry | repo=API")
+            != normalize_arg("search_code", "retry | repo=api"))
+
+
+def test_read_file_paths_normalized():
+    assert normalize_arg("read_file", "`./Backend\\Auth.py`") == "backend/auth.py"
+    assert normalize_arg("read_file", "EDITH/backend/auth.py:10-20") == "edith/backend/auth.py:10-20"
+    assert normalize_arg("find_symbol", "GetUser") == "GetUser"
+
+
+def test_entries_are_scoped_by_repo_and_corpus_version(monkeypatch):
+    versions = {"v": "1"}
+    monkeypatch.setattr(tool_cache, "corpus_version", lambda repos: versions["v"])
+    cache = ToolCache(max_entries=2)
+
+    cache.put("read_file", "a.py", "A", repos=["demo"])
+    assert cache.get("read_file", "./A.py", repos=["demo"]) == "A"
+    assert cache.get("read_file", "a.py", repos=["other"]) is None
+    versions["v"] = "2"
+    assert cache.get("read_file", "a.py", repos=["demo"]) is None
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    monkeypatch.setattr(tool_cache, "corpus_version", lambda repos: "1")
+    cache = ToolCache(max_entries=2)
+    cache.put("search_code", "a", "A")
+    cache.put("search_code", "b", "B")
+    cache.get("search_code", "a")
+    cache.put("search_code", "c", "C")
+
+    assert cache.get("search_code", "b") is None
+    assert cache.get("search_code", "a") == "A"
+    monkeypatch.setenv("EDITH_TOOL_CACHE_TTL_SEARCH_CODE", "-1")
+    assert cache.get("search_code", "c") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["tools"]["search_code"]["expired"] == 1
@@ -0,0 +1,121 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.vector_backend import NumpyBackend
+from backend.repo_files import path_metadata
+from backend.vector_store import build_filter
+
+
+def unit_vectors(n, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def fill(backend, vectors, prefix="c"):
+    ids = [f"{prefix}{i}" for i in range(len(vectors))]
+    backend.upsert(ids, vectors, [f"doc {i}" for i in ids], [{"repo": "even" if i % 2 == 0 else "odd", "n": i}
+                                                             for i in range(len(vectors))])
+    return ids
+
+
+def test_exact_search_with_filters_and_replacement(tmp_path):
+    backend = NumpyBackend(str(tmp_path / "index"))
+    vectors = unit_vectors(50)
+    fill(backend, vectors)
+
+    result = backend.query([vectors[7]], n_results=3)
+    assert result["ids"][0][0] == "c7"
+    assert abs(result["distances"][0][0]) < 1e-2
+    assert result["documents"][0][0] == "doc c7"
+
+    filtered = backend.query([vectors[7]], n_results=5, where={"repo": "even"})
+    assert all(m["repo"] == "even" for m in filtered["metadatas"][0])
+
+    # Re-upserting an id replaces its vector; deleting removes it
+    backend.upsert(["c7"], [vectors[8]], ["moved"], [{"repo": "odd"}])
+    backend.delete(["c8"])
+    result = backend.query([vectors[8]], n_results=1)
+    assert result["ids"][0] == ["c7"] and result["documents"][0] == ["moved"]
+    assert backend.count() == 49
+
+
+def test_compaction_keeps_ids_and_vectors_together(tmp_path):
+    backend = NumpyBackend(str(tmp_path / "index"))
+    vectors = unit_vectors(300)
+    ids = fill(backend, vectors)
+    backend.delete(ids[::3])
+
+    backend.compact()
+
+    assert backend._refresh()["n_rows"] == 200
+    for i in (1, 2, 4, 299):
+        assert backend.query([vectors[i]], n_results=1)["ids"][0] == [f"c{i}"]
+    got = backend.get(ids=["c4"], include=["embeddings"])
+    assert np.allclose(got["embeddings"][0], vectors[4], atol=1e-2)
+
+
+def test_reader_holding_old_rows_retries_after_compaction(tmp_path):
+    path = str(tmp_path / "index")
+    writer = NumpyBackend(path)
+    vectors = unit_vectors(100)
+    ids = fill(writer, vectors)
+    writer.delete(ids[:50])
+
+    # Another process: searches a pre-compaction snapshot, then the writer compacts
+    reader = NumpyBackend(path)
+    search = reader._search
+    compacted = []
+
+    def search_then_compact(*args, **kwargs):
+        hits = search(*args, **kwargs)
+        if not compacted:
+            compacted.append(True)
+            writer.compact()
+        return hits
+
+    reader._search = search_then_compact
+    assert reader.query([vectors[75]], n_results=1)["ids"][0] == ["c75"]
+    assert compacted
+
+
+def test_ivf_matches_exact_search_on_clustered_data(tmp_path):
+    backend = NumpyBackend(str(tmp_path / "index"), dtype="int8")
+    centers = unit_vectors(8, seed=1)
+    noise = np.random.default_rng(2).normal(scale=0.05, size=(800, 16)).astype(np.float32)
+    vectors = centers[np.arange(800) % 8] + noise
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    fill(backend, vectors)
+    exact = backend.query([vectors[10]], n_results=1)["ids"][0]
+
+    backend.build_ivf(n_lists=8)
+    extra = unit_vectors(1, seed=3)
+    backend.upsert(["late"], extra, ["late"], [{}])
+
+    assert backend._refresh()["ivf"] is not None
+    assert backend.query([vectors[10]], n_results=1)["ids"][0] == exact
+    # Rows added after the build are always scanned
+    assert backend.query([extra[0]], n_results=1)["ids"][0] == ["late"]
+
+
+def test_path_language_and_repo_filters(tmp_path):
+    assert path_metadata("services/billing/retry.py") == {"dir1": "services", "dir2": "billing"}
+    backend = NumpyBackend(str(tmp_path / "index"))
+    files = [("api", "services/billing/retry.py", "python"), ("api", "services/billing/README.md", "markdown"),
+             ("api", "services/auth/login.py", "python"), ("web", "services/billing/retry.py", "python")]
+    vectors = unit_vectors(len(files))
+    backend.upsert([f"c{i}" for i in range(len(files))], vectors, [path for _, path, _ in files],
+                   [{"repo": repo, "source": path, "language": lang, **path_metadata(path)} for repo, path, lang in files])
+
+    def ids(**kwargs):
+        return sorted(backend.get(where=build_filter(**kwargs))["ids"])
+
+    assert ids(repos=["api"], path_prefix="services/billing") == ["c0", "c1"]
+    assert ids(repos=["api"], path_prefix="services/billing", languages=["python"]) == ["c0"]
+    assert ids(path_prefix="services/billing/retry.py") == ["c0", "c3"]
+    assert ids(repos=["api", "web"], languages=["python"]) == ["c0", "c2", "c3"]
+    result = backend.query([vectors[2]], n_results=4, where=build_filter(path_prefix="services/auth"))
+    assert result["ids"] == [["c2"]]
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import chromadb
+from chromadb.api.types import EmbeddingFunction
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend import vector_store
+from backend.models import EMBEDDING_MODEL, SentenceTransformerEmbedder
+
+
+class BaselineEmbeddingFunction(EmbeddingFunction):
+    """Persists the same config as chromadb's SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL)."""
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        return [[float(len(text)), 1.0] for text in input]
+
+    @staticmethod
+    def name():
+        return "sentence_transformer"
+
+    @staticmethod
+    def build_from_config(config):
+        return BaselineEmbeddingFunction()
+
+    def get_config(self):
+        return {"model_name": EMBEDDING_MODEL, "device": "cpu", "normalize_embeddings": False, "kwargs": {}}
+
+
+def test_opens_a_collection_created_by_the_baseline(tmp_path, monkeypatch):
+    path = str(tmp_path / "chroma_db")
+    baseline = chromadb.PersistentClient(path=path).get_or_create_collection(
+        name=vector_store.COLLECTION_NAME, embedding_function=BaselineEmbeddingFunction())
+    baseline.add(ids=["a.py:0"], documents=["print('hi')"], metadatas=[{"source": "a.py"}])
+
+    monkeypatch.setattr(vector_store, "CHROMA_DATA_PATH", path)
+    monkeypatch.setattr(vector_store, "_client", None)
+    backend = vector_store.get_chroma_backend()
+
+    assert isinstance(backend.collection._embedding_function, SentenceTransformerEmbedder)
+    assert backend.count() == 1
+    assert backend.get(ids=["a.py:0"])["documents"] == ["print('hi')"]
+    backend.upsert(["b.py:0"], [[1.0, 2.0]], ["x = 1"], [{"source": "b.py"}])
+    assert backend.query([[1.0, 2.0]], n_results=1)["ids"] == [["b.py:0"]]